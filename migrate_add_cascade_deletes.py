@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Migration script to rebuild the TutuItemSteps and TutuRuns tables with
+ON DELETE CASCADE foreign keys, so deleting an item deletes its steps and runs,
+and the TutuItems table with AUTOINCREMENT, so a deleted item's ID is never
+reused
+"""
+from pathlib import Path
+import sqlite3
+
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.schema import CreateTable, CreateIndex
+
+from tutu.models import get_db_path, TutuItem, TutuItemStep, TutuRun
+
+def _has_cascade(cursor, table):
+    cursor.execute(f"PRAGMA foreign_key_list({table})")
+    rules = [row[6] for row in cursor.fetchall() if row[2] == 'tutu_items']
+    return bool(rules) and all(rule == 'CASCADE' for rule in rules)
+
+def _rebuild(cursor, table):
+    """Recreate `table` from the current model definition, keeping its rows"""
+    name = table.name
+    cursor.execute(f"PRAGMA table_info({name})")
+    old_columns = {col[1] for col in cursor.fetchall()}
+    columns = ", ".join(column.name for column in table.columns if column.name in old_columns)
+    
+    cursor.execute(f"ALTER TABLE {name} RENAME TO {name}_old")
+    cursor.execute(str(CreateTable(table).compile(dialect=sqlite.dialect())))
+    cursor.execute(f"INSERT INTO {name} ({columns}) SELECT {columns} FROM {name}_old")
+    cursor.execute(f"DROP TABLE {name}_old")
+    for index in table.indexes:
+        cursor.execute(str(CreateIndex(index).compile(dialect=sqlite.dialect())))
+
+def _has_autoincrement(cursor, table):
+    cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+    row = cursor.fetchone()
+    return bool(row) and "AUTOINCREMENT" in row[0].upper()
+
+def _rebuild_items(cursor, table):
+    """Recreate tutu_items with AUTOINCREMENT, keeping its rows.
+    
+    The new table is built under another name and renamed into place, so the
+    REFERENCES tutu_items clauses of the other tables are left alone.
+    """
+    name = table.name
+    cursor.execute(f"PRAGMA table_info({name})")
+    old_columns = {col[1] for col in cursor.fetchall()}
+    columns = ", ".join(column.name for column in table.columns if column.name in old_columns)
+    
+    create = str(CreateTable(table).compile(dialect=sqlite.dialect()))
+    cursor.execute(create.replace(f"CREATE TABLE {name} ", f"CREATE TABLE {name}_new ", 1))
+    cursor.execute(f"INSERT INTO {name}_new ({columns}) SELECT {columns} FROM {name}")
+    cursor.execute(f"DROP TABLE {name}")
+    cursor.execute(f"ALTER TABLE {name}_new RENAME TO {name}")
+    for index in table.indexes:
+        cursor.execute(str(CreateIndex(index).compile(dialect=sqlite.dialect())))
+        
+    # Items deleted before this migration may have had higher IDs than any
+    # left; their events and history still carry those IDs
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('tutu_events', 'tutu_item_revisions')")
+    sources = [f"SELECT MAX(id) AS id FROM {name}", *(f"SELECT MAX(item_id) FROM {row[0]}" for row in cursor.fetchall())]
+    cursor.execute(f"SELECT MAX(id) FROM ({' UNION ALL '.join(sources)})")
+    highest = cursor.fetchone()[0] or 0
+    cursor.execute("DELETE FROM sqlite_sequence WHERE name = ?", (name,))
+    cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (name, highest))
+
+def migrate():
+    """Run the migration"""
+    db_path = Path(get_db_path())
+    
+    if not db_path.exists():
+        print(f"🚫 Database not found at {db_path}")
+        return
+        
+    print(f"📂 Migrating database at {db_path}")
+    
+    conn = sqlite3.connect(str(db_path), isolation_level=None)
+    cursor = conn.cursor()
+    
+    try:
+        tables = [table for table in (TutuItemStep.__table__, TutuRun.__table__) if not _has_cascade(cursor, table.name)]
+        rebuild_items = not _has_autoincrement(cursor, TutuItem.__tablename__)
+        if not tables and not rebuild_items:
+            print("✅ Steps and runs already cascade with their items, and item IDs are never reused!")
+            return
+            
+        # Foreign keys must be off while the tables are swapped
+        cursor.execute("PRAGMA foreign_keys = OFF")
+        cursor.execute("BEGIN")
+        if rebuild_items:
+            _rebuild_items(cursor, TutuItem.__table__)
+            print(f"✅ Rebuilt {TutuItem.__tablename__} with AUTOINCREMENT")
+        for table in tables:
+            _rebuild(cursor, table)
+            print(f"✅ Rebuilt {table.name} with ON DELETE CASCADE")
+        cursor.execute("COMMIT")
+        
+        cursor.execute("PRAGMA foreign_key_check")
+        orphans = cursor.fetchall()
+        if orphans:
+            print(f"⚠️  {len(orphans)} steps or runs belong to items that no longer exist; they were kept as they are")
+            
+    except Exception as e:
+        print(f"❌ Error during migration: {e}")
+        if conn.in_transaction:
+            cursor.execute("ROLLBACK")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    migrate()
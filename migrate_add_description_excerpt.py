@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Migration script to add description_excerpt to existing TutuItems and
+compress large descriptions and contexts already stored
+"""
+from pathlib import Path
+import sqlite3
+
+from tutu.models import get_db_path, make_excerpt, CompressedText, COMPRESS_MIN_BYTES
+
+def migrate():
+    """Run the migration"""
+    db_path = Path(get_db_path())
+    
+    if not db_path.exists():
+        print(f"🚫 Database not found at {db_path}")
+        return
+        
+    print(f"📂 Migrating database at {db_path}")
+    
+    conn = sqlite3.connect(str(db_path))
+    cursor = conn.cursor()
+    compressor = CompressedText()
+    
+    try:
+        # Check if column already exists
+        cursor.execute("PRAGMA table_info(tutu_items)")
+        columns = [col[1] for col in cursor.fetchall()]
+        
+        if 'description_excerpt' not in columns:
+            cursor.execute("ALTER TABLE tutu_items ADD COLUMN description_excerpt VARCHAR(200)")
+            print("✅ Added 'description_excerpt' column to tutu_items table")
+            
+        # Fill in excerpts, and compress long text that is still stored plain
+        cursor.execute("SELECT id, description, context FROM tutu_items")
+        updated = 0
+        for item_id, description, context in cursor.fetchall():
+            description = compressor.process_result_value(description, None)
+            context = compressor.process_result_value(context, None)
+            conn.execute(
+                "UPDATE tutu_items SET description_excerpt = ?, description = ?, context = ? WHERE id = ?",
+                (
+                    make_excerpt(description),
+                    compressor.process_bind_param(description, None),
+                    compressor.process_bind_param(context, None),
+                    item_id
+                )
+            )
+            updated += 1
+        conn.commit()
+        
+        print(f"✅ Updated {updated} items (text over {COMPRESS_MIN_BYTES} bytes is now compressed)")
+        
+        # Compressing leaves free pages behind
+        conn.execute("VACUUM")
+        
+    except Exception as e:
+        print(f"❌ Error during migration: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    migrate()
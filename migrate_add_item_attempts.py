@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Migration script to add attempts column to existing TutuItems table
+"""
+from pathlib import Path
+import sqlite3
+
+from tutu.models import get_db_path
+
+def migrate():
+    """Run the migration"""
+    db_path = Path(get_db_path())
+    
+    if not db_path.exists():
+        print(f"🚫 Database not found at {db_path}")
+        return
+        
+    print(f"📂 Migrating database at {db_path}")
+    
+    conn = sqlite3.connect(str(db_path))
+    cursor = conn.cursor()
+    
+    try:
+        # Check if column already exists
+        cursor.execute("PRAGMA table_info(tutu_items)")
+        columns = [col[1] for col in cursor.fetchall()]
+        
+        if 'attempts' in columns:
+            print("✅ Column 'attempts' already exists!")
+            return
+            
+        # Add the column; existing items start at 0 (their earlier sessions
+        # are still listed in tutu_runs)
+        cursor.execute("ALTER TABLE tutu_items ADD COLUMN attempts INTEGER DEFAULT 0")
+        conn.commit()
+        
+        print("✅ Successfully added 'attempts' column to tutu_items table!")
+        
+    except Exception as e:
+        print(f"❌ Error during migration: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Migration script to add lease columns (lease_owner, lease_expires_at, heartbeat_at) to existing TutuItems table
+"""
+from pathlib import Path
+import sqlite3
+
+from tutu.models import get_db_path
+
+LEASE_COLUMNS = {
+    'lease_owner': 'VARCHAR(255)',
+    'lease_expires_at': 'DATETIME',
+    'heartbeat_at': 'DATETIME',
+}
+
+def migrate():
+    """Run the migration"""
+    db_path = Path(get_db_path())
+    
+    if not db_path.exists():
+        print(f"🚫 Database not found at {db_path}")
+        return
+        
+    print(f"📂 Migrating database at {db_path}")
+    
+    conn = sqlite3.connect(str(db_path))
+    cursor = conn.cursor()
+    
+    try:
+        # Check which columns already exist
+        cursor.execute("PRAGMA table_info(tutu_items)")
+        columns = [col[1] for col in cursor.fetchall()]
+        
+        missing = [name for name in LEASE_COLUMNS if name not in columns]
+        if not missing:
+            print("✅ Lease columns already exist!")
+            return
+            
+        # Existing items start unclaimed
+        for name in missing:
+            cursor.execute(f"ALTER TABLE tutu_items ADD COLUMN {name} {LEASE_COLUMNS[name]}")
+        conn.commit()
+        
+        print(f"✅ Successfully added {', '.join(repr(name) for name in missing)} to tutu_items table!")
+        
+    except Exception as e:
+        print(f"❌ Error during migration: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    migrate()
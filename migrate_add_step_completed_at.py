@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Migration script to add completed_at column to existing TutuItemSteps table
+"""
+from pathlib import Path
+import sqlite3
+
+from tutu.models import get_db_path
+
+def migrate():
+    """Run the migration"""
+    db_path = Path(get_db_path())
+    
+    if not db_path.exists():
+        print(f"🚫 Database not found at {db_path}")
+        return
+        
+    print(f"📂 Migrating database at {db_path}")
+    
+    conn = sqlite3.connect(str(db_path))
+    cursor = conn.cursor()
+    
+    try:
+        # Check if column already exists
+        cursor.execute("PRAGMA table_info(tutu_item_steps)")
+        columns = [col[1] for col in cursor.fetchall()]
+        
+        if 'completed_at' in columns:
+            print("✅ Column 'completed_at' already exists!")
+            return
+            
+        # Add the column; steps finished before now keep it empty since we
+        # never recorded when they were completed
+        cursor.execute("ALTER TABLE tutu_item_steps ADD COLUMN completed_at DATETIME")
+        conn.commit()
+        
+        print("✅ Successfully added 'completed_at' column to tutu_item_steps table!")
+        
+    except Exception as e:
+        print(f"❌ Error during migration: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    migrate()
@@ -1,4 +1,4 @@
-from tutu.cli import main
+from tutu.snapshot import main
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
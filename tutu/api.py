@@ -0,0 +1,503 @@
+"""Python API for tutu databases.
+
+`TutuRepository` does what the CLI commands do without prompting or printing
+(nothing here imports rich), so scripts and long-running processes can use
+tutu directly and keep one connection open instead of shelling out:
+
+    from tutu.api import TutuRepository
+
+    with TutuRepository() as tutu:
+        with tutu.transaction():
+            item = tutu.create_item("Fix the flaky test", working_directory="/code/app")
+            tutu.add_steps(item.id, ["Reproduce it", "Fix it", "Add a regression test"])
+        for item in tutu.iter_items(statuses=['pending']):
+            ...
+
+Each write commits on its own, unless it runs inside `transaction()`: then
+everything in the block commits together when it ends, or rolls back
+together if it raises. Writes go through the same session hooks as the CLI,
+so the change log sees them too.
+"""
+import json
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select, insert, update, delete, func, or_, and_, literal, DateTime
+from sqlalchemy.orm import Session, selectinload, undefer_group
+
+from .models import get_session, TutuItem, TutuItemStep, TutuRun, TutuTag, TutuItemTag, TutuItemRevision, TutuEvent, get_pacific_now, touch_items, record_events
+from .history import HISTORY_FIELDS, DEFAULT_KEEP, UNKNOWN, list_revisions, revision_value, prune
+from .utils import directory_range
+
+ITEM_ORDERS = {
+    'id': TutuItem.id,
+    'created': TutuItem.created_at,
+    'updated': TutuItem.updated_at.desc(),
+}
+
+class NotFoundError(LookupError):
+    """Raised when items or steps with the given IDs don't exist"""
+    
+    def __init__(self, kind: str, ids: Iterable[int]):
+        self.kind = kind
+        self.ids = sorted(ids)
+        super().__init__(f"{kind} with ID {', '.join(str(i) for i in self.ids)} not found")
+
+def in_directory(column, directory: str):
+    """SQL filter matching `directory` itself or anything below it.
+
+    Expressed as a string range instead of LIKE so that paths containing
+    `%` or `_` match literally. The index sees one range, [directory, upper);
+    the extra check drops siblings that sort inside it, like `/code-old` for
+    `/code`. (An OR of the two cases makes SQLite scan the whole table.)
+    """
+    directory, prefix, upper = directory_range(directory)
+    return and_(column >= directory, column < upper, or_(column == directory, column >= prefix))
+
+def _cascades(connection) -> bool:
+    """Whether deleting an item makes SQLite delete its steps and runs too"""
+    if not connection.exec_driver_sql("PRAGMA foreign_keys").scalar():
+        return False
+    for table in (TutuItemStep.__tablename__, TutuRun.__tablename__):
+        rules = [row[6] for row in connection.exec_driver_sql(f"PRAGMA foreign_key_list({table})") if row[2] == TutuItem.__tablename__]
+        if not rules or any(rule != 'CASCADE' for rule in rules):
+            return False
+    return True
+
+def normalize_tags(names: Iterable[str]) -> List[str]:
+    """Lower-cased, de-duplicated tag names; raises ValueError for empty names or ones with commas or spaces"""
+    tags = []
+    for name in names:
+        name = name.strip().lower()
+        if not name or ',' in name or any(char.isspace() for char in name):
+            raise ValueError(f"Invalid tag {name!r}: tags are single words without commas")
+        if name not in tags:
+            tags.append(name)
+    return tags
+
+def has_tags(item_id_column, tag_groups: Sequence[Sequence[str]]):
+    """SQL filters for tag groups: an item must carry at least one tag of every group.
+
+    [['infra'], ['urgent', 'quick']] means infra AND (urgent OR quick). Each
+    group becomes `id IN (items with those tags)`, read from the (tag_id,
+    item_id) index, so SQLite starts from the tagged items and looks them
+    up by primary key instead of checking every item.
+    """
+    conditions = []
+    for group in tag_groups:
+        conditions.append(item_id_column.in_(
+            select(TutuItemTag.item_id)
+            .join(TutuTag, TutuTag.id == TutuItemTag.tag_id)
+            .where(TutuTag.name.in_(normalize_tags(group)))
+        ))
+    return conditions
+
+def events_query(since: int = 0, item_id: Optional[int] = None, limit: Optional[int] = None):
+    """The change log after sequence number `since`, oldest first"""
+    events = TutuEvent.__table__
+    query = select(events).where(events.c.seq > since).order_by(events.c.seq)
+    if item_id is not None:
+        query = query.where(events.c.item_id == item_id)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+class TutuRepository:
+    """Items and steps in one tutu database, behind one session"""
+    
+    def __init__(self, db_path=None, session: Optional[Session] = None):
+        self.session = session if session is not None else get_session(db_path)
+        self._transaction_depth = 0
+        
+    def close(self):
+        self.session.close()
+        
+    def __enter__(self):
+        return self
+        
+    def __exit__(self, *exc_info):
+        self.close()
+        
+    @contextmanager
+    def transaction(self):
+        """Commit every write in the block together, or none of them if it raises"""
+        self._transaction_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._transaction_depth -= 1
+            self.session.rollback()
+            raise
+        self._transaction_depth -= 1
+        self._commit()
+        
+    def _commit(self):
+        # Inside transaction() only flush, so new rows get their IDs but
+        # nothing is committed until the block ends
+        if self._transaction_depth:
+            self.session.flush()
+        else:
+            self.session.commit()
+            
+    # Reading
+    
+    def get_item(self, item_id: int, with_steps: bool = False, with_text: bool = False) -> Optional[TutuItem]:
+        query = self.session.query(TutuItem).filter(TutuItem.id == item_id)
+        if with_steps:
+            query = query.options(selectinload(TutuItem.steps))
+        if with_text:
+            query = query.options(undefer_group('text'))
+        return query.first()
+        
+    def require_item(self, item_id: int, with_steps: bool = False, with_text: bool = False) -> TutuItem:
+        item = self.get_item(item_id, with_steps, with_text)
+        if item is None:
+            raise NotFoundError("TutuItem", [item_id])
+        return item
+        
+    def missing_item_ids(self, item_ids: Iterable[int]) -> List[int]:
+        """The IDs in `item_ids` that no item has"""
+        item_ids = set(item_ids)
+        found = self.session.execute(select(TutuItem.id).where(TutuItem.id.in_(item_ids))).scalars()
+        return sorted(item_ids - set(found))
+        
+    def _item_query(self, item_ids=None, statuses=None, exclude_statuses=None, directory=None, with_steps=False, with_text=False, order_by='id', tags=None):
+        query = self.session.query(TutuItem)
+        if tags:
+            query = query.filter(*has_tags(TutuItem.id, tags))
+        if with_steps:
+            query = query.options(selectinload(TutuItem.steps), selectinload(TutuItem.tags))
+        if with_text:
+            query = query.options(undefer_group('text'))
+        if item_ids:
+            query = query.filter(TutuItem.id.in_(item_ids))
+        if statuses:
+            query = query.filter(TutuItem.status.in_(statuses))
+        if exclude_statuses:
+            query = query.filter(TutuItem.status.not_in(exclude_statuses))
+        if directory:
+            query = query.filter(in_directory(TutuItem.working_directory, directory))
+        return query.order_by(ITEM_ORDERS[order_by])
+        
+    def query_items(
+        self,
+        item_ids: Optional[Sequence[int]] = None,
+        statuses: Optional[Sequence[str]] = None,
+        exclude_statuses: Optional[Sequence[str]] = None,
+        directory: Optional[str] = None,
+        with_steps: bool = False,
+        with_text: bool = False,
+        order_by: str = 'id',
+        tags: Optional[Sequence[Sequence[str]]] = None
+    ) -> List[TutuItem]:
+        """Items matching every given filter.
+
+        `directory` matches that directory and everything below it. With
+        `with_steps`, all of the items' steps and tags are fetched in one
+        more query each.
+        description and context are left out (and loaded per item on first
+        access) unless `with_text` is set. `order_by` is 'id', 'created' or
+        'updated' (newest first). `tags` is a list of tag groups, see
+        has_tags.
+        """
+        return self._item_query(item_ids, statuses, exclude_statuses, directory, with_steps, with_text, order_by, tags).all()
+        
+    def iter_items(self, batch_size: int = 500, **filters) -> Iterator[TutuItem]:
+        """Like query_items, but fetches rows `batch_size` at a time as you iterate"""
+        yield from self._item_query(**filters).yield_per(batch_size)
+        
+    # Writing
+    
+    def create_item(
+        self,
+        title: str,
+        description: Optional[str] = None,
+        context: Optional[str] = None,
+        working_directory: Optional[str] = None,
+        status: str = 'pending'
+    ) -> TutuItem:
+        item = TutuItem(
+            title=title,
+            description=description,
+            context=context,
+            status=status,
+            working_directory=working_directory
+        )
+        self.session.add(item)
+        self._commit()
+        return item
+        
+    def create_items(self, items: Iterable[dict]) -> List[TutuItem]:
+        """Create one item per dict of create_item arguments, in one flush"""
+        created = [TutuItem(**{'status': 'pending', **fields}) for fields in items]
+        self.session.add_all(created)
+        self._commit()
+        return created
+        
+    def update_item(self, item_id: int, **fields) -> TutuItem:
+        """Set any of title, description, context, status or working_directory"""
+        item = self.require_item(item_id)
+        for name, value in fields.items():
+            setattr(item, name, value)
+        self._commit()
+        return item
+        
+    def add_step(self, item_id: int, description: str) -> TutuItemStep:
+        return self.add_steps(item_id, [description])[0]
+        
+    def add_steps(self, item_id: int, descriptions: Iterable[str]) -> List[TutuItemStep]:
+        self.require_item(item_id)
+        steps = [TutuItemStep(item_id=item_id, description=description, status='pending') for description in descriptions]
+        self.session.add_all(steps)
+        self._commit()
+        return steps
+        
+    def complete_steps(self, step_ids: Sequence[int]) -> List[TutuItemStep]:
+        """Mark steps as done; raises NotFoundError (changing nothing) if any ID is unknown"""
+        steps = self.session.query(TutuItemStep).filter(TutuItemStep.id.in_(step_ids)).all()
+        missing = set(step_ids) - {step.id for step in steps}
+        if missing:
+            raise NotFoundError("Step", missing)
+        now = get_pacific_now()
+        for step in steps:
+            step.status = 'done'
+            step.completed_at = now
+        self._commit()
+        return steps
+        
+    # Tags
+    
+    def add_tags(self, item_id: int, names: Iterable[str]) -> List[str]:
+        """Tag an item, creating tags as needed; returns the tags it didn't have before"""
+        return self._change_tags(item_id, names, add=True)
+        
+    def remove_tags(self, item_id: int, names: Iterable[str]) -> List[str]:
+        """Untag an item; returns the tags it actually had"""
+        return self._change_tags(item_id, names, add=False)
+        
+    def _change_tags(self, item_id, names, add):
+        names = normalize_tags(names)
+        self.require_item(item_id)
+        current = set(self.item_tags([item_id]).get(item_id, []))
+        changed = [name for name in names if (name in current) != add]
+        if not changed:
+            return []
+        connection = self.session.connection()
+        links = TutuItemTag.__table__
+        if add:
+            connection.execute(insert(TutuTag.__table__).prefix_with("OR IGNORE"), [{'name': name} for name in changed])
+            connection.execute(
+                insert(links).from_select(
+                    ['item_id', 'tag_id'],
+                    select(literal(item_id), TutuTag.id).where(TutuTag.name.in_(changed))
+                )
+            )
+        else:
+            connection.execute(
+                delete(links).where(
+                    links.c.item_id == item_id,
+                    links.c.tag_id.in_(select(TutuTag.id).where(TutuTag.name.in_(changed)))
+                )
+            )
+        record_events(connection, [{
+            'entity': 'item',
+            'entity_id': item_id,
+            'item_id': item_id,
+            'action': 'updated',
+            'changes': {'fields': ['tags'], 'added' if add else 'removed': changed},
+        }])
+        touch_items(connection, [item_id])
+        self.session.expire_all()
+        self._commit()
+        return changed
+        
+    def item_tags(self, item_ids: Iterable[int]) -> dict:
+        """{item_id: [tag names]} for the given items, in one query"""
+        rows = self.session.execute(
+            select(TutuItemTag.item_id, TutuTag.name)
+            .join(TutuTag, TutuTag.id == TutuItemTag.tag_id)
+            .where(TutuItemTag.item_id.in_(list(item_ids)))
+            .order_by(TutuTag.name)
+        )
+        tags = {}
+        for item_id, name in rows:
+            tags.setdefault(item_id, []).append(name)
+        return tags
+        
+    def tag_counts(self) -> List[Tuple[str, int]]:
+        """(tag, number of items) for every tag in use"""
+        rows = self.session.execute(
+            select(TutuTag.name, func.count(TutuItemTag.item_id))
+            .join(TutuItemTag, TutuItemTag.tag_id == TutuTag.id)
+            .group_by(TutuTag.name)
+            .order_by(TutuTag.name)
+        )
+        return [tuple(row) for row in rows]
+        
+    # Edit history
+    
+    def revisions(self, item_id: int, field: Optional[str] = None) -> list:
+        """(field, version, kind, size, stored bytes, created_at) for each stored version, oldest first"""
+        self.require_item(item_id)
+        return list_revisions(self.session.connection(), item_id, field)
+        
+    def item_version(self, item_id: int, field: str, version: Optional[int] = None) -> Optional[str]:
+        """An item's title, description, context or working_directory as of `version` (default: the latest)"""
+        if field not in HISTORY_FIELDS:
+            raise ValueError(f"No history is kept for {field!r}; use {', '.join(HISTORY_FIELDS)}")
+        connection = self.session.connection()
+        versions = {row[1] for row in list_revisions(connection, item_id, field)}
+        if not versions or (version is not None and version not in versions):
+            raise NotFoundError(f"Version {version or 'history'} of {field} for TutuItem", [item_id])
+        value = revision_value(connection, item_id, field, version)
+        return None if value is UNKNOWN else value
+        
+    def prune_history(self, keep: int = DEFAULT_KEEP) -> int:
+        """Drop all but the last `keep` versions of every item field; returns the number removed"""
+        removed = prune(self.session.connection(), keep)
+        self._commit()
+        return removed
+        
+    # Set-based status changes
+    
+    def _item_conditions(self, item_ids=None, directory=None, current_status=None, older_than=None):
+        """WHERE clauses on tutu_items for a set-based change; at least one filter is required"""
+        items = TutuItem.__table__
+        conditions = []
+        if item_ids:
+            conditions.append(items.c.id.in_(item_ids))
+        if directory:
+            conditions.append(in_directory(items.c.working_directory, directory))
+        if current_status:
+            conditions.append(items.c.status == current_status)
+        if older_than:
+            conditions.append(items.c.updated_at < get_pacific_now() - timedelta(seconds=older_than))
+        if not conditions:
+            raise ValueError("Give item IDs or at least one filter")
+        return conditions
+        
+    def _status_targets(self, status, item_ids=None, directory=None, current_status=None, older_than=None, steps_of=None):
+        """(table, entity, item_id column, WHERE clauses) for a bulk status change"""
+        if steps_of is not None:
+            if item_ids or directory or current_status or older_than:
+                raise ValueError("steps_of can't be combined with item IDs or other filters")
+            steps = TutuItemStep.__table__
+            conditions = [steps.c.item_id == steps_of]
+            table, entity, item_column = steps, 'step', steps.c.item_id
+        else:
+            items = TutuItem.__table__
+            conditions = self._item_conditions(item_ids, directory, current_status, older_than)
+            table, entity, item_column = items, 'item', items.c.id
+        # Rows already in the target status are left alone
+        conditions.append(table.c.status.is_distinct_from(status))
+        return table, entity, item_column, conditions
+        
+    def preview_status_change(self, status: str, limit: int = 10, **filters) -> Tuple[int, list]:
+        """How many rows set_status would change, and (id, title or description, status) for the first `limit`"""
+        table, entity, _, conditions = self._status_targets(status, **filters)
+        label = table.c.title if entity == 'item' else table.c.description
+        count = self.session.execute(select(func.count()).select_from(table).where(*conditions)).scalar()
+        rows = self.session.execute(
+            select(table.c.id, label, table.c.status).where(*conditions).order_by(table.c.id).limit(limit)
+        ).all()
+        return count, [tuple(row) for row in rows]
+        
+    def set_status(
+        self,
+        status: str,
+        item_ids: Optional[Sequence[int]] = None,
+        directory: Optional[str] = None,
+        current_status: Optional[str] = None,
+        older_than: Optional[float] = None,
+        steps_of: Optional[int] = None
+    ) -> int:
+        """Move matching items, or every step of item `steps_of`, to `status`.
+
+        Filters combine with AND; `older_than` is in seconds since the last
+        update. Runs as one INSERT ... SELECT into the change log plus one
+        UPDATE, whatever the number of rows. Steps set to done get
+        completed_at, others lose it. Returns the number of rows changed.
+        """
+        table, entity, item_column, conditions = self._status_targets(
+            status, item_ids, directory, current_status, older_than, steps_of
+        )
+        values = {'status': status}
+        if entity == 'step':
+            values['completed_at'] = get_pacific_now() if status == 'done' else None
+            
+        now = get_pacific_now()
+        changes = json.dumps({'fields': sorted(values), 'status': status})
+        connection = self.session.connection()
+        connection.execute(
+            insert(TutuEvent.__table__).from_select(
+                ['entity', 'entity_id', 'item_id', 'action', 'changes', 'created_at'],
+                select(
+                    literal(entity), table.c.id, item_column, literal('updated'), literal(changes), literal(now, DateTime)
+                ).where(*conditions)
+            )
+        )
+        count = connection.execute(update(table).where(*conditions).values(**values, updated_at=now)).rowcount
+        if entity == 'step' and count:
+            touch_items(connection, [steps_of])
+        # The ORM copies of anything just updated are stale now
+        self.session.expire_all()
+        self._commit()
+        return count
+        
+    # Deleting
+    
+    def preview_delete(self, limit: int = 10, **filters) -> Tuple[int, int, list]:
+        """How many items and steps delete_items would remove, and (id, title, status) for the first `limit` items"""
+        items = TutuItem.__table__
+        steps = TutuItemStep.__table__
+        conditions = self._item_conditions(**filters)
+        matching = select(items.c.id).where(*conditions)
+        count = self.session.execute(select(func.count()).select_from(items).where(*conditions)).scalar()
+        step_count = self.session.execute(
+            select(func.count()).select_from(steps).where(steps.c.item_id.in_(matching))
+        ).scalar()
+        rows = self.session.execute(
+            select(items.c.id, items.c.title, items.c.status).where(*conditions).order_by(items.c.id).limit(limit)
+        ).all()
+        return count, step_count, [tuple(row) for row in rows]
+        
+    def delete_items(
+        self,
+        item_ids: Optional[Sequence[int]] = None,
+        directory: Optional[str] = None,
+        current_status: Optional[str] = None,
+        older_than: Optional[float] = None
+    ) -> int:
+        """Delete matching items with their steps and runs; returns the number of items deleted.
+
+        Filters combine as in set_status. One INSERT ... SELECT logs the
+        deletions and one DELETE removes the items, whatever their number;
+        ON DELETE CASCADE takes their steps and runs. On a database created
+        before the foreign keys had ON DELETE CASCADE (see
+        migrate_add_cascade_deletes.py), or with foreign keys off, steps and
+        runs are removed with their own set-based DELETEs first. No rows are
+        loaded into the session either way.
+        """
+        items = TutuItem.__table__
+        conditions = self._item_conditions(item_ids, directory, current_status, older_than)
+        matching = select(items.c.id).where(*conditions)
+        connection = self.session.connection()
+        
+        now = get_pacific_now()
+        connection.execute(
+            insert(TutuEvent.__table__).from_select(
+                ['entity', 'entity_id', 'item_id', 'action', 'changes', 'created_at'],
+                select(
+                    literal('item'), items.c.id, items.c.id, literal('deleted'), literal('{}'), literal(now, DateTime)
+                ).where(*conditions)
+            )
+        )
+        if not _cascades(connection):
+            for child in (TutuItemStep.__table__, TutuRun.__table__, TutuItemTag.__table__, TutuItemRevision.__table__):
+                connection.execute(delete(child).where(child.c.item_id.in_(matching)))
+        count = connection.execute(delete(items).where(*conditions)).rowcount
+        # Drop ORM copies of rows that no longer exist
+        self.session.expire_all()
+        self._commit()
+        return count
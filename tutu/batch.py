@@ -0,0 +1,446 @@
+"""Concurrent agent sessions for `tutu start-all`, with a live dashboard.
+
+Child output is read with asyncio so one quiet (or very chatty) session never
+stalls the others or the dashboard. Step progress is polled from the
+database, but only re-queried when `PRAGMA data_version` says another
+connection has written something.
+
+Items are claimed with a lease just before their session starts, so several
+start-all processes can drain the same queue: a claim is one conditional
+UPDATE, running items are heartbeated, and an item whose worker died becomes
+claimable again once its lease expires.
+
+A session that exits non-zero or leaves its item unfinished can be retried
+under a RetryPolicy; retries go to the back of the queue and wait out an
+exponential backoff before they start, keeping the item's lease meanwhile.
+
+With a deadline (`start-all --budget`), a session that wouldn't finish
+before it, going by the job's estimate, is deferred instead of started; that
+includes retries.
+"""
+import asyncio
+import os
+import socket
+import time
+from collections import deque
+from datetime import timedelta
+
+from rich.console import Group
+from rich.live import Live
+from rich.table import Table
+from rich.text import Text
+from rich import box
+from sqlalchemy import select, update, func, or_
+from sqlalchemy.orm import object_session
+
+from .models import TutuItem, TutuItemStep, TutuRun, get_pacific_now
+from .telemetry import AgentStreamParser
+from .utils import format_duration, format_run_summary
+
+# stream-json puts whole tool results on one line
+STREAM_LIMIT = 16 * 1024 * 1024
+DASHBOARD_REFRESH = 0.5
+QUEUED_ROWS_SHOWN = 10
+FINISHED_ROWS_SHOWN = 5
+DEFAULT_LEASE_SECONDS = 300
+# Job states in which this worker holds the item's lease
+HELD_STATES = ('running', 'retrying')
+
+class RetryPolicy:
+    """Which failed sessions get another attempt, and how long to wait first"""
+    
+    def __init__(self, max_attempts=1, backoff=30.0, exit_codes=None):
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        # None retries any failure; a session that exits 0 but leaves the
+        # item unfinished counts as exit code 0
+        self.exit_codes = set(exit_codes) if exit_codes else None
+        
+    def should_retry(self, job):
+        if job.attempts >= self.max_attempts:
+            return False
+        return self.exit_codes is None or job.return_code in self.exit_codes
+        
+    def delay(self, attempts):
+        """Seconds to wait before attempt `attempts + 1`: backoff, then doubling"""
+        return self.backoff * 2 ** (attempts - 1)
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def lease_available(now):
+    """Filter for items no other live worker holds"""
+    return or_(TutuItem.lease_owner.is_(None), TutuItem.lease_expires_at < now)
+
+def claim_item(session, item_id, owner, lease_seconds):
+    """Atomically take the lease on an unfinished item; False if someone else holds it"""
+    items = TutuItem.__table__
+    now = get_pacific_now()
+    claimed = session.execute(
+        update(items)
+        .where(
+            items.c.id == item_id,
+            items.c.status.is_distinct_from('done'),
+            or_(items.c.lease_owner.is_(None), items.c.lease_owner == owner, items.c.lease_expires_at < now)
+        )
+        # Leases are bookkeeping, not edits, so updated_at is left as it was
+        .values(lease_owner=owner, lease_expires_at=now + timedelta(seconds=lease_seconds), heartbeat_at=now, updated_at=items.c.updated_at)
+    ).rowcount
+    session.commit()
+    return claimed == 1
+
+def renew_leases(session, item_ids, owner, lease_seconds):
+    """Heartbeat: push out the expiry of every lease this worker still holds"""
+    items = TutuItem.__table__
+    now = get_pacific_now()
+    session.execute(
+        update(items)
+        .where(items.c.id.in_(item_ids), items.c.lease_owner == owner)
+        .values(lease_expires_at=now + timedelta(seconds=lease_seconds), heartbeat_at=now, updated_at=items.c.updated_at)
+    )
+    session.commit()
+
+def release_leases(session, item_ids, owner):
+    items = TutuItem.__table__
+    session.execute(
+        update(items)
+        .where(items.c.id.in_(item_ids), items.c.lease_owner == owner)
+        .values(lease_owner=None, lease_expires_at=None, heartbeat_at=None, updated_at=items.c.updated_at)
+    )
+    session.commit()
+
+class BatchJob:
+    """One item's agent session and what the dashboard knows about it"""
+    
+    def __init__(self, item, working_dir, context, cmd):
+        self.item = item
+        self.item_id = item.id
+        self.title = item.title
+        self.working_dir = working_dir
+        self.context = context
+        self.cmd = cmd
+        self.state = 'queued'
+        self.started = None
+        self.finished = None
+        self.bytes_out = 0
+        self.parser = None
+        self.steps_done = sum(1 for step in item.steps if step.status == 'done')
+        self.steps_total = len(item.steps)
+        self.stdout = ''
+        self.stderr = ''
+        self.return_code = None
+        self.run = None
+        self.runs = []
+        self.attempts = 0
+        self.retry_at = None
+        self.estimate = None
+        
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return None
+        return (self.finished or time.monotonic()) - self.started
+        
+    @property
+    def last_line(self):
+        return self.parser.last_line if self.parser else ""
+        
+    def result(self):
+        """The dict generate_html_report expects"""
+        return {
+            'item': self.item,
+            'stdout': self.stdout,
+            'stderr': self.stderr,
+            'return_code': self.return_code,
+            'steps_completed': [step for step in self.item.steps if step.status == 'done'],
+            'run': self.run,
+            'runs': self.runs,
+            'attempts': self.attempts
+        }
+
+async def _feed_stdin(process, context):
+    try:
+        process.stdin.write(context.encode('utf-8'))
+        await process.stdin.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        pass
+    finally:
+        process.stdin.close()
+
+async def run_job(job, console, worker_id, lease_seconds, retry):
+    """Claim the item, run one agent session to completion and record its TutuRun.
+    
+    Leaves the job in state 'retrying' (with retry_at set) when the session
+    failed and `retry` allows another attempt.
+    """
+    item = job.item
+    session = object_session(item)
+    
+    if not claim_item(session, job.item_id, worker_id, lease_seconds):
+        job.state = 'skipped'
+        return
+        
+    # Update status, first_progress_at and the attempt counter
+    item.status = 'in_progress'
+    if not item.first_progress_at:
+        item.first_progress_at = get_pacific_now()
+    item.attempts = (item.attempts or 0) + 1
+    session.commit()
+    
+    job.attempts += 1
+    job.run = TutuRun(item_id=job.item_id, started_at=get_pacific_now())
+    job.runs.append(job.run)
+    job.state = 'running'
+    job.started = time.monotonic()
+    job.finished = None
+    job.retry_at = None
+    job.bytes_out = 0
+    job.parser = AgentStreamParser(job.started)
+    process = None
+    
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *job.cmd,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=job.working_dir,
+            env={**os.environ},
+            limit=STREAM_LIMIT
+        )
+        stdin_task = asyncio.create_task(_feed_stdin(process, job.context))
+        stderr_task = asyncio.create_task(process.stderr.read())
+        
+        async for line in process.stdout:
+            job.bytes_out += len(line)
+            job.parser.feed(line.decode('utf-8', errors='replace'))
+            
+        await stdin_task
+        job.return_code = await process.wait()
+        job.stderr = (await stderr_task).decode('utf-8', errors='replace')
+        job.stdout = job.parser.output_text()
+        for field, value in job.parser.run_fields().items():
+            setattr(job.run, field, value)
+    except asyncio.CancelledError:
+        if process is not None and process.returncode is None:
+            process.kill()
+        raise
+    except Exception as e:
+        console.print(f"❌ [red]Error processing item #{job.item_id}: {e}[/red]")
+        job.stdout, job.stderr, job.return_code = '', str(e), -1
+        
+    job.finished = time.monotonic()
+    job.run.return_code = job.return_code
+    job.run.wall_seconds = job.finished - job.started
+    job.run.finished_at = get_pacific_now()
+    session.add(job.run)
+    session.commit()
+    
+    # Refresh item from database to get latest status
+    session.refresh(item)
+    job.steps_done = sum(1 for step in item.steps if step.status == 'done')
+    job.steps_total = len(item.steps)
+    succeeded = job.return_code == 0 and item.status == 'done'
+    
+    if not succeeded and retry.should_retry(job):
+        # The lease is kept (and heartbeated) through the backoff, so no
+        # other worker picks the item up between attempts
+        delay = retry.delay(job.attempts)
+        job.state = 'retrying'
+        job.retry_at = time.monotonic() + delay
+        console.print(
+            f"🔁 [yellow]Item #{job.item_id} {'failed' if job.return_code else 'is not done'} "
+            f"(exit {job.return_code}); retrying in {format_duration(delay)} "
+            f"(attempt {job.attempts + 1}/{retry.max_attempts})[/yellow]"
+        )
+        return
+        
+    release_leases(session, [job.item_id], worker_id)
+    job.state = 'finished' if job.return_code == 0 else 'failed'
+    
+    if job.return_code != -1:
+        console.print(
+            f"✅ [green]Completed processing item #{job.item_id}[/green] "
+            f"[dim]({format_run_summary(job.run)}{f', {job.attempts} attempts' if job.attempts > 1 else ''})[/dim]"
+        )
+
+class StepPoller:
+    """Keeps running jobs' step counts current with one cheap check per tick"""
+    
+    def __init__(self, jobs):
+        self.connections = {}
+        for job in jobs:
+            engine = object_session(job.item).get_bind()
+            if engine not in self.connections:
+                self.connections[engine] = [engine.connect(), None]
+                
+    def poll(self, jobs):
+        steps = TutuItemStep.__table__
+        for engine, state in self.connections.items():
+            connection, last_version = state
+            version = connection.exec_driver_sql("PRAGMA data_version").scalar()
+            if version == last_version:
+                continue
+            state[1] = version
+            running = {
+                job.item_id: job for job in jobs
+                if job.state == 'running' and object_session(job.item).get_bind() is engine
+            }
+            if not running:
+                continue
+            rows = connection.execute(
+                select(steps.c.item_id, func.count(), func.sum(steps.c.status == 'done'))
+                .where(steps.c.item_id.in_(list(running)))
+                .group_by(steps.c.item_id)
+            )
+            for item_id, total, done in rows:
+                running[item_id].steps_total = total
+                running[item_id].steps_done = done or 0
+            connection.rollback()
+            
+    def close(self):
+        for connection, _ in self.connections.values():
+            connection.close()
+
+def _format_bytes(count):
+    if count < 1024:
+        return f"{count} B"
+    if count < 1024 * 1024:
+        return f"{count / 1024:.1f} KB"
+    return f"{count / 1024 / 1024:.1f} MB"
+
+def render_dashboard(jobs, batch_started, concurrency):
+    running = [job for job in jobs if job.state == 'running']
+    queued = [job for job in jobs if job.state == 'queued']
+    retrying = sorted((job for job in jobs if job.state == 'retrying'), key=lambda job: job.retry_at)
+    finished = sorted((job for job in jobs if job.state in ('finished', 'failed')), key=lambda job: job.finished)
+    
+    table = Table(show_header=True, header_style="bold magenta", box=box.ROUNDED, expand=True)
+    table.add_column("ID", style="cyan", width=5)
+    table.add_column("Title", style="white", max_width=30, no_wrap=True)
+    table.add_column("State", width=10)
+    table.add_column("Elapsed", style="blue", justify="right", width=8)
+    table.add_column("Output", style="green", justify="right", width=9)
+    table.add_column("Steps", style="green", justify="center", width=6)
+    table.add_column("Last output", style="dim white", no_wrap=True, ratio=1)
+    
+    state_styles = {'running': "[yellow]🚀 running[/yellow]", 'queued': "[blue]📋 queued[/blue]",
+                    'finished': "[green]✅ done[/green]", 'failed': "[red]❌ failed[/red]",
+                    'skipped': "[dim]🔒 claimed[/dim]", 'retrying': "[magenta]🔁 retry[/magenta]",
+                    'deferred': "[dim]⏭️  deferred[/dim]"}
+                    
+    def add_row(job, note=None):
+        table.add_row(
+            str(job.item_id),
+            job.title,
+            state_styles[job.state],
+            format_duration(job.elapsed) if job.started else "",
+            _format_bytes(job.bytes_out) if job.started else "",
+            f"{job.steps_done}/{job.steps_total}",
+            note if note is not None else job.last_line
+        )
+        
+    for job in running:
+        add_row(job)
+    for job in queued[:QUEUED_ROWS_SHOWN]:
+        add_row(job)
+    if len(queued) > QUEUED_ROWS_SHOWN:
+        table.add_row("", f"[dim]+{len(queued) - QUEUED_ROWS_SHOWN} more queued[/dim]", "", "", "", "", "")
+    for job in retrying:
+        add_row(job, f"attempt {job.attempts + 1} in {format_duration(max(job.retry_at - time.monotonic(), 0))}")
+    for job in finished[-FINISHED_ROWS_SHOWN:]:
+        add_row(job)
+        
+    elapsed = time.monotonic() - batch_started
+    failed = sum(1 for job in finished if job.state == 'failed')
+    skipped = sum(1 for job in jobs if job.state == 'skipped')
+    deferred = sum(1 for job in jobs if job.state == 'deferred')
+    summary = Text.from_markup(
+        f"[bold]{len(finished)}/{len(jobs) - skipped - deferred}[/bold] finished"
+        + (f" ([red]{failed} failed[/red])" if failed else "")
+        + (f" • {skipped} claimed by another worker" if skipped else "")
+        + (f" • {deferred} deferred past the budget" if deferred else "")
+        + f" • {len(running)} running • {len(queued)} queued"
+        + (f" • {len(retrying)} waiting to retry" if retrying else "")
+        + f" • elapsed {format_duration(elapsed)}"
+    )
+    
+    if finished:
+        average = sum(job.elapsed for job in finished) / len(finished)
+        throughput = len(finished) / elapsed * 3600 if elapsed > 0 else 0
+        # Queued work plus what is left of the running sessions, spread over the workers
+        remaining = (len(queued) + len(retrying)) * average + sum(max(average - job.elapsed, 0) for job in running)
+        summary.append_text(Text.from_markup(
+            f" • {throughput:.1f} items/h • ETA {format_duration(remaining / max(concurrency, 1))}"
+        ))
+        
+    return Group(table, summary)
+
+def _jobs_by_session(jobs):
+    grouped = {}
+    for job in jobs:
+        grouped.setdefault(object_session(job.item), []).append(job.item_id)
+    return grouped.items()
+
+async def run_batch(jobs, concurrency, console, worker_id=None, lease_seconds=DEFAULT_LEASE_SECONDS, retry=None, deadline=None):
+    """Run every job, at most `concurrency` at a time, behind a live dashboard.
+    
+    `deadline` is a time.monotonic() value sessions should be done by.
+    Returns report results for the jobs this worker ran (not those another
+    worker had claimed, nor those deferred past the deadline).
+    """
+    worker_id = worker_id or default_worker_id()
+    retry = retry or RetryPolicy()
+    queue = deque(jobs)
+    batch_started = time.monotonic()
+    last_heartbeat = batch_started
+    poller = StepPoller(jobs)
+    
+    async def worker():
+        while True:
+            if queue:
+                job = queue.popleft()
+                if deadline is not None:
+                    starts_at = max(time.monotonic(), job.retry_at or 0)
+                    if starts_at + (job.estimate or 0) > deadline:
+                        if job.state == 'retrying':
+                            release_leases(object_session(job.item), [job.item_id], worker_id)
+                        job.state = 'deferred'
+                        continue
+                if job.retry_at is not None:
+                    await asyncio.sleep(max(job.retry_at - time.monotonic(), 0))
+                await run_job(job, console, worker_id, lease_seconds, retry)
+                if job.state == 'retrying':
+                    queue.append(job)
+            elif any(job.state == 'running' for job in jobs):
+                # A running session may still fail and be requeued
+                await asyncio.sleep(DASHBOARD_REFRESH)
+            else:
+                return
+            
+    try:
+        with Live(render_dashboard(jobs, batch_started, concurrency), console=console, refresh_per_second=4) as live:
+            workers = [asyncio.create_task(worker()) for _ in range(max(1, min(concurrency, len(jobs))))]
+            pending = set(workers)
+            while pending:
+                done, pending = await asyncio.wait(pending, timeout=DASHBOARD_REFRESH)
+                for task in done:
+                    # Surface unexpected errors instead of silently losing a worker
+                    task.result()
+                if time.monotonic() - last_heartbeat >= lease_seconds / 3:
+                    last_heartbeat = time.monotonic()
+                    for session, item_ids in _jobs_by_session(job for job in jobs if job.state in HELD_STATES):
+                        renew_leases(session, item_ids, worker_id, lease_seconds)
+                poller.poll(jobs)
+                live.update(render_dashboard(jobs, batch_started, concurrency))
+    finally:
+        poller.close()
+        # Hand back anything still held (e.g. after Ctrl-C) rather than
+        # making other workers wait for the leases to expire
+        for session, item_ids in _jobs_by_session(job for job in jobs if job.state in HELD_STATES):
+            session.rollback()
+            release_leases(session, item_ids, worker_id)
+            
+    # A retry deferred past the deadline, or whose lease was lost anyway,
+    # still ran its earlier attempts
+    return [job.result() for job in jobs if job.attempts or job.state not in ('skipped', 'deferred')]
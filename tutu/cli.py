@@ -1,22 +1,47 @@
 import typer
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime
 import subprocess
 import os
+import time
+import json
+import sys
+import asyncio
 from pathlib import Path
 from rich.console import Console
 from rich.table import Table
-from rich.prompt import Prompt
+from rich.prompt import Prompt, Confirm
 from rich import print as rprint
 from rich.panel import Panel
 from rich.layout import Layout
 from rich.text import Text
+from rich.console import Group
+from rich.live import Live
+from rich.tree import Tree as RichTree
+from rich.markup import escape
 from rich import box
 import tempfile
+import shutil
 import webbrowser
+from sqlalchemy import select, insert, func
+from sqlalchemy.orm import Session, object_session, selectinload
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
-from .models import get_session, TutuItem, TutuItemStep, get_pacific_now
-from .utils import format_relative_time
+from .models import get_session, get_engine, get_db_path, fan_out, TutuItem, TutuItemStep, get_pacific_now, record_events, touch_items, make_excerpt, EVENT_VALUE_FIELDS
+from .utils import format_relative_time, format_duration, parse_duration
+from .report import generate_html_report
+from .stats import collect_stats
+from .snapshot import file_signature
+from .runner import load_runner
+from .digest import project_digest, enabled as digest_enabled
+from .history import HISTORY_FIELDS, DEFAULT_KEEP, UNKNOWN, record_revisions
+from .tree import directory_counts, build_tree
+from .maintenance import table_stats, file_stats, index_coverage, integrity_check, analyze, checkpoint, incremental_vacuum, enable_incremental_vacuum
+from .stress import run_stress, parse_mix, DEFAULT_MIX
+from .schedule import DurationModel, plan_batch
+from .batch import BatchJob, RetryPolicy, run_batch, lease_available, DEFAULT_LEASE_SECONDS
+from .api import TutuRepository, NotFoundError, in_directory, normalize_tags, has_tags, events_query
+from .config import registered_databases, CONFIG_FILENAME, MEMORY_DB
 
 app = typer.Typer()
 console = Console()
@@ -24,7 +49,7 @@ console = Console()
 @app.command()
 def add():
     """Add a new TutuItem interactively"""
-    session = get_session()
+    repo = TutuRepository()
     
     # Capture the current working directory
     current_dir = os.getcwd()
@@ -56,16 +81,7 @@ def add():
     
     context = "\n".join(context_lines)
     
-    item = TutuItem(
-        title=title,
-        description=description,
-        context=context,
-        status='pending',
-        working_directory=current_dir
-    )
-    
-    session.add(item)
-    session.commit()
+    item = repo.create_item(title, description, context, working_directory=current_dir)
     
     console.print(f"\n✅ [bold green]TutuItem created with ID: {item.id}[/bold green]")
     console.print(f"\n[bold]Title:[/bold] {item.title}")
@@ -73,48 +89,40 @@ def add():
     if item.context:
         console.print(f"[bold]Context:[/bold]\n{item.context}")
 
-@app.command()
-def list(
-    all: bool = typer.Option(False, "--all", help="Show all items including completed ones"),
-    everywhere: bool = typer.Option(False, "--everywhere", help="Show items from all directories, not just current"),
-    verbose: bool = typer.Option(False, "--verbose", help="Show detailed information including descriptions")
-):
-    """List all TutuItems (by default, only shows pending items)"""
-    session = get_session()
-    current_dir = os.path.abspath(os.getcwd())
-    
+def _query_list_items(session, all, everywhere, current_dir, tags=None):
+    """Fetch the items shown by `list`, scoped to current_dir unless everywhere"""
+    return TutuRepository(session=session).query_items(
+        exclude_statuses=None if all else ['done'],
+        directory=None if everywhere else current_dir,
+        with_steps=True,
+        order_by='updated',
+        tags=tags
+    )
+
+TAG_HELP = "Only items with this tag; repeat for items with all of them, or use commas (infra,urgent) for any of them"
+
+def _tag_groups(tags):
+    """--tag values as tag groups for has_tags: repeated options AND, commas OR"""
+    if not tags:
+        return None
+    try:
+        return [normalize_tags(value.split(',')) for value in tags]
+    except ValueError as e:
+        console.print(f"❌ [red]{e}[/red]")
+        raise typer.Exit(1)
+
+def _empty_list_message(all, everywhere, current_dir):
+    """Message shown by `list` when there is nothing to display"""
+    if everywhere:
+        if all:
+            return f"📭 [yellow]No items found anywhere![/yellow]"
+        return f"🎉 [yellow]No pending items found anywhere![/yellow]"
     if all:
-        items = session.query(TutuItem).order_by(TutuItem.updated_at.desc()).all()
-    else:
-        items = session.query(TutuItem).filter(
-            TutuItem.status != 'done'
-        ).order_by(TutuItem.updated_at.desc()).all()
-    
-    # Filter items to only show those within the current directory hierarchy (unless --everywhere is used)
-    if not everywhere:
-        filtered_items = []
-        for item in items:
-            if item.working_directory:
-                item_dir = os.path.abspath(item.working_directory)
-                # Check if the item's directory is within the current directory or its subdirectories
-                if item_dir.startswith(current_dir + os.sep) or item_dir == current_dir:
-                    filtered_items.append(item)
-        
-        items = filtered_items
-    
-    if not items:
-        if everywhere:
-            if all:
-                console.print(f"📭 [yellow]No items found anywhere![/yellow]")
-            else:
-                console.print(f"🎉 [yellow]No pending items found anywhere![/yellow]")
-        else:
-            if all:
-                console.print(f"📭 [yellow]No items found in {current_dir} or its subdirectories![/yellow]")
-            else:
-                console.print(f"🎉 [yellow]No pending items in {current_dir} or its subdirectories![/yellow]")
-        return
-    
+        return f"📭 [yellow]No items found in {current_dir} or its subdirectories![/yellow]"
+    return f"🎉 [yellow]No pending items in {current_dir} or its subdirectories![/yellow]"
+
+def _build_list_table(items, all, everywhere, verbose):
+    """Build the rich table rendered by `list`"""
     title = "📋 All Tutu Items" if all else "📋 Pending Tutu Items"
     if everywhere:
         title += " (Everywhere)"
@@ -141,13 +149,16 @@ def list(
         # Show full working directory path
         working_dir = item.working_directory or "N/A"
         
-        # Show description, truncated if needed
-        description = item.description or ""
+        # The stored excerpt, so listings never load the full description
+        description = item.description_excerpt or ""
         
         # Build row data based on verbose flag
+        title = item.title
+        if item.tags:
+            title += f" [dim]{escape(' '.join('#' + tag.name for tag in item.tags))}[/dim]"
         row_data = [
             str(item.id),
-            item.title,
+            title,
             working_dir
         ]
         
@@ -163,34 +174,98 @@ def list(
         
         table.add_row(*row_data)
     
-    console.print(table)
+    return table
 
 @app.command()
-def status(item_id: int):
-    """Show full status report for a TutuItem"""
-    session = get_session()
+def list(
+    all: bool = typer.Option(False, "--all", help="Show all items including completed ones"),
+    everywhere: bool = typer.Option(False, "--everywhere", help="Show items from all directories, not just current"),
+    verbose: bool = typer.Option(False, "--verbose", help="Show detailed information including descriptions"),
+    watch: bool = typer.Option(False, "--watch", help="Keep the listing open and refresh it whenever the database changes"),
+    interval: float = typer.Option(0.5, "--interval", help="Seconds between change checks in --watch mode"),
+    tag: Optional[List[str]] = typer.Option(None, "--tag", help=TAG_HELP)
+):
+    """List all TutuItems (by default, only shows pending items)"""
+    current_dir = os.path.abspath(os.getcwd())
+    tags = _tag_groups(tag)
+    databases = _everywhere_databases() if everywhere else []
+    
+    if len(databases) > 1:
+        # Fan out over every registered database through one connection
+        session = None
+        
+        def query_items():
+            items = []
+            for _, connection in fan_out(databases):
+                db_session = Session(bind=connection)
+                items.extend(_query_list_items(db_session, all, everywhere, current_dir, tags))
+                db_session.close()
+            items.sort(key=lambda item: item.updated_at, reverse=True)
+            return items
+            
+        def version():
+            return tuple(file_signature(path) for path in databases)
+    else:
+        session = get_session()
+        version = None
+        
+        def query_items():
+            return _query_list_items(session, all, everywhere, current_dir, tags)
     
-    item = session.query(TutuItem).filter(TutuItem.id == item_id).first()
+    def render():
+        items = query_items()
+        if not items:
+            return Text.from_markup(_empty_list_message(all, everywhere, current_dir))
+        return _build_list_table(items, all, everywhere, verbose)
     
-    if not item:
-        console.print(f"❌ [red]TutuItem with ID {item_id} not found[/red]")
+    if watch:
+        _watch_database(session, render, interval, version)
         return
+        
+    items = query_items()
+    
+    if not items:
+        console.print(_empty_list_message(all, everywhere, current_dir))
+        return
+        
+    console.print(_build_list_table(items, all, everywhere, verbose))
+
+def default_listing():
+    """What bare `tutu` prints, captured as text (see tutu.snapshot)"""
+    with console.capture() as capture:
+        list(all=False, everywhere=False, verbose=False, watch=False, interval=0.5, tag=None)
+    return capture.get()
+
+def _everywhere_databases():
+    """Every database --everywhere should cover: the current one plus all registered ones"""
+    current = get_db_path()
+    if os.environ.get("TUTU_DB"):
+        # An explicitly chosen database (e.g. a throwaway one in tests) stands alone
+        return [current]
+    databases = registered_databases()
+    if current != MEMORY_DB and Path(current) not in databases:
+        databases.insert(0, Path(current))
+    return databases
+
+def _build_status_view(item):
+    """Build the full status report for a TutuItem as a single renderable"""
+    parts = []
     
     # Create a cute header with sparkles
     header = Text()
     header.append("✨ ", style="bright_yellow")
     header.append(f"TUTU STATUS infodump.   Full deets inbound.", style="bold bright_white")
     header.append(" ✨", style="bright_yellow")
-    console.print(Panel(header, border_style="bright_yellow", padding=(0, 2)))
-    console.print()
+    parts.append(Panel(header, border_style="bright_yellow", padding=(0, 2)))
+    parts.append(Text())
     
     # Title section with cute box
     title_text = Text()
     title_text.append("🎯 ", style="bright_cyan")
     title_text.append(f"TutuItem #{item.id}: ", style="bold bright_cyan")
     title_text.append(item.title, style="bold bright_white")
-    console.print(Panel(title_text, border_style="cyan", padding=(0, 1)))
-    console.print()
+    parts.append(Panel(title_text, border_style="cyan", padding=(0, 1)))
+    parts.append(Text())
     
     # Status info table - now using a proper table with borders
     status_table = Table(show_header=True, header_style="bold cyan", box=box.ROUNDED)
@@ -225,18 +300,30 @@ def status(item_id: int):
             "🏁 First Progress",
             f"[dim]{progress_relative}[/dim] • [bright_green]{item.first_progress_at.strftime('%Y-%m-%d %H:%M:%S')}[/bright_green]"
         )
+        
+    if item.lease_owner and item.lease_expires_at and item.lease_expires_at > get_pacific_now().replace(tzinfo=None):
+        status_table.add_row(
+            "🔒 Claimed By",
+            f"[yellow]{item.lease_owner}[/yellow] • [dim]heartbeat {format_relative_time(item.heartbeat_at)}[/dim]"
+        )
     
     if item.working_directory:
         status_table.add_row(
             "📂 Working Directory",
             f"[bright_cyan]{item.working_directory}[/bright_cyan]"
         )
+        
+    if item.tags:
+        status_table.add_row(
+            "🏷️  Tags",
+            f"[magenta]{escape(' '.join('#' + tag.name for tag in item.tags))}[/magenta]"
+        )
     
-    console.print(status_table)
+    parts.append(status_table)
     
     # Description section with cute formatting
     if item.description:
-        console.print()
+        parts.append(Text())
         desc_panel = Panel(
             item.description,
             title="📝 Description",
@@ -244,11 +331,11 @@ def status(item_id: int):
             border_style="bright_magenta",
             padding=(1, 2)
         )
-        console.print(desc_panel)
+        parts.append(desc_panel)
     
     # Context section with cute formatting
     if item.context:
-        console.print()
+        parts.append(Text())
         context_panel = Panel(
             item.context,
             title="🌟 Context",
@@ -256,11 +343,11 @@ def status(item_id: int):
             border_style="bright_yellow",
             padding=(1, 2)
         )
-        console.print(context_panel)
+        parts.append(context_panel)
     
     if item.steps:
-        console.print()
-        console.print("📝 [bold]TutuItemSteps:[/bold]")
+        parts.append(Text())
+        parts.append(Text.from_markup("📝 [bold]TutuItemSteps:[/bold]"))
         steps_table = Table(show_header=True, header_style="bold magenta", expand=False)
         steps_table.add_column("ID", style="cyan", width=4)
         steps_table.add_column("Description", style="white", max_width=50)
@@ -284,49 +371,143 @@ def status(item_id: int):
                 f"{updated_relative} • {step.updated_at.strftime('%m/%d %H:%M')}"
             )
         
-        console.print(steps_table)
+        parts.append(steps_table)
     else:
-        console.print("\n[yellow]No steps yet![/yellow]")
+        parts.append(Text.from_markup("\n[yellow]No steps yet![/yellow]"))
+        
+    return Group(*parts)
 
 @app.command()
-def start(item_id: int):
-    """Start a Claude Code session with TutuItem context"""
-    session = get_session()
-    
-    item = session.query(TutuItem).filter(TutuItem.id == item_id).first()
+def status(
+    item_ids: Optional[List[int]] = typer.Argument(None, help="IDs of the items to show"),
+    directory: Optional[str] = typer.Option(None, "--dir", help="Every item in this directory or below it"),
+    in_progress: bool = typer.Option(False, "--in-progress", help="Only items that are in progress (in the current directory tree unless --dir or --everywhere)"),
+    everywhere: bool = typer.Option(False, "--everywhere", help="With --in-progress or --tag, include items from all directories"),
+    tag: Optional[List[str]] = typer.Option(None, "--tag", help=TAG_HELP)
+):
+    """Show full status report for one or more TutuItems"""
+    if not item_ids and not directory and not in_progress and not tag:
+        console.print("❌ [red]Give one or more item IDs, --dir, --in-progress or --tag[/red]")
+        raise typer.Exit(1)
+    tags = _tag_groups(tag)
+    
+    if directory:
+        directory = os.path.abspath(os.path.expanduser(directory))
+    elif (in_progress or tags) and not item_ids and not everywhere:
+        directory = os.path.abspath(os.getcwd())
+        
+    # Items and all of their steps in two queries, however many are shown
+    items = TutuRepository().query_items(
+        item_ids=item_ids,
+        statuses=['in_progress'] if in_progress else None,
+        directory=directory,
+        with_steps=True,
+        with_text=True,
+        tags=tags
+    )
     
-    if not item:
-        console.print(f"❌ [red]TutuItem with ID {item_id} not found[/red]")
+    found = {item.id for item in items}
+    for item_id in item_ids or []:
+        if item_id not in found:
+            console.print(f"❌ [red]TutuItem with ID {item_id} not found[/red]")
+            
+    if not items:
+        if not item_ids:
+            console.print("📭 [yellow]No matching TutuItems found![/yellow]")
         return
+        
+    views = []
+    for item in items:
+        if views:
+            views.append(Text())
+        views.append(_build_status_view(item))
+    console.print(Group(*views))
+
+def _watch_database(session, render, interval, version=None):
+    """Keep a Live display of render() up to date until interrupted.
+    
+    `PRAGMA data_version` changes whenever another connection commits to the
+    database, so polling it on our one open connection is nearly free and we
+    only re-query and re-render when something was actually written.
+    Pass `version` to use a different change marker.
+    """
+    if version is None:
+        connection = session.connection()
+        
+        def version():
+            return connection.exec_driver_sql("PRAGMA data_version").scalar()
+            
+    last_version = None
     
-    # Use the item's working directory if available, otherwise use current directory
-    working_dir = item.working_directory if item.working_directory else os.getcwd()
-    
-    # Update status and first_progress_at
-    item.status = 'in_progress'
-    if not item.first_progress_at:
-        item.first_progress_at = get_pacific_now()
-    
-    session.commit()
-    
-    console.print(f"🚀 [bold green]Starting Claude Code session for TutuItem #{item.id}[/bold green]\n")
-    
-    if working_dir != os.getcwd():
-        console.print(f"📂 [cyan]Changing to working directory: {working_dir}[/cyan]\n")
-    
-    # Read README.md
-    readme_path = Path(__file__).parent.parent / "README.md"
-    readme_content = ""
-    if readme_path.exists():
-        readme_content = readme_path.read_text()
-    
-    # Read TUTU_START_PROMPT.md
-    tutu_prompt_path = Path(__file__).parent.parent / "TUTU_START_PROMPT.md"
-    tutu_prompt_content = ""
-    if tutu_prompt_path.exists():
-        tutu_prompt_content = tutu_prompt_path.read_text()
+    def with_footer(renderable, changed_at):
+        footer = Text.from_markup(
+            f"\n👀 [dim]Watching for changes • last update {changed_at.strftime('%H:%M:%S')} • Ctrl+C to stop[/dim]"
+        )
+        return Group(renderable, footer)
+        
+    try:
+        with Live(console=console, refresh_per_second=4, auto_refresh=False) as live:
+            while True:
+                current_version = version()
+                if current_version != last_version:
+                    last_version = current_version
+                    # Drop cached ORM state so the next render reads fresh rows
+                    if session is not None:
+                        session.expire_all()
+                    live.update(with_footer(render(), get_pacific_now()), refresh=True)
+                time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+
+@app.command()
+def watch(
+    item_id: int,
+    interval: float = typer.Option(0.5, "--interval", help="Seconds between change checks")
+):
+    """Live status view for a TutuItem that updates as the database changes"""
+    repo = TutuRepository()
     
-    # Prepare context for Claude Code
+    if not repo.get_item(item_id):
+        console.print(f"❌ [red]TutuItem with ID {item_id} not found[/red]")
+        return
+        
+    def render():
+        item = repo.get_item(item_id, with_steps=True)
+        if not item:
+            return Text.from_markup(f"❌ [red]TutuItem with ID {item_id} no longer exists[/red]")
+        return _build_status_view(item)
+        
+    _watch_database(repo.session, render, interval)
+
+def _read_prompt_file(name):
+    """Read one of the markdown files shipped next to the tutu package"""
+    path = Path(__file__).parent.parent / name
+    if path.exists():
+        return path.read_text()
+    return ""
+
+def _load_runner():
+    """The configured agent runner (see tutu.runner); exits on a bad [runner] table"""
+    try:
+        return load_runner()
+    except (ValueError, TypeError) as e:
+        console.print(f"❌ [red]Invalid runner configuration: {e}[/red]")
+        raise typer.Exit(1)
+
+def _item_db_path(item):
+    """Path of the database an item was loaded from"""
+    return object_session(item).get_bind().url.database
+
+_digests = {}
+
+def _project_digest(working_dir):
+    """Digest of the item's repository, built once per directory per process"""
+    if working_dir not in _digests:
+        _digests[working_dir] = project_digest(working_dir) if digest_enabled(working_dir) else None
+    return _digests[working_dir]
+
+def _build_item_context(item, working_dir, readme_content, tutu_prompt_content, batch_prompt_content=None):
+    """The prompt handed to Claude Code for an item"""
     context = f"""# TutuItem #{item.id}: {item.title}
 
 ## Status: {item.status}
@@ -344,19 +525,51 @@ def start(item_id: int):
     
     for step in item.steps:
         context += f"- [{step.status}] Step #{step.id}: {step.description}\n"
-    
+        
     if not item.steps:
         context += "No steps defined yet.\n"
-    
+        
+    digest = _project_digest(working_dir)
+    if digest:
+        context += f"\n## Project Digest:\n{digest}\n"
+        
     context += f"\n---\n<README>\n{readme_content}\n</README>\n\n---\n{tutu_prompt_content}\n"
     
-    # Start Claude Code with the context using cly function
-    # First, cd to working directory, then source the daemon-wrappers script and run cly
-    cmd = [
-        "/bin/zsh",
-        "-c",
-        f"cd '{working_dir}' && source /Users/dorkitude/a/scripts/daemon-wrappers.zsh && cly"
-    ]
+    if batch_prompt_content is not None:
+        context += f"\n---\n{batch_prompt_content}\n"
+        
+    return context
+
+@app.command()
+def start(item_id: int):
+    """Start a Claude Code session with TutuItem context"""
+    repo = TutuRepository()
+    session = repo.session
+    
+    item = repo.get_item(item_id)
+    
+    if not item:
+        console.print(f"❌ [red]TutuItem with ID {item_id} not found[/red]")
+        return
+    
+    # Use the item's working directory if available, otherwise use current directory
+    working_dir = item.working_directory if item.working_directory else os.getcwd()
+    cmd = _load_runner().interactive_command(item.id, working_dir, _item_db_path(item))
+    
+    # Update status and first_progress_at
+    item.status = 'in_progress'
+    if not item.first_progress_at:
+        item.first_progress_at = get_pacific_now()
+    
+    session.commit()
+    
+    console.print(f"🚀 [bold green]Starting Claude Code session for TutuItem #{item.id}[/bold green]\n")
+    
+    if working_dir != os.getcwd():
+        console.print(f"📂 [cyan]Changing to working directory: {working_dir}[/cyan]\n")
+    
+    # Prepare context for Claude Code
+    context = _build_item_context(item, working_dir, _read_prompt_file("README.md"), _read_prompt_file("TUTU_START_PROMPT.md"))
     
     try:
         process = subprocess.Popen(
@@ -376,9 +589,9 @@ def start(item_id: int):
 @app.command()
 def add_step(item_id: int, description: Optional[str] = None):
     """Add a step to a TutuItem"""
-    session = get_session()
+    repo = TutuRepository()
     
-    item = session.query(TutuItem).filter(TutuItem.id == item_id).first()
+    item = repo.get_item(item_id)
     
     if not item:
         console.print(f"❌ [red]TutuItem with ID {item_id} not found[/red]")
@@ -403,55 +616,297 @@ def add_step(item_id: int, description: Optional[str] = None):
             console.print("❌ [red]Step description cannot be empty[/red]")
             return
     
-    step = TutuItemStep(
-        item_id=item_id,
-        description=description,
-        status='pending'
-    )
-    
-    session.add(step)
-    session.commit()
+    step = repo.add_step(item_id, description)
     
     console.print(f"✅ [green]Step added with ID: {step.id}[/green]")
 
 @app.command()
-def complete_step(step_id: int):
-    """Mark a TutuItemStep as done"""
-    session = get_session()
-    
-    step = session.query(TutuItemStep).filter(TutuItemStep.id == step_id).first()
-    
-    if not step:
-        console.print(f"❌ [red]Step with ID {step_id} not found[/red]")
+def complete_step(step_ids: List[int] = typer.Argument(..., help="IDs of the steps to mark as done")):
+    """Mark one or more TutuItemSteps as done"""
+    try:
+        TutuRepository().complete_steps(step_ids)
+    except NotFoundError as e:
+        console.print(f"❌ [red]{e}[/red]")
         return
-    
-    step.status = 'done'
-    session.commit()
-    
-    console.print(f"✅ [green]Step #{step_id} marked as done[/green]")
+        
+    if len(step_ids) == 1:
+        console.print(f"✅ [green]Step #{step_ids[0]} marked as done[/green]")
+    else:
+        console.print(f"✅ [green]Steps {', '.join(f'#{step_id}' for step_id in step_ids)} marked as done[/green]")
+
+def _bulk_transition(target, item_ids, directory, status, older_than, steps_of, dry_run):
+    """Move every matching item (or every step of one item) to `target`.
+    
+    Returns (count, noun, IDs not found), or None when nothing was changed
+    (dry run).
+    """
+    filters = {'item_ids': item_ids, 'current_status': status, 'steps_of': steps_of}
+    if directory:
+        filters['directory'] = os.path.abspath(os.path.expanduser(directory))
+    if older_than:
+        try:
+            filters['older_than'] = parse_duration(older_than)
+        except ValueError as e:
+            console.print(f"❌ [red]{e}[/red]")
+            raise typer.Exit(1)
+    noun = f"step(s) of TutuItem #{steps_of}" if steps_of is not None else "TutuItem(s)"
+    
+    repo = TutuRepository()
+    missing = []
+    if item_ids and steps_of is None:
+        missing = repo.missing_item_ids(item_ids)
+        for item_id in missing:
+            console.print(f"❌ [red]TutuItem with ID {item_id} not found[/red]")
+            
+    try:
+        if dry_run:
+            count, preview = repo.preview_status_change(target, **filters)
+            console.print(f"🔍 [cyan]Would mark {count} {noun} as {target}[/cyan]")
+            for row_id, label, row_status in preview:
+                console.print(f"  [dim]#{row_id}[/dim] {escape(label or '')} [dim]({row_status})[/dim]")
+            if count > len(preview):
+                console.print(f"  [dim]… and {count - len(preview)} more[/dim]")
+            return None
+        return repo.set_status(target, **filters), noun, missing
+    except ValueError:
+        if steps_of is not None:
+            console.print("❌ [red]--steps-of can't be combined with item IDs or other filters[/red]")
+        else:
+            console.print("❌ [red]Give one or more item IDs or a filter (--dir, --status, --older-than, --steps-of)[/red]")
+        raise typer.Exit(1)
 
 @app.command()
-def done(item_id: int):
-    """Mark a TutuItem as done"""
-    session = get_session()
+def done(
+    item_ids: Optional[List[int]] = typer.Argument(None, help="IDs of the items to mark as done"),
+    directory: Optional[str] = typer.Option(None, "--dir", help="Every item in this directory or below it"),
+    status: Optional[str] = typer.Option(None, "--status", help="Only items with this status"),
+    older_than: Optional[str] = typer.Option(None, "--older-than", help="Only items not updated for this long (e.g. 2h, 7d)"),
+    steps_of: Optional[int] = typer.Option(None, "--steps-of", help="Mark every step of this item as done instead"),
+    dry_run: bool = typer.Option(False, "--dry-run", help="Show what would change without changing it")
+):
+    """Mark TutuItems (or all steps of one) as done"""
+    outcome = _bulk_transition('done', item_ids, directory, status, older_than, steps_of, dry_run)
+    if outcome is None:
+        return
+    count, noun, missing = outcome
     
-    item = session.query(TutuItem).filter(TutuItem.id == item_id).first()
+    if item_ids and len(item_ids) == 1 and steps_of is None:
+        if count:
+            console.print(f"✅ [green]TutuItem #{item_ids[0]} marked as done![/green] 🎉")
+        elif not missing:
+            console.print(f"✅ [yellow]TutuItem #{item_ids[0]} is already done[/yellow]")
+        return
+    console.print(f"✅ [green]Marked {count} {noun} as done![/green] 🎉")
+
+@app.command()
+def reset(
+    item_ids: Optional[List[int]] = typer.Argument(None, help="IDs of the items to put back to pending"),
+    directory: Optional[str] = typer.Option(None, "--dir", help="Every item in this directory or below it"),
+    status: Optional[str] = typer.Option(None, "--status", help="Only items with this status"),
+    older_than: Optional[str] = typer.Option(None, "--older-than", help="Only items not updated for this long (e.g. 2h, 7d)"),
+    steps_of: Optional[int] = typer.Option(None, "--steps-of", help="Put every step of this item back to pending instead"),
+    dry_run: bool = typer.Option(False, "--dry-run", help="Show what would change without changing it")
+):
+    """Put TutuItems (or all steps of one) back to pending"""
+    outcome = _bulk_transition('pending', item_ids, directory, status, older_than, steps_of, dry_run)
+    if outcome is None:
+        return
+    count, noun, missing = outcome
     
-    if not item:
+    if item_ids and len(item_ids) == 1 and steps_of is None:
+        if count:
+            console.print(f"🔄 [green]TutuItem #{item_ids[0]} reset to pending[/green]")
+        elif not missing:
+            console.print(f"🔄 [yellow]TutuItem #{item_ids[0]} is already pending[/yellow]")
+        return
+    console.print(f"🔄 [green]Reset {count} {noun} to pending[/green]")
+
+@app.command()
+def rm(
+    item_ids: Optional[List[int]] = typer.Argument(None, help="IDs of the items to delete"),
+    directory: Optional[str] = typer.Option(None, "--dir", help="Every item in this directory or below it"),
+    status: Optional[str] = typer.Option(None, "--status", help="Only items with this status"),
+    older_than: Optional[str] = typer.Option(None, "--older-than", help="Only items not updated for this long (e.g. 30d)"),
+    dry_run: bool = typer.Option(False, "--dry-run", help="Show what would be deleted without deleting it"),
+    yes: bool = typer.Option(False, "--yes", "-y", help="Don't ask for confirmation")
+):
+    """Delete TutuItems with their steps and runs"""
+    filters = {'item_ids': item_ids, 'current_status': status}
+    if directory:
+        filters['directory'] = os.path.abspath(os.path.expanduser(directory))
+    if older_than:
+        try:
+            filters['older_than'] = parse_duration(older_than)
+        except ValueError as e:
+            console.print(f"❌ [red]{e}[/red]")
+            raise typer.Exit(1)
+            
+    repo = TutuRepository()
+    if item_ids:
+        for missing in repo.missing_item_ids(item_ids):
+            console.print(f"❌ [red]TutuItem with ID {missing} not found[/red]")
+            
+    try:
+        count, step_count, preview = repo.preview_delete(**filters)
+    except ValueError:
+        console.print("❌ [red]Give one or more item IDs or a filter (--dir, --status, --older-than)[/red]")
+        raise typer.Exit(1)
+    if not count:
+        console.print("📭 [yellow]No matching TutuItems to delete[/yellow]")
+        return
+        
+    if dry_run or not yes:
+        console.print(f"🗑️  [cyan]{'Would delete' if dry_run else 'About to delete'} {count} TutuItem(s) and {step_count} step(s)[/cyan]")
+        for row_id, title, row_status in preview:
+            console.print(f"  [dim]#{row_id}[/dim] {escape(title)} [dim]({row_status})[/dim]")
+        if count > len(preview):
+            console.print(f"  [dim]… and {count - len(preview)} more[/dim]")
+        if dry_run:
+            return
+        if not Confirm.ask("Delete them?", default=False):
+            return
+            
+    started = time.perf_counter()
+    deleted = repo.delete_items(**filters)
+    console.print(f"🗑️  [green]Deleted {deleted} TutuItem(s) with their steps[/green] [dim]({_format_ms(time.perf_counter() - started)})[/dim]")
+
+@app.command()
+def tag(
+    item_id: int = typer.Argument(..., help="ID of the item to tag"),
+    tags: List[str] = typer.Argument(..., help="Tags to add")
+):
+    """Add tags to a TutuItem"""
+    repo = TutuRepository()
+    try:
+        added = repo.add_tags(item_id, tags)
+    except NotFoundError:
+        console.print(f"❌ [red]TutuItem with ID {item_id} not found[/red]")
+        raise typer.Exit(1)
+    except ValueError as e:
+        console.print(f"❌ [red]{e}[/red]")
+        raise typer.Exit(1)
+    current = repo.item_tags([item_id]).get(item_id, [])
+    if added:
+        console.print(f"🏷️  [green]Tagged TutuItem #{item_id} with {escape(', '.join(added))}[/green] [dim](now: {escape(' '.join('#' + name for name in current))})[/dim]")
+    else:
+        console.print(f"🏷️  [yellow]TutuItem #{item_id} already has those tags[/yellow]")
+
+@app.command()
+def untag(
+    item_id: int = typer.Argument(..., help="ID of the item to untag"),
+    tags: List[str] = typer.Argument(..., help="Tags to remove")
+):
+    """Remove tags from a TutuItem"""
+    repo = TutuRepository()
+    try:
+        removed = repo.remove_tags(item_id, tags)
+    except NotFoundError:
         console.print(f"❌ [red]TutuItem with ID {item_id} not found[/red]")
+        raise typer.Exit(1)
+    except ValueError as e:
+        console.print(f"❌ [red]{e}[/red]")
+        raise typer.Exit(1)
+    if removed:
+        console.print(f"🏷️  [green]Removed {escape(', '.join(removed))} from TutuItem #{item_id}[/green]")
+    else:
+        console.print(f"🏷️  [yellow]TutuItem #{item_id} has none of those tags[/yellow]")
+
+@app.command()
+def tags():
+    """List every tag in use and how many items carry it"""
+    counts = TutuRepository().tag_counts()
+    if not counts:
+        console.print("🏷️  [yellow]No tags yet — add some with `tutu tag <id> <tag>...`[/yellow]")
         return
+    table = Table(title="🏷️  Tags", show_header=True, header_style="bold magenta", box=box.ROUNDED)
+    table.add_column("Tag", style="magenta")
+    table.add_column("Items", style="cyan", justify="right")
+    for name, count in counts:
+        table.add_row(escape(name), str(count))
+    console.print(table)
+
+@app.command()
+def history(
+    item_id: Optional[int] = typer.Argument(None, help="TutuItem whose edit history to show"),
+    field: Optional[str] = typer.Option(None, "--field", "-f", help=f"Only this field: {', '.join(HISTORY_FIELDS)}"),
+    version: Optional[int] = typer.Option(None, "--version", "-v", help="Print this version of --field in full"),
+    prune: bool = typer.Option(False, "--prune", help="Compact the history of every item down to the last --keep versions of each field"),
+    keep: int = typer.Option(DEFAULT_KEEP, "--keep", help="Versions of each field --prune keeps")
+):
+    """Show the edit history of a TutuItem, print an old version, or prune old versions"""
+    repo = TutuRepository()
     
-    item.status = 'done'
-    session.commit()
-    
-    console.print(f"✅ [green]TutuItem #{item_id} marked as done![/green] 🎉")
+    if prune:
+        try:
+            removed = repo.prune_history(keep)
+        except ValueError as e:
+            console.print(f"❌ [red]{e}[/red]")
+            raise typer.Exit(1)
+        console.print(f"🧹 [green]Removed {removed} old versions; kept the last {keep} of each field[/green]")
+        return
+        
+    if item_id is None:
+        console.print("❌ [red]Give a TutuItem ID, or --prune[/red]")
+        raise typer.Exit(1)
+    if field is not None and field not in HISTORY_FIELDS:
+        console.print(f"❌ [red]--field must be one of: {', '.join(HISTORY_FIELDS)}[/red]")
+        raise typer.Exit(1)
+        
+    try:
+        if version is not None:
+            if field is None:
+                console.print("❌ [red]--version needs --field[/red]")
+                raise typer.Exit(1)
+            value = repo.item_version(item_id, field, version)
+            # Plain output, so it can be redirected or diffed
+            print(value if value is not None else "")
+            return
+        revisions = repo.revisions(item_id, field)
+    except NotFoundError as e:
+        console.print(f"❌ [red]{e}[/red]")
+        raise typer.Exit(1)
+        
+    if not revisions:
+        console.print(f"📜 [yellow]No edits recorded for TutuItem #{item_id}[/yellow]")
+        return
+        
+    table = Table(title=f"📜 History of TutuItem #{item_id}", show_header=True, header_style="bold magenta", box=box.ROUNDED)
+    table.add_column("Field", style="cyan")
+    table.add_column("Version", justify="right")
+    table.add_column("When", style="dim")
+    table.add_column("Size", justify="right")
+    table.add_column("Stored", style="green", no_wrap=True)
+    for name, number, kind, size, stored, created_at in revisions:
+        table.add_row(
+            name,
+            str(number),
+            format_relative_time(created_at),
+            f"{size:,} chars" if size is not None else "(cleared)",
+            f"{kind}, {stored:,} bytes"
+        )
+    console.print(table)
+    console.print("[dim]Print a version with `tutu history <id> --field <field> --version <n>`[/dim]")
+
+@app.command()
+def digest(
+    directory: Optional[str] = typer.Option(None, "--dir", help="Directory to summarize (default: current directory)")
+):
+    """Show the project digest that start and start-all give the agent"""
+    directory = os.path.abspath(directory or os.getcwd())
+    text = project_digest(directory)
+    if text is None:
+        console.print(f"📦 [yellow]{escape(directory)} is not inside a git repository, so it has no digest[/yellow]")
+        return
+    console.print(Panel(escape(text), title="📦 Project Digest", border_style="cyan"))
+    if not digest_enabled(directory):
+        console.print("[dim]Digests are turned off here, so sessions won't include it[/dim]")
 
 @app.command()
 def edit(item_id: int):
     """Edit a TutuItem interactively"""
-    session = get_session()
+    repo = TutuRepository()
     
-    item = session.query(TutuItem).filter(TutuItem.id == item_id).first()
+    item = repo.get_item(item_id)
     
     if not item:
         console.print(f"❌ [red]TutuItem with ID {item_id} not found[/red]")
@@ -490,11 +945,7 @@ def edit(item_id: int):
     new_context = "\n".join(context_lines) if context_lines else item.context
     
     # Update the item
-    item.title = new_title
-    item.description = new_description
-    item.context = new_context
-    
-    session.commit()
+    repo.update_item(item.id, title=new_title, description=new_description, context=new_context)
     
     console.print(f"\n✅ [bold green]TutuItem #{item.id} updated successfully![/bold green]")
     console.print(f"\n[bold]Title:[/bold] {item.title}")
@@ -505,10 +956,10 @@ def edit(item_id: int):
 @app.command(name="import")
 def import_item(item_id: int):
     """Import a TutuItem by changing its working directory to the current directory"""
-    session = get_session()
+    repo = TutuRepository()
     current_dir = os.path.abspath(os.getcwd())
     
-    item = session.query(TutuItem).filter(TutuItem.id == item_id).first()
+    item = repo.get_item(item_id)
     
     if not item:
         console.print(f"❌ [red]TutuItem with ID {item_id} not found[/red]")
@@ -518,158 +969,837 @@ def import_item(item_id: int):
     old_dir = item.working_directory or "(not set)"
     
     # Update the working directory
-    item.working_directory = current_dir
-    session.commit()
+    repo.update_item(item.id, working_directory=current_dir)
     
     console.print(f"\n✨ [bold green]Successfully imported TutuItem #{item.id}![/bold green]")
     console.print(f"[bold]Title:[/bold] {item.title}")
     console.print(f"[bold]Previous directory:[/bold] {old_dir}")
     console.print(f"[bold]New directory:[/bold] {current_dir}")
 
-@app.command(name="start-all")
-def start_all(
-    everywhere: bool = typer.Option(False, "--everywhere", help="Process items from all directories, not just current")
+@app.command()
+def init(
+    path: Optional[str] = typer.Option(None, "--path", help="Database file for this project (relative to the project root, or :memory:)")
 ):
-    """Run all pending TutuItems in batch mode and generate HTML report"""
-    session = get_session()
-    current_dir = os.path.abspath(os.getcwd())
+    """Give the current directory tree its own database via a .tutu.toml"""
+    current_dir = Path(os.getcwd())
+    config_path = current_dir / CONFIG_FILENAME
     
-    # Get all pending items
-    pending_items = session.query(TutuItem).filter(
-        TutuItem.status.in_(['pending', 'in_progress'])
-    ).order_by(TutuItem.created_at).all()
+    if config_path.exists():
+        console.print(f"❌ [red]{config_path} already exists[/red]")
+        return
+        
+    if path:
+        config_path.write_text(f"[database]\npath = {json.dumps(path)}\n")
+    else:
+        config_path.write_text("[database]\nper_project = true\n")
+        
+    db_path = get_db_path()
+    if db_path != MEMORY_DB:
+        # Create the schema now so --everywhere can see this database right away
+        get_engine(db_path)
+        
+    console.print(f"✨ [bold green]Created {config_path}[/bold green]")
+    console.print(f"[bold]Database:[/bold] {db_path}")
+    console.print("[dim]Items added in this directory tree are now stored there; use --everywhere to include other databases.[/dim]")
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+def _parse_timestamp(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+@app.command()
+def export(
+    output: Optional[Path] = typer.Option(None, "--output", "-o", help="Write NDJSON to this file instead of stdout"),
+    everywhere: bool = typer.Option(False, "--everywhere", help="Export items from all directories, not just current"),
+    batch_size: int = typer.Option(1000, "--batch-size", help="Rows fetched from the database per round trip")
+):
+    """Stream items and their steps as NDJSON (all items first, then all steps)"""
+    engine = get_engine()
+    current_dir = os.path.abspath(os.getcwd())
+    items_table = TutuItem.__table__
+    steps_table = TutuItemStep.__table__
     
-    # Filter items to only process those within the current directory hierarchy (unless --everywhere is used)
+    items_query = select(items_table).order_by(items_table.c.id)
+    steps_query = select(steps_table).order_by(steps_table.c.item_id, steps_table.c.id)
     if not everywhere:
-        filtered_items = []
-        for item in pending_items:
-            if item.working_directory:
-                item_dir = os.path.abspath(item.working_directory)
-                # Check if the item's directory is within the current directory or its subdirectories
-                if item_dir.startswith(current_dir + os.sep) or item_dir == current_dir:
-                    filtered_items.append(item)
+        items_query = items_query.where(in_directory(items_table.c.working_directory, current_dir))
+        steps_query = steps_query.join(
+            items_table, items_table.c.id == steps_table.c.item_id
+        ).where(in_directory(items_table.c.working_directory, current_dir))
         
-        pending_items = filtered_items
+    out = open(output, 'w', encoding='utf-8') if output else sys.stdout
+    counts = {'item': 0, 'step': 0}
+    try:
+        with engine.connect() as conn:
+            # yield_per keeps only one batch of rows in memory at a time
+            streaming = conn.execution_options(stream_results=True, yield_per=batch_size)
+            for record_type, query in (('item', items_query), ('step', steps_query)):
+                for row in streaming.execute(query):
+                    record = {'type': record_type, **row._mapping}
+                    out.write(json.dumps(record, default=_json_default, ensure_ascii=False))
+                    out.write("\n")
+                    counts[record_type] += 1
+    finally:
+        if output:
+            out.close()
+            
+    if output:
+        console.print(f"📦 [green]Exported {counts['item']} items and {counts['step']} steps to {output}[/green]")
+
+LOAD_CONFLICT_MODES = ('renumber', 'skip', 'replace')
+
+@app.command()
+def load(
+    source: Optional[Path] = typer.Argument(None, help="NDJSON file to read (defaults to stdin)"),
+    on_conflict: str = typer.Option(
+        "renumber", "--on-conflict",
+        help="renumber: give loaded items and steps fresh IDs; skip: keep IDs and ignore rows whose ID exists; replace: keep IDs and overwrite existing rows"
+    ),
+    here: bool = typer.Option(False, "--here", help="Assign every loaded item to the current directory"),
+    chunk_size: int = typer.Option(5000, "--chunk-size", help="Rows inserted per transaction")
+):
+    """Bulk-load items and steps from NDJSON (as written by `tutu export`).
+    
+    Each line is an item (`{"title": ...}`, optionally with a nested
+    `"steps": [...]` list of descriptions or step objects) or a step
+    (`{"type": "step", "item_id": ...}`). Step `item_id`s refer to the IDs of
+    items earlier in the same stream.
+    """
+    if on_conflict not in LOAD_CONFLICT_MODES:
+        console.print(f"❌ [red]--on-conflict must be one of: {', '.join(LOAD_CONFLICT_MODES)}[/red]")
+        raise typer.Exit(1)
+        
+    engine = get_engine()
+    current_dir = os.path.abspath(os.getcwd())
+    items_table = TutuItem.__table__
+    steps_table = TutuItemStep.__table__
+    renumber = on_conflict == 'renumber'
+    
+    if renumber:
+        insert_item = insert(items_table)
+        insert_step = insert(steps_table)
+    elif on_conflict == 'skip':
+        insert_item = insert(items_table).prefix_with("OR IGNORE")
+        insert_step = insert(steps_table).prefix_with("OR IGNORE")
+    else:
+        # An upsert rather than INSERT OR REPLACE: REPLACE deletes the old
+        # row first, and ON DELETE CASCADE would take its steps with it. A
+        # running start-all's claim and attempt count are left as they are
+        upsert = sqlite_insert(items_table)
+        kept = {'id', 'lease_owner', 'lease_expires_at', 'heartbeat_at', 'attempts'}
+        insert_item = upsert.on_conflict_do_update(
+            index_elements=[items_table.c.id],
+            set_={column.name: upsert.excluded[column.name] for column in items_table.columns if column.name not in kept}
+        )
+        insert_step = insert(steps_table).prefix_with("OR REPLACE")
+        
+    # Old item ID -> ID in this database; ints only, so it stays small
+    id_map = {}
+    pending_items = []
+    pending_steps = []
+    counts = {'items': 0, 'steps': 0, 'orphans': 0, 'skipped_steps': 0}
+    # IDs of items --on-conflict skip left alone; their loaded steps go too
+    skipped_ids = set()
+    
+    def item_row(record):
+        now = get_pacific_now()
+        created_at = _parse_timestamp(record.get('created_at')) or now
+        return {
+            'id': record.get('id'),
+            'title': record['title'],
+            'description': record.get('description'),
+            'description_excerpt': make_excerpt(record.get('description')),
+            'status': record.get('status') or 'pending',
+            'context': record.get('context'),
+            'working_directory': current_dir if here else (record.get('working_directory') or current_dir),
+            'first_progress_at': _parse_timestamp(record.get('first_progress_at')),
+            'created_at': created_at,
+            'updated_at': _parse_timestamp(record.get('updated_at')) or created_at,
+        }
+        
+    def step_row(record, item_id):
+        if isinstance(record, str):
+            record = {'description': record}
+        now = get_pacific_now()
+        created_at = _parse_timestamp(record.get('created_at')) or now
+        return {
+            'id': record.get('id'),
+            'item_id': item_id,
+            'description': record['description'],
+            'status': record.get('status') or 'pending',
+            'created_at': created_at,
+            'updated_at': _parse_timestamp(record.get('updated_at')) or created_at,
+            'completed_at': _parse_timestamp(record.get('completed_at')),
+        }
+        
+    def existing_ids(conn, table, rows):
+        wanted = [row['id'] for row in rows if row['id'] is not None]
+        if renumber or not wanted:
+            return set()
+        return set(conn.execute(select(table.c.id).where(table.c.id.in_(wanted))).scalars())
+        
+    def assign_ids(conn, table, rows):
+        # executemany can't report generated keys, so hand out IDs ourselves;
+        # for AUTOINCREMENT tables, never below what SQLite has already used
+        used = conn.execute(select(func.max(table.c.id))).scalar() or 0
+        if table.kwargs.get('sqlite_autoincrement'):
+            sequence = conn.exec_driver_sql("SELECT seq FROM sqlite_sequence WHERE name = ?", (table.name,)).scalar()
+            used = max(used, sequence or 0)
+        next_id = used + 1
+        for row in rows:
+            if renumber or row['id'] is None:
+                row['id'] = next_id
+                next_id += 1
+                
+    def insert_rows(conn, statement, table, entity, rows):
+        existing = existing_ids(conn, table, rows)
+        if on_conflict == 'skip':
+            rows = [row for row in rows if row['id'] not in existing]
+        if not rows:
+            return 0
+        assign_ids(conn, table, rows)
+        replaced = {}
+        if entity == 'item' and on_conflict == 'replace' and existing:
+            columns = [table.c.id, *(table.c[field] for field in HISTORY_FIELDS)]
+            replaced = {row[0]: row[1:] for row in conn.execute(select(*columns).where(table.c.id.in_(existing)))}
+        result = conn.execute(statement, rows)
+        if entity == 'item':
+            record_revisions(conn, [
+                (row['id'], field, replaced[row['id']][index] if row['id'] in replaced else UNKNOWN, row[field])
+                for row in rows for index, field in enumerate(HISTORY_FIELDS)
+            ])
+        record_events(conn, [{
+            'entity': entity,
+            'entity_id': row['id'],
+            'item_id': row['id'] if entity == 'item' else row['item_id'],
+            'action': 'updated' if row['id'] in existing else 'created',
+            'changes': {
+                'fields': [key for key, value in row.items() if value is not None],
+                **{key: row[key] for key in EVENT_VALUE_FIELDS if key in row},
+            },
+        } for row in rows])
+        return result.rowcount
+        
+    def flush():
+        if not pending_items and not pending_steps:
+            return
+        with engine.begin() as conn:
+            # Take the write lock before reading max(id), so no other writer
+            # can hand out the same IDs before this transaction commits
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+            items = []
+            if pending_items:
+                rows = [row for row, _ in pending_items]
+                original_ids = [row['id'] for row in rows]
+                existing = existing_ids(conn, items_table, rows)
+                if on_conflict == 'skip':
+                    # Existing items keep their steps; the loaded copy is dropped entirely
+                    items = [(row, steps) for row, steps in pending_items if row['id'] not in existing]
+                    skipped_ids.update(existing)
+                else:
+                    items = pending_items
+                counts['items'] += insert_rows(conn, insert_item, items_table, 'item', [row for row, _ in items])
+                for original_id, row in zip(original_ids, rows):
+                    if original_id is not None and original_id not in skipped_ids:
+                        id_map[original_id] = row['id']
+                        
+            step_rows = []
+            for row, nested_steps in items:
+                step_rows.extend(step_row(step, row['id']) for step in nested_steps)
+            unmapped = {
+                record['item_id'] for record in pending_steps
+                if record['item_id'] not in id_map and record['item_id'] not in skipped_ids
+            }
+            if renumber or not unmapped:
+                present = set()
+            else:
+                # Steps may refer to items already in the database, but not to missing ones
+                present = set(conn.execute(select(items_table.c.id).where(items_table.c.id.in_(unmapped))).scalars())
+            for record in pending_steps:
+                if record['item_id'] in skipped_ids:
+                    counts['skipped_steps'] += 1
+                    continue
+                item_id = id_map.get(record['item_id'])
+                if item_id is None and record['item_id'] in present:
+                    item_id = record['item_id']
+                if item_id is None:
+                    counts['orphans'] += 1
+                    continue
+                step_rows.append(step_row(record, item_id))
+            counts['steps'] += insert_rows(conn, insert_step, steps_table, 'step', step_rows)
+            touch_items(conn, sorted({row['item_id'] for row in step_rows} - {row['id'] for row, _ in items}))
+            
+        pending_items.clear()
+        pending_steps.clear()
+        
+    stream = open(source, encoding='utf-8') if source else sys.stdin
+    started = time.perf_counter()
+    try:
+        for line_number, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+                record_type = record.get('type') or ('step' if 'item_id' in record else 'item')
+                if record_type == 'item':
+                    pending_items.append((item_row(record), record.get('steps') or []))
+                elif record_type == 'step':
+                    pending_steps.append(record)
+                else:
+                    raise ValueError(f"unknown record type '{record_type}'")
+            except (ValueError, KeyError, TypeError) as e:
+                console.print(f"❌ [red]Line {line_number}: {e}[/red]")
+                raise typer.Exit(1)
+                
+            if len(pending_items) + len(pending_steps) >= chunk_size:
+                flush()
+        flush()
+    finally:
+        if source:
+            stream.close()
+            
+    elapsed = time.perf_counter() - started
+    rate = (counts['items'] + counts['steps']) / elapsed if elapsed > 0 else 0
+    console.print(
+        f"📥 [green]Loaded {counts['items']} items and {counts['steps']} steps[/green] "
+        f"[dim]({elapsed:.2f}s, {rate:,.0f} rows/s)[/dim]"
+    )
+    if counts['orphans']:
+        console.print(f"⚠️  [yellow]Skipped {counts['orphans']} steps whose item is in neither the input nor the database[/yellow]")
+    if counts['skipped_steps']:
+        console.print(f"⏭️  [yellow]Skipped {counts['skipped_steps']} steps of items that already existed[/yellow]")
+
+@app.command()
+def events(
+    since: int = typer.Option(0, "--since", help="Only show events with a sequence number greater than this"),
+    item_id: Optional[int] = typer.Option(None, "--item", help="Only show events for this TutuItem"),
+    limit: Optional[int] = typer.Option(None, "--limit", help="Maximum number of events to return"),
+    as_json: bool = typer.Option(False, "--json", help="Print events as NDJSON for scripts")
+):
+    """Show the change log, oldest first, so consumers can process deltas"""
+    session = get_session()
+    rows = session.execute(events_query(since, item_id, limit))
     
-    if not pending_items:
-        if everywhere:
-            console.print(f"✨ [yellow]No pending TutuItems to process anywhere![/yellow]")
-        else:
-            console.print(f"✨ [yellow]No pending TutuItems to process in {current_dir} or its subdirectories![/yellow]")
+    if as_json:
+        for row in rows:
+            record = dict(row._mapping)
+            record['changes'] = json.loads(record['changes']) if record['changes'] else {}
+            sys.stdout.write(json.dumps(record, default=_json_default, ensure_ascii=False) + "\n")
         return
-    
-    console.print(f"🚀 [bold cyan]Starting batch processing of {len(pending_items)} items[/bold cyan]\n")
-    
-    # Read TUTU_START_ALL_COMMAND.md
-    tutu_batch_prompt_path = Path(__file__).parent.parent / "TUTU_START_ALL_COMMAND.md"
-    tutu_batch_prompt_content = ""
-    if tutu_batch_prompt_path.exists():
-        tutu_batch_prompt_content = tutu_batch_prompt_path.read_text()
-    
-    # Read README.md
-    readme_path = Path(__file__).parent.parent / "README.md"
-    readme_content = ""
-    if readme_path.exists():
-        readme_content = readme_path.read_text()
-    
-    # Read TUTU_START_PROMPT.md
-    tutu_prompt_path = Path(__file__).parent.parent / "TUTU_START_PROMPT.md"
-    tutu_prompt_content = ""
-    if tutu_prompt_path.exists():
-        tutu_prompt_content = tutu_prompt_path.read_text()
-    
-    results = []
-    
-    for idx, item in enumerate(pending_items, 1):
-        console.print(f"\n{'='*60}")
-        console.print(f"[bold]Processing item {idx}/{len(pending_items)}: #{item.id} - {item.title}[/bold]")
-        console.print(f"{'='*60}\n")
         
-        # Update status and first_progress_at
-        item.status = 'in_progress'
-        if not item.first_progress_at:
-            item.first_progress_at = get_pacific_now()
-        session.commit()
+    table = Table(title=f"📜 Tutu Events since #{since}", show_header=True, header_style="bold magenta")
+    table.add_column("Seq", style="cyan", justify="right")
+    table.add_column("When", style="blue", no_wrap=True)
+    table.add_column("Entity", style="white")
+    table.add_column("Item", style="cyan", justify="right")
+    table.add_column("Action", style="yellow")
+    table.add_column("Changes", style="dim white")
+    
+    last_seq = since
+    for row in rows:
+        changes = json.loads(row.changes) if row.changes else {}
+        fields = changes.pop('fields', [])
+        summary = ", ".join(f"{key}={value}" for key, value in changes.items())
+        if fields and not summary:
+            summary = ", ".join(fields)
+        table.add_row(
+            str(row.seq),
+            row.created_at.strftime('%m/%d %H:%M:%S'),
+            f"{row.entity} #{row.entity_id}",
+            str(row.item_id) if row.item_id is not None else "",
+            row.action,
+            summary
+        )
+        last_seq = row.seq
         
-        # Use the item's working directory
-        working_dir = item.working_directory if item.working_directory else os.getcwd()
+    if last_seq == since:
+        console.print(f"📭 [yellow]No events after #{since}[/yellow]")
+        return
         
-        # Prepare context for Claude Code
-        context = f"""# TutuItem #{item.id}: {item.title}
+    console.print(table)
+    console.print(f"[dim]Next time: tutu events --since {last_seq}[/dim]")
 
-## Status: {item.status}
+STAT_METRIC_LABELS = {
+    'queue_wait': "⏳ Queue wait",
+    'cycle_time': "🔄 Cycle time",
+    'lead_time': "📦 Lead time",
+    'step_time': "👣 Step time",
+}
 
-## Working Directory: {working_dir}
+@app.command()
+def stats(
+    everywhere: bool = typer.Option(False, "--everywhere", help="Include items from all directories, not just current"),
+    days: int = typer.Option(14, "--days", help="Number of most recent active days to show throughput for"),
+    as_json: bool = typer.Option(False, "--json", help="Print the numbers as JSON")
+):
+    """Throughput, cycle-time and step completion analytics"""
+    session = get_session()
+    directory = None if everywhere else os.path.abspath(os.getcwd())
+    data = collect_stats(session.connection(), directory, days)
+    
+    if as_json:
+        sys.stdout.write(json.dumps(data, default=_json_default, indent=2) + "\n")
+        return
+        
+    counts = data['status_counts']
+    if not counts:
+        console.print(f"📭 [yellow]No items found {'anywhere' if everywhere else f'in {directory} or its subdirectories'}![/yellow]")
+        return
+        
+    scope = "Everywhere" if everywhere else directory
+    summary = " • ".join(f"{status}: [bold]{count}[/bold]" for status, count in counts.items())
+    console.print(Panel(f"{summary} • total: [bold]{sum(counts.values())}[/bold]", title=f"📈 Tutu Stats — {scope}", title_align="left", border_style="bright_magenta"))
+    
+    durations_table = Table(
+        title="⏱️ Durations",
+        caption="queue wait: created → first progress • cycle: first progress → done • lead: created → done • step: added → completed",
+        show_header=True,
+        header_style="bold magenta",
+        box=box.ROUNDED
+    )
+    durations_table.add_column("Metric", style="white")
+    for column in ("N", "Avg", "P50", "P90", "P99", "Max"):
+        durations_table.add_column(column, style="cyan", justify="right")
+    for metric, label in STAT_METRIC_LABELS.items():
+        figures = data['durations'].get(metric)
+        if not figures:
+            continue
+        durations_table.add_row(
+            label,
+            str(figures['count']),
+            *(format_duration(figures[key]) for key in ('avg', 'p50', 'p90', 'p99', 'max'))
+        )
+    console.print(durations_table)
+    
+    if data['throughput']:
+        throughput_table = Table(title="🚚 Completed per day", show_header=True, header_style="bold magenta", box=box.ROUNDED)
+        throughput_table.add_column("Day", style="blue")
+        throughput_table.add_column("Done", style="green", justify="right")
+        throughput_table.add_column("7-day avg", style="cyan", justify="right")
+        throughput_table.add_column("", style="green")
+        peak = max(row['done'] for row in data['throughput'])
+        for row in data['throughput']:
+            bar = "█" * max(1, round(row['done'] / peak * 30)) if row['done'] else ""
+            throughput_table.add_row(row['day'], str(row['done']), f"{row['rolling_avg']:.1f}", bar)
+        console.print(throughput_table)
+        
+    directories_table = Table(title="📂 By directory", show_header=True, header_style="bold magenta", box=box.ROUNDED)
+    directories_table.add_column("Working Directory", style="dim white")
+    directories_table.add_column("Items", justify="right")
+    directories_table.add_column("Pending", style="blue", justify="right")
+    directories_table.add_column("In Progress", style="yellow", justify="right")
+    directories_table.add_column("Done", style="green", justify="right")
+    directories_table.add_column("Steps", style="green", justify="right")
+    directories_table.add_column("Median Cycle", style="cyan", justify="right")
+    for row in data['directories']:
+        directories_table.add_row(
+            row['working_directory'] or "N/A",
+            str(row['items']),
+            str(row['pending']),
+            str(row['in_progress']),
+            str(row['done']),
+            f"{row['steps_done']}/{row['steps_total']}",
+            format_duration(row['median_cycle'])
+        )
+    console.print(directories_table)
+    
+    steps = data['steps']
+    if steps['steps_total']:
+        console.print(
+            f"👣 [bold]Steps:[/bold] {steps['steps_done']}/{steps['steps_total']} done "
+            f"([green]{steps['completion_rate']:.0%}[/green]) • "
+            f"{steps['avg_steps_per_item']:.1f} per item • "
+            f"{steps['items_all_steps_done']}/{steps['items_with_steps']} items have every step done"
+        )
 
-## Description:
-{item.description}
+def _tree_label(node, is_root=False):
+    """One line of `tutu tree`: the directory name and its rolled-up counts"""
+    counts = node.total
+    name = f"[bold]{escape(node.name)}[/bold]" if is_root else escape(node.name)
+    label = Text.from_markup(f"{'📂' if node.children else '📁'} {name}")
+    parts = []
+    if counts['pending']:
+        parts.append(f"[blue]{counts['pending']} pending[/blue]")
+    if counts['in_progress']:
+        parts.append(f"[yellow]{counts['in_progress']} in progress[/yellow]")
+    if counts['done']:
+        parts.append(f"[green]{counts['done']} done[/green]")
+    if counts['steps_total']:
+        parts.append(f"[dim]steps {counts['steps_done']}/{counts['steps_total']}[/dim]")
+    if parts:
+        label.append_text(Text.from_markup("  " + " • ".join(parts)))
+    return label
 
-## Context:
-{item.context}
+def _add_tree_children(branch, node, depth):
+    for child in sorted(node.children.values(), key=lambda child: child.name):
+        child_branch = branch.add(_tree_label(child))
+        if depth is None or depth > 1:
+            _add_tree_children(child_branch, child, None if depth is None else depth - 1)
+        elif child.children:
+            child_branch.add(f"[dim]… {len(child.children)} more {'directory' if len(child.children) == 1 else 'directories'}[/dim]")
 
-## Steps:
-"""
-        
-        for step in item.steps:
-            context += f"- [{step.status}] Step #{step.id}: {step.description}\n"
-        
-        if not item.steps:
-            context += "No steps defined yet.\n"
+@app.command()
+def tree(
+    everywhere: bool = typer.Option(False, "--everywhere", help="Include items from all directories, not just current"),
+    depth: Optional[int] = typer.Option(None, "--depth", help="Only show this many levels below the root (counts still include everything)"),
+    collapse: bool = typer.Option(True, "--collapse/--no-collapse", help="Merge chains of directories that only contain one subdirectory")
+):
+    """Show item and step counts rolled up over the directory hierarchy"""
+    current_dir = os.path.abspath(os.getcwd())
+    directory = None if everywhere else current_dir
+    
+    rows = []
+    databases = _everywhere_databases() if everywhere else []
+    if len(databases) > 1:
+        for _, connection in fan_out(databases):
+            rows.extend(directory_counts(connection))
+    else:
+        rows = directory_counts(get_session().connection(), directory)
         
-        context += f"\n---\n<README>\n{readme_content}\n</README>\n\n---\n{tutu_prompt_content}\n\n---\n{tutu_batch_prompt_content}\n"
+    if not rows:
+        console.print(f"📭 [yellow]No items found {'anywhere' if everywhere else f'in {current_dir} or its subdirectories'}![/yellow]")
+        return
         
-        # Run Claude Code in non-interactive mode
-        # First cd to working directory
-        cmd = [
-            "/bin/zsh",
-            "-c",
-            f"cd '{working_dir}' && source /Users/dorkitude/a/scripts/daemon-wrappers.zsh && claude -p --dangerously-skip-permissions"
-        ]
+    root = build_tree(rows, os.sep if everywhere else current_dir)
+    if collapse:
+        root.collapse()
         
-        try:
-            process = subprocess.Popen(
-                cmd,
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                cwd=working_dir,
-                env={**os.environ}
-            )
+    branch = RichTree(_tree_label(root, is_root=True), guide_style="bright_black")
+    _add_tree_children(branch, root, depth)
+    console.print(branch)
+
+db_app = typer.Typer(help="Database health checks and maintenance")
+app.add_typer(db_app, name="db")
+
+def _format_bytes(count):
+    if count is None:
+        return "–"
+    for unit in ("B", "KB", "MB"):
+        if count < 1024:
+            return f"{count:.0f} {unit}" if unit == "B" else f"{count:.1f} {unit}"
+        count /= 1024
+    return f"{count:.1f} GB"
+
+@db_app.command()
+def doctor(
+    full: bool = typer.Option(False, "--full", help="Run the full integrity_check instead of the faster quick_check"),
+    strict: bool = typer.Option(False, "--strict", help="Exit with status 1 if a common query scans a whole table or the integrity check fails")
+):
+    """Report table sizes, fragmentation, WAL size, integrity and index use of the common queries"""
+    db_path = get_db_path()
+    engine = get_engine(db_path)
+    
+    with engine.connect() as connection:
+        tables, indexes = table_stats(connection)
+        files = file_stats(connection, db_path)
+        coverage = index_coverage(connection)
+        problems = integrity_check(connection, full)
+        
+    console.print(Panel(
+        f"[bold]Database:[/bold] {db_path}\n"
+        f"[bold]File:[/bold] {_format_bytes(files['file_bytes'])} • "
+        f"[bold]WAL:[/bold] {_format_bytes(files['wal_bytes'])} • "
+        f"[bold]Journal:[/bold] {files['journal_mode']} • "
+        f"[bold]Auto-vacuum:[/bold] {files['auto_vacuum']}\n"
+        f"[bold]Pages:[/bold] {files['page_count']} × {files['page_size']} B • "
+        f"[bold]Free:[/bold] {files['freelist_count']} ({files['free_ratio']:.0%})",
+        title="🩺 Tutu DB Doctor",
+        title_align="left",
+        border_style="bright_magenta"
+    ))
+    
+    tables_table = Table(title="📦 Tables", show_header=True, header_style="bold magenta", box=box.ROUNDED)
+    tables_table.add_column("Table", style="white")
+    for column in ("Rows", "Pages", "Size", "Unused"):
+        tables_table.add_column(column, style="cyan", justify="right")
+    for name, figures in [*tables.items(), *indexes.items()]:
+        tables_table.add_row(
+            name if name in tables else f"[dim]{name}[/dim]",
+            str(figures['rows']) if 'rows' in figures else "",
+            str(figures.get('pages', "–")),
+            _format_bytes(figures.get('bytes')),
+            _format_bytes(figures.get('unused'))
+        )
+    if not indexes:
+        tables_table.caption = "Page figures need SQLite's dbstat table, which this build lacks"
+    console.print(tables_table)
+    
+    coverage_table = Table(title="🔎 Index use of common queries", show_header=True, header_style="bold magenta", box=box.ROUNDED)
+    coverage_table.add_column("Query", style="white")
+    coverage_table.add_column("Plan", style="dim white")
+    for label, (plan, scans) in coverage.items():
+        mark = "[red]⚠️  full scan[/red]" if scans else "[green]✅[/green]"
+        coverage_table.add_row(f"{mark} {label}", "\n".join(plan))
+    console.print(coverage_table)
+    
+    if problems == ['ok']:
+        console.print(f"✅ [green]{'integrity_check' if full else 'quick_check'}: ok[/green]")
+    else:
+        for problem in problems:
+            console.print(f"❌ [red]{problem}[/red]")
             
-            # Send the context and get output
-            stdout, stderr = process.communicate(input=context)
+    advice = []
+    if files['free_ratio'] > 0.1:
+        if files['auto_vacuum'] == 'incremental':
+            advice.append("run `tutu db optimize` to return free pages to the filesystem")
+        else:
+            advice.append("run `tutu db optimize --enable-incremental-vacuum` once to reclaim free pages (locks the database while it runs)")
+    if files['wal_bytes'] and files['wal_bytes'] > 64 * 1024 * 1024:
+        advice.append("the WAL is large; `tutu db optimize` checkpoints it")
+    if any(scans for _, scans in coverage.values()):
+        advice.append("some common queries scan whole tables; `tutu db optimize` refreshes planner statistics")
+    for line in advice:
+        console.print(f"💡 [yellow]{line}[/yellow]")
+        
+    if strict and (problems != ['ok'] or any(scans for _, scans in coverage.values())):
+        raise typer.Exit(1)
+
+@db_app.command()
+def optimize(
+    vacuum_pages: int = typer.Option(256, "--vacuum-pages", help="Free pages released per incremental vacuum step"),
+    pause: float = typer.Option(0.05, "--pause", help="Seconds to yield to other writers between vacuum steps"),
+    max_seconds: float = typer.Option(5.0, "--max-seconds", help="Stop vacuuming after this long (run again to continue)"),
+    enable_incremental: bool = typer.Option(False, "--enable-incremental-vacuum", help="Switch the database to incremental auto-vacuum with one full VACUUM first")
+):
+    """Refresh planner statistics, checkpoint the WAL and vacuum in short steps"""
+    db_path = get_db_path()
+    engine = get_engine(db_path)
+    
+    with engine.connect() as connection:
+        started = time.monotonic()
+        analyze(connection)
+        console.print(f"📊 [green]ANALYZE / PRAGMA optimize done[/green] [dim]({format_duration(time.monotonic() - started)})[/dim]")
+        
+        result = checkpoint(connection)
+        if result is not None:
+            busy, wal_pages, checkpointed = result
+            if busy:
+                console.print(f"⏳ [yellow]Checkpoint partly blocked by readers: {checkpointed}/{wal_pages} WAL pages copied[/yellow]")
+            else:
+                console.print(f"📝 [green]WAL checkpointed and truncated ({checkpointed} pages)[/green]")
+                
+        if enable_incremental:
+            started = time.monotonic()
+            enable_incremental_vacuum(connection)
+            console.print(f"🧹 [green]Full VACUUM done; incremental vacuum enabled[/green] [dim]({format_duration(time.monotonic() - started)})[/dim]")
             
-            # Refresh item from database to get latest status
-            session.refresh(item)
+        before = file_stats(connection, db_path)
+        if before['auto_vacuum'] != 'incremental':
+            if before['freelist_count']:
+                console.print(f"💡 [yellow]{before['freelist_count']} free pages can't be reclaimed incrementally; run with --enable-incremental-vacuum once[/yellow]")
+            return
             
-            result = {
-                'item': item,
-                'stdout': stdout,
-                'stderr': stderr,
-                'return_code': process.returncode,
-                'steps_completed': [step for step in item.steps if step.status == 'done']
-            }
-            results.append(result)
+        freed = incremental_vacuum(connection, vacuum_pages, pause, max_seconds)
+        remaining = file_stats(connection, db_path)['freelist_count']
+        console.print(f"🧹 [green]Freed {freed} pages ({_format_bytes(freed * before['page_size'])})[/green]" + (f" [yellow]• {remaining} still free, run again to continue[/yellow]" if remaining else ""))
+
+def _format_ms(seconds):
+    return "–" if seconds is None else f"{seconds * 1000:.1f} ms"
+
+@db_app.command()
+def stress(
+    workers: int = typer.Option(8, "--workers", "-w", help="Worker processes writing at the same time"),
+    duration: float = typer.Option(10.0, "--duration", help="Seconds each worker runs for"),
+    mix: str = typer.Option(
+        ",".join(f"{name}={weight}" for name, weight in DEFAULT_MIX.items()), "--mix",
+        help="Weighted operations: add-step, complete-step, status, list"
+    ),
+    items: int = typer.Option(5, "--items", help="Items the workers contend on"),
+    db: Optional[Path] = typer.Option(None, "--db", help="Database to stress (default: a fresh temporary one)"),
+    journal_mode: Optional[str] = typer.Option(None, "--journal-mode", help="journal_mode to test, e.g. wal or delete"),
+    busy_timeout: Optional[int] = typer.Option(None, "--busy-timeout", help="Milliseconds to wait for a lock before failing"),
+    synchronous: Optional[str] = typer.Option(None, "--synchronous", help="synchronous setting to test, e.g. normal or full")
+):
+    """Hammer a database from several processes and report latency, lock waits and lost updates"""
+    try:
+        weights = parse_mix(mix)
+    except ValueError as e:
+        console.print(f"❌ [red]{e}[/red]")
+        raise typer.Exit(1)
+        
+    scratch = None
+    if db is None:
+        scratch = tempfile.mkdtemp(prefix="tutu-stress-")
+        db = Path(scratch) / "stress.sqlite"
+        
+    pragmas = {'journal_mode': journal_mode, 'busy_timeout': busy_timeout, 'synchronous': synchronous}
+    settings = ", ".join(f"{name}={value}" for name, value in pragmas.items() if value is not None) or "configured defaults"
+    console.print(f"🏋️  [bold cyan]{workers} workers × {format_duration(duration)} against {db}[/bold cyan] [dim]({settings})[/dim]")
+    
+    try:
+        result = run_stress(str(db), workers, duration, weights, items, pragmas=pragmas)
+    finally:
+        if scratch:
+            shutil.rmtree(scratch, ignore_errors=True)
+            
+    table = Table(title="🔥 Operations", show_header=True, header_style="bold magenta", box=box.ROUNDED)
+    table.add_column("Operation", style="white")
+    for column in ("OK", "Locked", "Errors", "p50", "p99", "Max"):
+        table.add_column(column, style="cyan", justify="right")
+    for name, figures in result['operations'].items():
+        table.add_row(
+            name,
+            str(figures['ok']),
+            f"[red]{figures['locked']}[/red]" if figures['locked'] else "0",
+            f"[red]{figures['errors']}[/red]" if figures['errors'] else "0",
+            _format_ms(figures['p50']),
+            _format_ms(figures['p99']),
+            _format_ms(figures['max'])
+        )
+    console.print(table)
+    
+    lost = result['lost']
+    lost_count = lost['missing_steps'] + lost['completions_lost']
+    console.print(
+        f"⚡ [bold]Throughput:[/bold] {result['throughput']:.0f} ops/s • "
+        f"[bold]Lock wait:[/bold] {format_duration(result['lock_wait_total'])} total, p99 {_format_ms(result['lock_wait_p99'])} • "
+        f"[bold]\"database is locked\":[/bold] {result['locked']} • "
+        f"[bold]Lost updates:[/bold] {lost_count}"
+    )
+    if db is not None and not scratch:
+        console.print(f"[dim]Stress items were left in {db} under {result['directory']}[/dim]")
+    if lost_count:
+        console.print(f"❌ [red]{lost['missing_steps']} added steps missing, {lost['completions_lost']} completed steps not done[/red]")
+        raise typer.Exit(1)
+
+def _plan_budget(items, budget_seconds, jobs_count):
+    """Estimate every item from its database's run history and keep what fits the budget"""
+    estimates = {}
+    by_session = {}
+    for item in items:
+        by_session.setdefault(object_session(item), []).append(item)
+    for session, session_items in by_session.items():
+        model = DurationModel.load(session, [item.id for item in session_items])
+        for item in session_items:
+            estimates[item] = model.estimate(item.id, item.working_directory, len(item.steps))
             
-            console.print(f"✅ [green]Completed processing item #{item.id}[/green]")
+    scheduled, deferred, finish = plan_batch([(item, estimates[item][0]) for item in items], budget_seconds, jobs_count)
+    
+    table = Table(title=f"⏱️  Budget {format_duration(budget_seconds)}", show_header=True, header_style="bold magenta", box=box.ROUNDED)
+    table.add_column("ID", style="cyan", width=5)
+    table.add_column("Title", style="white", max_width=40, no_wrap=True)
+    table.add_column("Estimate", style="blue", justify="right")
+    table.add_column("Based on", style="dim")
+    table.add_column("Plan")
+    for item in [*scheduled, *deferred]:
+        seconds, basis = estimates[item]
+        plan = "[green]run[/green]" if item in scheduled else "[yellow]defer[/yellow]"
+        table.add_row(str(item.id), escape(item.title), format_duration(seconds), basis, plan)
+    console.print(table)
+    
+    if not scheduled:
+        console.print(f"⏭️  [yellow]No item is expected to finish within {format_duration(budget_seconds)}; all {len(deferred)} deferred[/yellow]")
+    else:
+        console.print(
+            f"⏱️  [cyan]{len(scheduled)} items should finish in about {format_duration(finish)}"
+            + (f"; {len(deferred)} deferred to the next run" if deferred else "")
+            + "[/cyan]\n"
+        )
+    return scheduled, estimates
+
+@app.command(name="start-all")
+def start_all(
+    everywhere: bool = typer.Option(False, "--everywhere", help="Process items from all directories, not just current"),
+    jobs_count: int = typer.Option(1, "--jobs", "-j", help="Number of agent sessions to run at the same time"),
+    worker_id: Optional[str] = typer.Option(None, "--worker-id", help="Name this process claims items under (defaults to host:pid)"),
+    lease_seconds: int = typer.Option(DEFAULT_LEASE_SECONDS, "--lease", help="Seconds a claim lasts without a heartbeat before other workers may take the item"),
+    max_attempts: int = typer.Option(1, "--max-attempts", help="Sessions to try per item before giving up (1 = no retries)"),
+    backoff: float = typer.Option(30.0, "--backoff", help="Seconds before the first retry; doubles with each further attempt"),
+    retry_exit_codes: Optional[str] = typer.Option(None, "--retry-exit-codes", help="Comma-separated exit codes worth retrying (default: any failure; 0 = exited cleanly but item not done)"),
+    tag: Optional[List[str]] = typer.Option(None, "--tag", help=TAG_HELP),
+    budget: Optional[str] = typer.Option(None, "--budget", help="Only run the items that should finish within this long (e.g. 90m, 2h), shortest first; defer the rest")
+):
+    """Run all pending TutuItems in batch mode and generate HTML report"""
+    current_dir = os.path.abspath(os.getcwd())
+    tags = _tag_groups(tag)
+    
+    try:
+        budget_seconds = parse_duration(budget) if budget else None
+    except ValueError as e:
+        console.print(f"❌ [red]{e}[/red]")
+        raise typer.Exit(1)
+    
+    try:
+        exit_codes = [int(code) for code in retry_exit_codes.split(',')] if retry_exit_codes else None
+    except ValueError:
+        console.print("❌ [red]--retry-exit-codes must be a comma-separated list of integers[/red]")
+        raise typer.Exit(1)
+    retry = RetryPolicy(max_attempts, backoff, exit_codes)
+    
+    # With --everywhere, gather items from every registered database; each
+    # item stays attached to the session of the database it lives in
+    databases = _everywhere_databases() if everywhere else [None]
+    
+    # Get all pending items not currently claimed by another start-all
+    pending_items = []
+    now = get_pacific_now()
+    for db_path in databases:
+        session = get_session(db_path)
+        query = session.query(TutuItem).filter(
+            TutuItem.status.in_(['pending', 'in_progress']),
+            lease_available(now),
+            *has_tags(TutuItem.id, tags or [])
+        )
+        # Only items within the current directory hierarchy, unless --everywhere is used
+        if not everywhere:
+            query = query.filter(in_directory(TutuItem.working_directory, current_dir))
+        pending_items.extend(query.options(selectinload(TutuItem.steps)).order_by(TutuItem.created_at).all())
+    pending_items.sort(key=lambda item: item.created_at)
+    
+    if not pending_items:
+        if everywhere:
+            console.print(f"✨ [yellow]No pending TutuItems to process anywhere![/yellow]")
+        else:
+            console.print(f"✨ [yellow]No pending TutuItems to process in {current_dir} or its subdirectories![/yellow]")
+        return
+    
+    estimates = {}
+    if budget_seconds is not None:
+        pending_items, estimates = _plan_budget(pending_items, budget_seconds, jobs_count)
+        if not pending_items:
+            return
             
-        except Exception as e:
-            console.print(f"❌ [red]Error processing item #{item.id}: {e}[/red]")
-            results.append({
-                'item': item,
-                'stdout': '',
-                'stderr': str(e),
-                'return_code': -1,
-                'steps_completed': []
-            })
+    console.print(f"🚀 [bold cyan]Starting batch processing of {len(pending_items)} items ({jobs_count} at a time)[/bold cyan]\n")
     
+    runner = _load_runner()
+    tutu_batch_prompt_content = _read_prompt_file("TUTU_START_ALL_COMMAND.md")
+    readme_content = _read_prompt_file("README.md")
+    tutu_prompt_content = _read_prompt_file("TUTU_START_PROMPT.md")
+    
+    jobs = []
+    for item in pending_items:
+        # Use the item's working directory
+        working_dir = item.working_directory if item.working_directory else os.getcwd()
+        
+        # Prepare context for Claude Code
+        context = _build_item_context(item, working_dir, readme_content, tutu_prompt_content, tutu_batch_prompt_content)
+        
+        # Run the agent non-interactively, streaming structured events so
+        # timing, token and cost figures can be recorded for the report
+        cmd = runner.batch_command(item.id, working_dir, _item_db_path(item))
+        job = BatchJob(item, working_dir, context, cmd)
+        if item in estimates:
+            job.estimate = estimates[item][0]
+        jobs.append(job)
+        
+    deadline = time.monotonic() + budget_seconds if budget_seconds is not None else None
+    results = asyncio.run(run_batch(jobs, jobs_count, console, worker_id, lease_seconds, retry, deadline))
+    if not results:
+        console.print("🔒 [yellow]Every item was claimed by another start-all before this one reached it[/yellow]")
+        return
+        
     # Generate HTML report
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     report_filename = f"report_{timestamp}.html"
     report_path = Path(os.getcwd()) / report_filename
     
-    html_content = generate_html_report(results, pending_items)
+    html_content = generate_html_report(results, [result['item'] for result in results])
     
     with open(report_path, 'w', encoding='utf-8') as f:
         f.write(html_content)
@@ -680,393 +1810,6 @@ def start_all(
     webbrowser.open(f"file://{report_path}")
     console.print("🌐 [cyan]Opening report in browser...[/cyan]")
 
-def generate_html_report(results, all_items):
-    """Generate HTML report with Catppuccin Mocha theme"""
-    
-    # Catppuccin Mocha colors
-    catppuccin_mocha = {
-        'base': '#1e1e2e',
-        'mantle': '#181825',
-        'crust': '#11111b',
-        'text': '#cdd6f4',
-        'subtext0': '#a6adc8',
-        'surface0': '#313244',
-        'surface1': '#45475a',
-        'surface2': '#585b70',
-        'green': '#a6e3a1',
-        'red': '#f38ba8',
-        'yellow': '#f9e2af',
-        'blue': '#89b4fa',
-        'mauve': '#cba6f7',
-        'teal': '#94e2d5',
-        'peach': '#fab387',
-        'maroon': '#eba0ac',
-        'lavender': '#b4befe',
-    }
-    
-    html = f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Tutu Batch Processing Report - {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}</title>
-    <style>
-        :root {{
-            --base: {catppuccin_mocha['base']};
-            --mantle: {catppuccin_mocha['mantle']};
-            --crust: {catppuccin_mocha['crust']};
-            --text: {catppuccin_mocha['text']};
-            --subtext0: {catppuccin_mocha['subtext0']};
-            --surface0: {catppuccin_mocha['surface0']};
-            --surface1: {catppuccin_mocha['surface1']};
-            --surface2: {catppuccin_mocha['surface2']};
-            --green: {catppuccin_mocha['green']};
-            --red: {catppuccin_mocha['red']};
-            --yellow: {catppuccin_mocha['yellow']};
-            --blue: {catppuccin_mocha['blue']};
-            --mauve: {catppuccin_mocha['mauve']};
-            --teal: {catppuccin_mocha['teal']};
-            --peach: {catppuccin_mocha['peach']};
-            --lavender: {catppuccin_mocha['lavender']};
-        }}
-        
-        * {{
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }}
-        
-        body {{
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, Cantarell, sans-serif;
-            background-color: var(--base);
-            color: var(--text);
-            line-height: 1.6;
-            padding: 2rem;
-        }}
-        
-        .container {{
-            max-width: 1400px;
-            margin: 0 auto;
-        }}
-        
-        h1 {{
-            color: var(--mauve);
-            text-align: center;
-            margin-bottom: 2rem;
-            font-size: 2.5rem;
-        }}
-        
-        .summary {{
-            background-color: var(--mantle);
-            border: 1px solid var(--surface0);
-            border-radius: 8px;
-            padding: 1.5rem;
-            margin-bottom: 2rem;
-        }}
-        
-        .summary h2 {{
-            color: var(--blue);
-            margin-bottom: 1rem;
-        }}
-        
-        .stats {{
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-            gap: 1rem;
-            margin-top: 1rem;
-        }}
-        
-        .stat-card {{
-            background-color: var(--surface0);
-            padding: 1rem;
-            border-radius: 6px;
-            text-align: center;
-        }}
-        
-        .stat-card .number {{
-            font-size: 2rem;
-            font-weight: bold;
-            color: var(--peach);
-        }}
-        
-        .stat-card .label {{
-            color: var(--subtext0);
-            font-size: 0.9rem;
-        }}
-        
-        .item {{
-            background-color: var(--mantle);
-            border: 1px solid var(--surface0);
-            border-radius: 8px;
-            margin-bottom: 2rem;
-            overflow: hidden;
-        }}
-        
-        .item-header {{
-            background-color: var(--surface0);
-            padding: 1rem 1.5rem;
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-        }}
-        
-        .item-title {{
-            color: var(--lavender);
-            font-size: 1.3rem;
-            font-weight: bold;
-        }}
-        
-        .status {{
-            padding: 0.3rem 0.8rem;
-            border-radius: 4px;
-            font-size: 0.9rem;
-            font-weight: bold;
-        }}
-        
-        .status.done {{
-            background-color: var(--green);
-            color: var(--crust);
-        }}
-        
-        .status.in_progress {{
-            background-color: var(--yellow);
-            color: var(--crust);
-        }}
-        
-        .status.pending {{
-            background-color: var(--surface2);
-            color: var(--text);
-        }}
-        
-        .item-content {{
-            padding: 1.5rem;
-        }}
-        
-        .section {{
-            margin-bottom: 1.5rem;
-        }}
-        
-        .section h3 {{
-            color: var(--teal);
-            margin-bottom: 0.5rem;
-        }}
-        
-        .description, .context {{
-            background-color: var(--surface0);
-            padding: 1rem;
-            border-radius: 4px;
-            white-space: pre-wrap;
-            word-wrap: break-word;
-        }}
-        
-        .steps {{
-            margin-top: 0.5rem;
-        }}
-        
-        .step {{
-            padding: 0.5rem 0;
-            display: flex;
-            align-items: center;
-            gap: 0.5rem;
-        }}
-        
-        .step.done {{
-            color: var(--green);
-        }}
-        
-        .step.pending {{
-            color: var(--subtext0);
-        }}
-        
-        .output {{
-            background-color: var(--crust);
-            border: 1px solid var(--surface1);
-            border-radius: 4px;
-            padding: 1rem;
-            margin-top: 1rem;
-            font-family: 'Cascadia Code', 'Fira Code', monospace;
-            font-size: 0.9rem;
-            white-space: pre-wrap;
-            word-wrap: break-word;
-            overflow-x: auto;
-            max-height: 500px;
-            overflow-y: auto;
-        }}
-        
-        .error {{
-            color: var(--red);
-        }}
-        
-        .working-dir {{
-            color: var(--blue);
-            font-family: monospace;
-            font-size: 0.9rem;
-        }}
-        
-        .timestamp {{
-            color: var(--subtext0);
-            text-align: center;
-            margin-top: 3rem;
-            font-size: 0.9rem;
-        }}
-        
-        .expand-button {{
-            background-color: var(--surface1);
-            color: var(--text);
-            border: none;
-            padding: 0.4rem 0.8rem;
-            border-radius: 4px;
-            cursor: pointer;
-            font-size: 0.9rem;
-            transition: background-color 0.2s;
-        }}
-        
-        .expand-button:hover {{
-            background-color: var(--surface2);
-        }}
-        
-        .collapsible {{
-            max-height: 200px;
-            overflow: hidden;
-            position: relative;
-        }}
-        
-        .collapsible.expanded {{
-            max-height: none;
-        }}
-        
-        .collapsible::after {{
-            content: '';
-            position: absolute;
-            bottom: 0;
-            left: 0;
-            right: 0;
-            height: 50px;
-            background: linear-gradient(transparent, var(--crust));
-            pointer-events: none;
-        }}
-        
-        .collapsible.expanded::after {{
-            display: none;
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>🚀 Tutu Batch Processing Report</h1>
-        
-        <div class="summary">
-            <h2>📊 Summary</h2>
-            <div class="stats">
-                <div class="stat-card">
-                    <div class="number">{len(all_items)}</div>
-                    <div class="label">Total Items</div>
-                </div>
-                <div class="stat-card">
-                    <div class="number">{sum(1 for r in results if r['item'].status == 'done')}</div>
-                    <div class="label">Completed</div>
-                </div>
-                <div class="stat-card">
-                    <div class="number">{sum(1 for r in results if r['item'].status == 'in_progress')}</div>
-                    <div class="label">In Progress</div>
-                </div>
-                <div class="stat-card">
-                    <div class="number">{sum(len(r['steps_completed']) for r in results)}</div>
-                    <div class="label">Steps Completed</div>
-                </div>
-            </div>
-        </div>
-"""
-    
-    for result in results:
-        item = result['item']
-        status_class = item.status.replace(' ', '_')
-        
-        html += f"""
-        <div class="item">
-            <div class="item-header">
-                <div>
-                    <span class="item-title">#{item.id}: {item.title}</span>
-                    <div class="working-dir">📁 {item.working_directory}</div>
-                </div>
-                <span class="status {status_class}">{item.status.upper()}</span>
-            </div>
-            <div class="item-content">
-                <div class="section">
-                    <h3>Description</h3>
-                    <div class="description">{item.description}</div>
-                </div>
-"""
-        
-        if item.context:
-            html += f"""
-                <div class="section">
-                    <h3>Context</h3>
-                    <div class="context">{item.context}</div>
-                </div>
-"""
-        
-        if item.steps:
-            html += """
-                <div class="section">
-                    <h3>Steps</h3>
-                    <div class="steps">
-"""
-            for step in item.steps:
-                step_class = 'done' if step.status == 'done' else 'pending'
-                icon = '✅' if step.status == 'done' else '⏳'
-                html += f"""
-                        <div class="step {step_class}">
-                            {icon} Step #{step.id}: {step.description}
-                        </div>
-"""
-            html += """
-                    </div>
-                </div>
-"""
-        
-        # Add output section
-        if result['stdout'] or result['stderr']:
-            output_id = f"output_{item.id}"
-            html += f"""
-                <div class="section">
-                    <h3>Output <button class="expand-button" onclick="toggleExpand('{output_id}')">Toggle Full Output</button></h3>
-                    <div class="output collapsible" id="{output_id}">"""
-            
-            if result['stdout']:
-                html += result['stdout']
-            
-            if result['stderr']:
-                html += f"""\n\n<span class="error">Errors:\n{result['stderr']}</span>"""
-            
-            html += """
-                    </div>
-                </div>
-"""
-        
-        html += """
-            </div>
-        </div>
-"""
-    
-    html += f"""
-        <div class="timestamp">
-            Generated on {datetime.now().strftime("%Y-%m-%d at %H:%M:%S")} Pacific Time
-        </div>
-    </div>
-    
-    <script>
-        function toggleExpand(id) {{
-            const element = document.getElementById(id);
-            element.classList.toggle('expanded');
-        }}
-    </script>
-</body>
-</html>
-"""
-    
-    return html
-
 def main():
     import sys
     
@@ -0,0 +1,132 @@
+"""Database location settings.
+
+Kept free of SQLAlchemy imports so it can be used before the ORM is loaded.
+
+The database is picked, in order, from:
+
+1. the TUTU_DB environment variable (a file path or ":memory:")
+2. the nearest `.tutu.toml` in the current directory or one of its parents:
+
+       [database]
+       path = "tutu.sqlite"   # relative to the .tutu.toml, or ":memory:"
+       # or
+       per_project = true     # <project>/.tutu/tutu.sqlite
+
+3. the shared database at ~/a/base/tutu.sqlite
+
+Project databases are remembered in a registry beside the shared database so
+that `--everywhere` can fan out over all of them.
+
+Connection settings for concurrent writers come from the same `[database]`
+table, or from environment variables that take precedence:
+
+       journal_mode = "wal"    # TUTU_JOURNAL_MODE
+       busy_timeout = 5000     # TUTU_BUSY_TIMEOUT, milliseconds to wait for a lock
+       synchronous = "normal"  # TUTU_SYNCHRONOUS
+"""
+import os
+import tomllib
+from pathlib import Path
+
+CONFIG_FILENAME = ".tutu.toml"
+MEMORY_DB = ":memory:"
+
+def get_default_db_path():
+    return Path.home() / "a" / "base" / "tutu.sqlite"
+
+def get_registry_path():
+    return get_default_db_path().parent / "tutu_databases.txt"
+
+def find_project_config(start=None):
+    """Return the nearest .tutu.toml at or above `start`, or None"""
+    directory = Path(start or os.getcwd()).resolve()
+    for candidate in (directory, *directory.parents):
+        config_path = candidate / CONFIG_FILENAME
+        if config_path.is_file():
+            return config_path
+    return None
+
+def load_project_config(config_path):
+    with open(config_path, 'rb') as f:
+        return tomllib.load(f)
+
+def _project_db_path(config_path):
+    database = load_project_config(config_path).get('database', {})
+    path = database.get('path')
+    if path == MEMORY_DB:
+        return MEMORY_DB
+    if path:
+        path = Path(os.path.expanduser(path))
+        return path if path.is_absolute() else config_path.parent / path
+    if database.get('per_project'):
+        return config_path.parent / ".tutu" / "tutu.sqlite"
+    return None
+
+def resolve_db_path(start=None):
+    """Work out which database to use, returning (path, is_project_db).
+
+    `path` is a Path, or the string ":memory:".
+    """
+    env_path = os.environ.get("TUTU_DB")
+    if env_path:
+        if env_path == MEMORY_DB:
+            return MEMORY_DB, False
+        return Path(os.path.expanduser(env_path)), False
+        
+    config_path = find_project_config(start)
+    if config_path:
+        path = _project_db_path(config_path)
+        if path is not None:
+            return path, path != MEMORY_DB
+            
+    return get_default_db_path(), False
+
+# [database] key -> (environment variable, allowed values or a converter)
+PRAGMA_SETTINGS = {
+    'journal_mode': ("TUTU_JOURNAL_MODE", ('delete', 'truncate', 'persist', 'memory', 'wal', 'off')),
+    'busy_timeout': ("TUTU_BUSY_TIMEOUT", int),
+    'synchronous': ("TUTU_SYNCHRONOUS", ('off', 'normal', 'full', 'extra')),
+}
+
+def sqlite_pragmas(start=None):
+    """{pragma: value} to apply to every new connection; unset ones keep SQLite's defaults"""
+    config_path = find_project_config(start)
+    database = load_project_config(config_path).get('database', {}) if config_path else {}
+    pragmas = {}
+    for name, (env_var, allowed) in PRAGMA_SETTINGS.items():
+        value = os.environ.get(env_var) or database.get(name)
+        if value is None:
+            continue
+        if callable(allowed):
+            try:
+                value = allowed(value)
+            except ValueError:
+                raise ValueError(f"{name} must be a number, not {value!r}")
+        else:
+            value = str(value).lower()
+            if value not in allowed:
+                raise ValueError(f"{name} must be one of {', '.join(allowed)}, not {value!r}")
+        pragmas[name] = value
+    return pragmas
+
+def registered_databases():
+    """Shared database first, then every registered project database that still exists"""
+    paths = [get_default_db_path()]
+    registry_path = get_registry_path()
+    if registry_path.exists():
+        for line in registry_path.read_text().splitlines():
+            line = line.strip()
+            if line and Path(line).exists() and Path(line) not in paths:
+                paths.append(Path(line))
+    return paths
+
+def register_database(path):
+    """Add a project database to the registry used by --everywhere"""
+    path = Path(path).resolve()
+    registry_path = get_registry_path()
+    known = registry_path.read_text().splitlines() if registry_path.exists() else []
+    if str(path) in known:
+        return
+    registry_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(registry_path, 'a') as f:
+        f.write(f"{path}\n")
@@ -0,0 +1,307 @@
+"""Project digest handed to agent sessions.
+
+Every `start` and `start-all` session would otherwise begin with the agent
+listing and reading its way around the same working directory. The digest is
+a compact summary of the repository the item lives in (languages, entry
+points, key files and a shallow file tree) that goes into the prompt instead.
+
+Digests are built from git (`git ls-files`), so ignored files never show up,
+and cached per repository under ~/a/base/digests. The cache key is HEAD, a
+hash of `git status --porcelain`, and the size and mtime of every path that
+status lists. The status output alone stays the same when a file that is
+already modified is edited again; the stat signatures catch that, so any
+commit, checkout or edit to the working tree is noticed. A rebuild is
+incremental: per-file figures are kept with the git blob id of each tracked
+file (or the size and mtime of files that are modified or untracked), and
+only files whose id changed are read again.
+
+Directories that aren't inside a git repository get no digest. Turn digests
+off with TUTU_DIGEST=off, or in the nearest `.tutu.toml`:
+
+    [digest]
+    enabled = false
+"""
+import hashlib
+import json
+import os
+import subprocess
+import tomllib
+from collections import Counter
+from pathlib import PurePosixPath
+
+from .config import find_project_config, load_project_config, get_default_db_path
+
+ENV_VAR = "TUTU_DIGEST"
+# Bump when the digest's layout changes so cached digests are rebuilt
+DIGEST_FORMAT = 1
+GIT_TIMEOUT = 10
+# Files above this size are counted by bytes only, never read
+MAX_READ_BYTES = 1_000_000
+MAX_UNTRACKED = 2000
+TREE_DEPTH = 2
+MAX_TREE_LINES = 60
+MAX_LIST = 12
+
+LANGUAGES = {
+    '.py': "Python", '.pyi': "Python",
+    '.js': "JavaScript", '.mjs': "JavaScript", '.cjs': "JavaScript", '.jsx': "JavaScript",
+    '.ts': "TypeScript", '.tsx': "TypeScript",
+    '.go': "Go", '.rs': "Rust", '.rb': "Ruby", '.php': "PHP",
+    '.java': "Java", '.kt': "Kotlin", '.scala': "Scala", '.swift': "Swift",
+    '.c': "C", '.h': "C", '.cc': "C++", '.cpp': "C++", '.hpp': "C++", '.cs': "C#",
+    '.sh': "Shell", '.bash': "Shell", '.zsh': "Shell",
+    '.sql': "SQL", '.html': "HTML", '.css': "CSS", '.scss': "CSS",
+    '.vue': "Vue", '.svelte': "Svelte", '.lua': "Lua", '.ex': "Elixir", '.exs': "Elixir",
+}
+KEY_FILES = (
+    "README.md", "README.rst", "README", "CLAUDE.md", "AGENTS.md", "CONTRIBUTING.md",
+    "pyproject.toml", "setup.py", "requirements.txt", "package.json", "tsconfig.json",
+    "Cargo.toml", "go.mod", "Gemfile", "pom.xml", "build.gradle",
+    "Makefile", "justfile", "Dockerfile", "docker-compose.yml", "compose.yaml", ".tutu.toml",
+)
+ENTRY_NAMES = {
+    "__main__.py", "main.py", "cli.py", "app.py", "manage.py", "wsgi.py", "asgi.py",
+    "main.go", "main.rs", "index.js", "index.ts", "server.js", "server.ts", "main.ts", "main.js",
+}
+
+def enabled(working_dir):
+    if os.environ.get(ENV_VAR, "").lower() in ("0", "off", "false", "no"):
+        return False
+    config_path = find_project_config(working_dir)
+    if config_path:
+        return load_project_config(config_path).get('digest', {}).get('enabled', True)
+    return True
+
+def _git(root, *args):
+    """stdout of a git command, or None if it fails"""
+    try:
+        result = subprocess.run(
+            ["git", "-C", str(root), *args],
+            capture_output=True, timeout=GIT_TIMEOUT, check=False
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0:
+        return None
+    return result.stdout
+
+def repository_root(working_dir):
+    output = _git(working_dir, "rev-parse", "--show-toplevel")
+    if not output:
+        return None
+    return output.decode().strip()
+
+def cache_path(root):
+    name = hashlib.sha1(root.encode()).hexdigest()[:16]
+    return get_default_db_path().parent / "digests" / f"{name}.json"
+
+def _tracked_files(root):
+    """{path: blob id} for every file in the index"""
+    output = _git(root, "ls-files", "-s", "-z") or b""
+    files = {}
+    for entry in output.split(b"\0"):
+        if not entry:
+            continue
+        info, _, path = entry.partition(b"\t")
+        mode, blob = info.split(b" ")[:2]
+        # Submodules (mode 160000) are directories, not files
+        if mode != b"160000":
+            files[path.decode(errors='replace')] = blob.decode()
+    return files
+
+def _status_paths(status):
+    """Paths `git status --porcelain -z` reports as modified, added or untracked"""
+    paths = set()
+    entries = status.split(b"\0")
+    index = 0
+    while index < len(entries):
+        entry = entries[index]
+        index += 1
+        if len(entry) < 4:
+            continue
+        paths.add(entry[3:].decode(errors='replace'))
+        if entry[:1] in (b"R", b"C"):
+            # Renames and copies are followed by the original path
+            index += 1
+    return paths
+
+def _signature(root, path):
+    try:
+        stat = os.stat(os.path.join(root, path))
+    except OSError:
+        return None
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+def _measure(root, path):
+    """[bytes, lines] of one file; lines only for source files of a known language"""
+    full_path = os.path.join(root, path)
+    try:
+        size = os.path.getsize(full_path)
+        if PurePosixPath(path).suffix.lower() not in LANGUAGES or size > MAX_READ_BYTES:
+            return [size, 0]
+        with open(full_path, 'rb') as f:
+            return [size, f.read().count(b"\n")]
+    except OSError:
+        return [0, 0]
+
+def _scan(root, status, previous):
+    """{path: [id, bytes, lines]}, reusing `previous` entries whose id hasn't changed"""
+    ids = _tracked_files(root)
+    untracked = (_git(root, "ls-files", "-o", "--exclude-standard", "-z") or b"").split(b"\0")
+    for path in untracked[:MAX_UNTRACKED]:
+        if path:
+            ids[path.decode(errors='replace')] = None
+            
+    # Files changed in the working tree no longer match their blob
+    for path in _status_paths(status):
+        if path in ids:
+            ids[path] = None
+            
+    files = {}
+    for path, file_id in ids.items():
+        file_id = file_id or _signature(root, path)
+        if file_id is None:
+            # Deleted from the working tree but still in the index
+            continue
+        cached = previous.get(path)
+        if cached and cached[0] == file_id:
+            files[path] = cached
+        else:
+            files[path] = [file_id, *_measure(root, path)]
+    return files
+
+def _python_scripts(root):
+    try:
+        with open(os.path.join(root, "pyproject.toml"), 'rb') as f:
+            project = tomllib.load(f).get('project', {})
+    except (OSError, ValueError):
+        return []
+    return [f"{name} = {target}" for name, target in project.get('scripts', {}).items()]
+
+def _node_scripts(root):
+    try:
+        with open(os.path.join(root, "package.json"), encoding='utf-8') as f:
+            package = json.load(f)
+    except (OSError, ValueError):
+        return []
+    entries = []
+    if isinstance(package.get('bin'), dict):
+        entries.extend(f"bin {name} = {target}" for name, target in package['bin'].items())
+    elif package.get('main'):
+        entries.append(f"main = {package['main']}")
+    if isinstance(package.get('scripts'), dict):
+        entries.append("npm scripts: " + ", ".join([*package['scripts']][:MAX_LIST]))
+    return entries
+
+def _entry_points(root, paths):
+    entries = [*_python_scripts(root), *_node_scripts(root)]
+    candidates = sorted(
+        (path for path in paths if PurePosixPath(path).name in ENTRY_NAMES and path.count("/") <= 3),
+        key=lambda path: (path.count("/"), path)
+    )
+    entries.extend(candidates[:MAX_LIST])
+    return entries
+
+def _languages(files):
+    lines = Counter()
+    counts = Counter()
+    for path, (_, _, line_count) in files.items():
+        language = LANGUAGES.get(PurePosixPath(path).suffix.lower())
+        if language:
+            lines[language] += line_count
+            counts[language] += 1
+    total = sum(lines.values()) or 1
+    return [
+        f"{language} {lines[language] * 100 // total}% ({lines[language]:,} lines, {counts[language]} files)"
+        for language, _ in lines.most_common(6)
+    ]
+
+def _tree(paths):
+    """Directories to TREE_DEPTH with their file counts, plus top-level files"""
+    directories = Counter()
+    top_level = []
+    for path in paths:
+        parts = PurePosixPath(path).parts
+        if len(parts) == 1:
+            top_level.append(path)
+        for depth in range(1, min(len(parts) - 1, TREE_DEPTH) + 1):
+            directories["/".join(parts[:depth])] += 1
+            
+    lines = [
+        f"{'  ' * directory.count('/')}{PurePosixPath(directory).name}/ ({count} files)"
+        for directory, count in sorted(directories.items())
+    ]
+    lines.extend(sorted(top_level))
+    if len(lines) > MAX_TREE_LINES:
+        hidden = len(lines) - MAX_TREE_LINES
+        lines = [*lines[:MAX_TREE_LINES], f"... {hidden} more"]
+    return lines
+
+def render(root, files, branch, head, changes):
+    paths = sorted(files)
+    sections = [f"Repository: {root}"]
+    if head:
+        state = f"{branch or 'detached'} @ {head[:10]}"
+        if changes:
+            state += f", {changes} uncommitted changes"
+        sections.append(f"Git: {state}")
+    sections.append(f"Files: {len(paths):,}")
+    
+    languages = _languages(files)
+    if languages:
+        sections.append("Languages: " + "; ".join(languages))
+    entry_points = _entry_points(root, paths)
+    if entry_points:
+        sections.append("Entry points:\n" + "\n".join(f"- {entry}" for entry in entry_points))
+    present = set(paths)
+    key_files = [name for name in KEY_FILES if name in present]
+    if key_files:
+        sections.append("Key files: " + ", ".join(key_files))
+    sections.append("File tree:\n" + "\n".join(_tree(paths)))
+    return "\n".join(sections)
+
+def _load(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cached if cached.get('format') == DIGEST_FORMAT else {}
+
+def _store(path, cached):
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(cached, f)
+        os.replace(temporary, path)
+    except OSError:
+        # Without a writable cache the digest is just rebuilt next time
+        pass
+
+def project_digest(working_dir):
+    """The digest of the git repository containing `working_dir`, or None"""
+    root = repository_root(working_dir)
+    if root is None:
+        return None
+    head = (_git(root, "rev-parse", "--verify", "-q", "HEAD") or b"").decode().strip()
+    # Every untracked file, not just its directory, so each one gets a signature
+    status = _git(root, "status", "--porcelain", "-z", "--untracked-files=all")
+    if status is None:
+        return None
+    key_hash = hashlib.sha1(status)
+    for changed in sorted(_status_paths(status)):
+        key_hash.update(f"\0{changed}\0{_signature(root, changed)}".encode())
+    key = f"{head}:{key_hash.hexdigest()}"
+    
+    path = cache_path(root)
+    cached = _load(path)
+    if cached.get('key') == key:
+        return cached['digest']
+        
+    files = _scan(root, status, cached.get('files', {}))
+    branch = (_git(root, "symbolic-ref", "--short", "-q", "HEAD") or b"").decode().strip()
+    changes = len(_status_paths(status))
+    digest = render(root, files, branch, head, changes)
+    _store(path, {'format': DIGEST_FORMAT, 'key': key, 'files': files, 'digest': digest})
+    return digest
@@ -0,0 +1,201 @@
+"""Edit history of item fields.
+
+Every change to an item's title, description, context or working_directory
+is kept in tutu_item_revisions, written from the same flush hook as the
+change log (and by `tutu load`), so the history commits or rolls back with
+the change itself.
+
+Contexts can be hundreds of KB and are usually edited a few lines at a time,
+so a version is normally stored as a line delta against the one before it:
+a JSON list whose `[start, end]` entries copy lines of the previous version
+and whose strings are new text. A version is stored whole (a snapshot)
+when it is the first one, when the delta wouldn't be smaller, or every
+SNAPSHOT_EVERY versions, so rebuilding any version means reading one
+snapshot and applying at most SNAPSHOT_EVERY - 1 deltas.
+
+`prune` compacts the history to the last few versions of each field: the
+oldest version kept is rewritten as a snapshot and everything before it is
+dropped.
+"""
+import json
+from difflib import SequenceMatcher
+
+from sqlalchemy import select, insert, update, delete, func, case
+
+from .models import TutuItemRevision, get_pacific_now
+
+HISTORY_FIELDS = ('title', 'description', 'context', 'working_directory')
+SNAPSHOT_EVERY = 20
+DEFAULT_KEEP = 10
+# Marks an old value the flush didn't have loaded
+UNKNOWN = object()
+
+def make_delta(old, new):
+    """Line delta turning `old` into `new` (see the module docstring)"""
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    delta = []
+    for tag, i1, i2, j1, j2 in SequenceMatcher(None, old_lines, new_lines).get_opcodes():
+        if tag == 'equal':
+            delta.append([i1, i2])
+        elif j2 > j1:
+            delta.append("".join(new_lines[j1:j2]))
+    return delta
+
+def apply_delta(old, delta):
+    old_lines = old.splitlines(keepends=True)
+    parts = []
+    for part in delta:
+        if isinstance(part, list):
+            parts.extend(old_lines[part[0]:part[1]])
+        else:
+            parts.append(part)
+    return "".join(parts)
+
+def _encode(previous, new, force_snapshot):
+    """(kind, data) for storing `new` after `previous`"""
+    if force_snapshot or previous is None or new is None:
+        return 'snapshot', new
+    data = json.dumps(make_delta(previous, new), separators=(',', ':'))
+    if len(data) >= len(new):
+        return 'snapshot', new
+    return 'delta', data
+
+def _rebuild(rows):
+    """Value after applying (kind, data) rows that start with a snapshot"""
+    value = None
+    for kind, data in rows:
+        value = data if kind == 'snapshot' else apply_delta(value, json.loads(data))
+    return value
+
+def revision_value(connection, item_id, field, version=None):
+    """`field` of an item as of `version` (default: the latest); UNKNOWN if it has no history"""
+    revisions = TutuItemRevision.__table__
+    conditions = [revisions.c.item_id == item_id, revisions.c.field == field]
+    if version is not None:
+        conditions.append(revisions.c.version <= version)
+    last_snapshot = (
+        select(func.max(revisions.c.version))
+        .where(*conditions, revisions.c.kind == 'snapshot')
+        .scalar_subquery()
+    )
+    rows = connection.execute(
+        select(revisions.c.kind, revisions.c.data)
+        .where(*conditions, revisions.c.version >= last_snapshot)
+        .order_by(revisions.c.version)
+    ).all()
+    if not rows:
+        return UNKNOWN
+    return _rebuild(rows)
+
+def record_revisions(connection, changes):
+    """Append revisions on the given connection, inside its current transaction.
+
+    `changes` is a list of (item_id, field, old value or UNKNOWN, new value).
+    An item whose field has no history yet gets its old value (when known)
+    stored first, so edits to items older than the history keep the original.
+    """
+    if not changes:
+        return
+    revisions = TutuItemRevision.__table__
+    latest = {
+        (item_id, field): (version, snapshot_version or 0)
+        for item_id, field, version, snapshot_version in connection.execute(
+            select(
+                revisions.c.item_id,
+                revisions.c.field,
+                func.max(revisions.c.version),
+                func.max(case((revisions.c.kind == 'snapshot', revisions.c.version))),
+            )
+            .where(revisions.c.item_id.in_(sorted({change[0] for change in changes})))
+            .group_by(revisions.c.item_id, revisions.c.field)
+        )
+    }
+    
+    now = get_pacific_now()
+    rows = []
+    # Latest value of each field written in this batch
+    values = {}
+    
+    def add(item_id, field, version, kind, data, value):
+        rows.append({
+            'item_id': item_id,
+            'field': field,
+            'version': version,
+            'kind': kind,
+            'data': data,
+            'size': len(value) if value is not None else None,
+            'created_at': now,
+        })
+        values[(item_id, field)] = value
+        
+    for item_id, field, old, new in changes:
+        version, snapshot_version = latest.get((item_id, field), (0, 0))
+        if not version:
+            if old is UNKNOWN or old is None:
+                if new is None:
+                    continue
+                old = None
+            else:
+                version = snapshot_version = 1
+                add(item_id, field, version, 'snapshot', old, old)
+        elif old is UNKNOWN:
+            old = values.get((item_id, field), UNKNOWN)
+            if old is UNKNOWN:
+                old = revision_value(connection, item_id, field)
+        if old == new and version:
+            continue
+        version += 1
+        kind, data = _encode(old, new, version - snapshot_version >= SNAPSHOT_EVERY)
+        add(item_id, field, version, kind, data, new)
+        latest[(item_id, field)] = (version, version if kind == 'snapshot' else snapshot_version)
+        
+    if rows:
+        connection.execute(insert(revisions), rows)
+
+def list_revisions(connection, item_id, field=None):
+    """(field, version, kind, size, stored bytes, created_at) for an item, oldest first"""
+    revisions = TutuItemRevision.__table__
+    query = (
+        select(
+            revisions.c.field,
+            revisions.c.version,
+            revisions.c.kind,
+            revisions.c.size,
+            func.coalesce(func.length(revisions.c.data), 0),
+            revisions.c.created_at,
+        )
+        .where(revisions.c.item_id == item_id)
+        .order_by(revisions.c.created_at, revisions.c.id)
+    )
+    if field:
+        query = query.where(revisions.c.field == field)
+    return [tuple(row) for row in connection.execute(query)]
+
+def prune(connection, keep=DEFAULT_KEEP):
+    """Keep the last `keep` versions of every field; returns the number of revisions removed"""
+    if keep < 1:
+        raise ValueError("Keep at least one version")
+    revisions = TutuItemRevision.__table__
+    targets = connection.execute(
+        select(revisions.c.item_id, revisions.c.field, func.max(revisions.c.version) - keep + 1)
+        .group_by(revisions.c.item_id, revisions.c.field)
+        .having(func.min(revisions.c.version) < func.max(revisions.c.version) - keep + 1)
+    ).all()
+    removed = 0
+    for item_id, field, first_kept in targets:
+        row = connection.execute(
+            select(revisions.c.id, revisions.c.kind)
+            .where(revisions.c.item_id == item_id, revisions.c.field == field, revisions.c.version == first_kept)
+        ).first()
+        if row.kind == 'delta':
+            connection.execute(
+                update(revisions)
+                .where(revisions.c.id == row.id)
+                .values(kind='snapshot', data=revision_value(connection, item_id, field, first_kept))
+            )
+        removed += connection.execute(
+            delete(revisions)
+            .where(revisions.c.item_id == item_id, revisions.c.field == field, revisions.c.version < first_kept)
+        ).rowcount
+    return removed
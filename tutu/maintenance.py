@@ -0,0 +1,216 @@
+"""Health checks and upkeep behind `tutu db doctor` and `tutu db optimize`.
+
+Everything takes a SQLAlchemy connection and returns plain data; the CLI
+does the printing. Page usage comes from the dbstat virtual table when
+SQLite was built with it, and is simply left out otherwise.
+"""
+import os
+import re
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from .models import Base
+
+def hot_queries():
+    """{label: (SQL text, parameters)} for the SELECTs behind list, status, watch, --tag and events.
+    
+    The statements are captured while the repository calls those commands
+    make run against a throwaway in-memory database holding one sample item,
+    so a change to the queries or their loader options is checked as it
+    ships. Statements after the first one a call sends (selectin loads of
+    steps and tags, the lazy load of runs) are labelled with their table.
+    """
+    from .api import TutuRepository, events_query
+    
+    engine = create_engine('sqlite://', poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    captured = []
+    
+    @event.listens_for(engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+            
+    with Session(engine) as session:
+        repo = TutuRepository(session=session)
+        item = repo.create_item("Sample", working_directory="/code/app")
+        repo.add_steps(item.id, ["Sample step"])
+        repo.add_tags(item.id, ["quick"])
+        item_id = item.id
+        
+        calls = {
+            'list (directory scope)': lambda: repo.query_items(
+                directory="/code", exclude_statuses=['done'], with_steps=True, order_by='updated'
+            ),
+            'items with a tag': lambda: repo.query_items(exclude_statuses=['done'], tags=[["quick"]]),
+            'status of an item': lambda: repo.get_item(item_id, with_steps=True, with_text=True).runs,
+            'events since': lambda: session.execute(events_query(since=0, limit=100)).all(),
+            'events of item': lambda: session.execute(events_query(item_id=item_id)).all(),
+        }
+        queries = {}
+        for label, call in calls.items():
+            # Start from an empty identity map so every loader really runs
+            session.expunge_all()
+            captured.clear()
+            call()
+            for number, (statement, parameters) in enumerate(captured):
+                name = label if not number else f"{label}: {_from_table(statement)}"
+                queries[name] = (statement, tuple(parameters))
+    engine.dispose()
+    return queries
+
+def _from_table(sql):
+    match = re.search(r"\bFROM\s+(\w+)", sql)
+    return match.group(1) if match else None
+
+def _pragma(connection, name):
+    return connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+def user_tables(connection):
+    return [row[0] for row in connection.exec_driver_sql(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+    )]
+
+def has_dbstat(connection):
+    try:
+        connection.exec_driver_sql("SELECT 1 FROM dbstat LIMIT 1").all()
+        return True
+    except Exception:
+        return False
+
+def table_stats(connection):
+    """Row count per table, plus pages, bytes and unused bytes per table and index when dbstat exists"""
+    stats = {name: {'rows': connection.exec_driver_sql(f'SELECT COUNT(*) FROM "{name}"').scalar()} for name in user_tables(connection)}
+    if not has_dbstat(connection):
+        return stats, {}
+    pages = {}
+    for name, page_count, size, unused in connection.exec_driver_sql(
+        "SELECT name, COUNT(*), SUM(pgsize), SUM(unused) FROM dbstat GROUP BY name ORDER BY SUM(pgsize) DESC"
+    ):
+        pages[name] = {'pages': page_count, 'bytes': size, 'unused': unused}
+    for name, figures in stats.items():
+        figures.update(pages.get(name, {}))
+    indexes = {name: figures for name, figures in pages.items() if name not in stats}
+    return stats, indexes
+
+def file_stats(connection, db_path):
+    """Page size and counts, free pages, file and WAL sizes, and the journal/vacuum modes"""
+    page_size = _pragma(connection, "page_size")
+    page_count = _pragma(connection, "page_count")
+    freelist = _pragma(connection, "freelist_count")
+    auto_vacuum = {0: 'none', 1: 'full', 2: 'incremental'}.get(_pragma(connection, "auto_vacuum"), 'unknown')
+    stats = {
+        'page_size': page_size,
+        'page_count': page_count,
+        'freelist_count': freelist,
+        'free_ratio': freelist / page_count if page_count else 0.0,
+        'journal_mode': _pragma(connection, "journal_mode"),
+        'auto_vacuum': auto_vacuum,
+        'file_bytes': None,
+        'wal_bytes': None,
+    }
+    if db_path and str(db_path) != ":memory:":
+        for key, path in (('file_bytes', str(db_path)), ('wal_bytes', f"{db_path}-wal")):
+            try:
+                stats[key] = os.path.getsize(path)
+            except OSError:
+                pass
+    return stats
+
+def _driver_sql(connection, statement, params):
+    """(SQL text, parameters) for a string or a SQLAlchemy statement"""
+    if isinstance(statement, str):
+        return statement, params or {}
+    compiled = statement.compile(dialect=connection.dialect, compile_kwargs={'render_postcompile': True})
+    return str(compiled), tuple(compiled.params[name] for name in compiled.positiontup)
+
+def query_plan(connection, sql, params=None):
+    """EXPLAIN QUERY PLAN detail lines for SQL text or a SQLAlchemy statement"""
+    sql, params = _driver_sql(connection, sql, params)
+    return [row[3] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+def full_scans(plan):
+    """Plan lines that read a whole table instead of going through an index"""
+    return [line for line in plan if line.startswith("SCAN ") and " USING " not in line]
+
+def index_coverage(connection):
+    """{query label: (plan lines, full-scan lines)} for hot_queries()"""
+    tables = set(user_tables(connection))
+    coverage = {}
+    for label, (sql, params) in hot_queries().items():
+        if _from_table(sql) not in tables:
+            continue
+        plan = query_plan(connection, sql, params)
+        coverage[label] = (plan, full_scans(plan))
+    return coverage
+
+def assert_uses_indexes(connection, queries=None):
+    """Raise AssertionError naming every query whose plan scans a whole table.
+
+    `queries` maps labels to (SQL text or SQLAlchemy statement, params) and
+    defaults to hot_queries(). Meant for tests and CI, against a database
+    with the current schema:
+
+        with get_engine(":memory:").connect() as connection:
+            assert_uses_indexes(connection)
+            assert_uses_indexes(connection, {'mine': (select(TutuItem).where(...), None)})
+    """
+    if queries is None:
+        coverage = index_coverage(connection)
+    else:
+        coverage = {}
+        for label, (sql, params) in queries.items():
+            plan = query_plan(connection, sql, params)
+            coverage[label] = (plan, full_scans(plan))
+    failures = [f"{label}: {'; '.join(scans)}" for label, (_, scans) in coverage.items() if scans]
+    if failures:
+        raise AssertionError("Full table scans in query plans:\n  " + "\n  ".join(failures))
+
+def integrity_check(connection, full=False):
+    """'ok', or the problems SQLite found. quick_check skips index contents and is much faster"""
+    rows = connection.exec_driver_sql("PRAGMA integrity_check" if full else "PRAGMA quick_check").all()
+    return [row[0] for row in rows]
+
+def analyze(connection, analysis_limit=1000):
+    """Refresh planner statistics, sampling at most `analysis_limit` rows per index"""
+    connection.exec_driver_sql(f"PRAGMA analysis_limit={int(analysis_limit)}")
+    connection.exec_driver_sql("ANALYZE")
+    connection.exec_driver_sql("PRAGMA optimize")
+    connection.commit()
+
+def checkpoint(connection):
+    """Copy the WAL back into the database and truncate it; (busy, wal pages, checkpointed) or None outside WAL mode"""
+    if _pragma(connection, "journal_mode") != 'wal':
+        return None
+    return tuple(connection.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)").one())
+
+def incremental_vacuum(connection, pages_per_step=256, pause=0.05, max_seconds=5.0):
+    """Give free pages back to the filesystem a few at a time.
+
+    Each step frees at most `pages_per_step` pages in its own short write
+    transaction, then sleeps `pause` seconds so other writers can get in.
+    Stops when nothing is free or after `max_seconds`. Only works when the
+    database is in incremental auto_vacuum mode; returns pages freed.
+    """
+    if _pragma(connection, "auto_vacuum") != 2:
+        return 0
+    freed = 0
+    deadline = time.monotonic() + max_seconds
+    while time.monotonic() < deadline:
+        before = _pragma(connection, "freelist_count")
+        if not before:
+            break
+        connection.exec_driver_sql(f"PRAGMA incremental_vacuum({int(pages_per_step)})").all()
+        connection.commit()
+        freed += before - _pragma(connection, "freelist_count")
+        time.sleep(pause)
+    return freed
+
+def enable_incremental_vacuum(connection):
+    """Switch the database to incremental auto_vacuum; needs one full VACUUM, which locks it while it runs"""
+    connection.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+    connection.commit()
+    connection.exec_driver_sql("VACUUM")
@@ -1,9 +1,16 @@
 from datetime import datetime
+import json
+import zlib
 import pytz
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import create_engine, Column, Integer, String, DateTime, ForeignKey, Text, Float, Index, event, insert, update, select, inspect
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship, sessionmaker
-from pathlib import Path
+from sqlalchemy.orm import relationship, sessionmaker, Session, deferred, validates
+from sqlalchemy.types import TypeDecorator
+from contextlib import contextmanager
+from sqlalchemy.pool import StaticPool
+
+from .config import resolve_db_path, register_database, sqlite_pragmas, MEMORY_DB
+from . import querylog
 
 Base = declarative_base()
 
@@ -14,44 +21,394 @@ def get_pacific_now():
     """Get current time in Pacific timezone"""
     return datetime.now(PACIFIC_TZ)
 
+# Text at least this long is stored zlib-compressed
+COMPRESS_MIN_BYTES = 4096
+COMPRESSED_MARKER = b"tutu-zlib:"
+EXCERPT_LENGTH = 200
+
+class CompressedText(TypeDecorator):
+    """Text stored as-is when short and as a compressed BLOB when long.
+    
+    SQLite keeps a BLOB in a TEXT column untouched, so existing rows stay
+    readable and no schema change is needed; values read back are always
+    str.
+    """
+    impl = Text
+    cache_ok = True
+    
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        data = value.encode('utf-8')
+        if len(data) < COMPRESS_MIN_BYTES:
+            return value
+        return COMPRESSED_MARKER + zlib.compress(data)
+        
+    def process_result_value(self, value, dialect):
+        if isinstance(value, bytes):
+            if value.startswith(COMPRESSED_MARKER):
+                value = zlib.decompress(value[len(COMPRESSED_MARKER):])
+            return value.decode('utf-8')
+        return value
+
+def make_excerpt(text):
+    """First line of `text`, cut to EXCERPT_LENGTH characters"""
+    if not text:
+        return text
+    first_line = text.strip().split("\n", 1)[0]
+    if len(first_line) > EXCERPT_LENGTH:
+        return first_line[:EXCERPT_LENGTH - 1] + "…"
+    return first_line
+
 class TutuItem(Base):
     __tablename__ = 'tutu_items'
+    # AUTOINCREMENT, so the ID of a deleted item is never handed out again and
+    # its events and history can't be mistaken for a new item's
+    __table_args__ = {'sqlite_autoincrement': True}
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     title = Column(String(255), nullable=False)
-    description = Column(Text)
+    # description and context can be pasted logs or specs of hundreds of KB,
+    # so they are only fetched when first accessed (or undeferred together
+    # with undefer_group('text')); listings use description_excerpt instead
+    description = deferred(Column(CompressedText), group='text')
+    description_excerpt = Column(String(EXCERPT_LENGTH))
     status = Column(String(50), default='pending')
-    context = Column(Text)
-    working_directory = Column(String(1024))
+    context = deferred(Column(CompressedText), group='text')
+    working_directory = Column(String(1024), index=True)
     first_progress_at = Column(DateTime)
     created_at = Column(DateTime, default=get_pacific_now)
     updated_at = Column(DateTime, default=get_pacific_now, onupdate=get_pacific_now)
+    # Set while a start-all worker has the item claimed; the claim lapses at
+    # lease_expires_at unless the worker keeps heartbeating
+    lease_owner = Column(String(255))
+    lease_expires_at = Column(DateTime)
+    heartbeat_at = Column(DateTime)
+    # Agent sessions start-all has run for this item
+    attempts = Column(Integer, default=0)
     
-    steps = relationship("TutuItemStep", back_populates="item", cascade="all, delete-orphan")
+    # The database deletes steps and runs with their item (ON DELETE CASCADE),
+    # so deleting an item never loads them
+    steps = relationship("TutuItemStep", back_populates="item", cascade="all, delete-orphan", passive_deletes=True)
+    runs = relationship("TutuRun", back_populates="item", cascade="all, delete-orphan", passive_deletes=True, order_by="TutuRun.id")
+    tags = relationship("TutuTag", secondary="tutu_item_tags", order_by="TutuTag.name", passive_deletes=True)
+    
+    @validates('description')
+    def _update_excerpt(self, key, value):
+        self.description_excerpt = make_excerpt(value)
+        return value
 
 class TutuItemStep(Base):
     __tablename__ = 'tutu_item_steps'
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    item_id = Column(Integer, ForeignKey('tutu_items.id'), nullable=False)
+    item_id = Column(Integer, ForeignKey('tutu_items.id', ondelete='CASCADE'), nullable=False, index=True)
     description = Column(Text, nullable=False)
     status = Column(String(50), default='pending')
     created_at = Column(DateTime, default=get_pacific_now)
     updated_at = Column(DateTime, default=get_pacific_now, onupdate=get_pacific_now)
+    completed_at = Column(DateTime)
     
     item = relationship("TutuItem", back_populates="steps")
 
-def get_db_path():
-    db_path = Path.home() / "a" / "base" / "tutu.sqlite"
-    db_path.parent.mkdir(parents=True, exist_ok=True)
-    return str(db_path)
+class TutuTag(Base):
+    __tablename__ = 'tutu_tags'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String(100), nullable=False, unique=True)
+
+class TutuItemTag(Base):
+    """Which items carry which tags.
+    
+    The primary key (item_id, tag_id) serves lookups by item; the index on
+    (tag_id, item_id) serves --tag filters, which look items up by tag.
+    """
+    __tablename__ = 'tutu_item_tags'
+    __table_args__ = (Index('ix_tutu_item_tags_tag_item', 'tag_id', 'item_id'),)
+    
+    item_id = Column(Integer, ForeignKey('tutu_items.id', ondelete='CASCADE'), primary_key=True)
+    tag_id = Column(Integer, ForeignKey('tutu_tags.id', ondelete='CASCADE'), primary_key=True)
+
+class TutuRun(Base):
+    """One agent session for an item, with the telemetry start-all captured"""
+    __tablename__ = 'tutu_runs'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    item_id = Column(Integer, ForeignKey('tutu_items.id', ondelete='CASCADE'), nullable=False, index=True)
+    started_at = Column(DateTime, default=get_pacific_now)
+    finished_at = Column(DateTime)
+    return_code = Column(Integer)
+    wall_seconds = Column(Float)
+    first_output_seconds = Column(Float)
+    input_tokens = Column(Integer)
+    output_tokens = Column(Integer)
+    cache_creation_tokens = Column(Integer)
+    cache_read_tokens = Column(Integer)
+    cost_usd = Column(Float)
+    num_turns = Column(Integer)
+    
+    item = relationship("TutuItem", back_populates="runs")
+    
+    @property
+    def total_tokens(self):
+        counts = [self.input_tokens, self.output_tokens, self.cache_creation_tokens, self.cache_read_tokens]
+        if all(count is None for count in counts):
+            return None
+        return sum(count or 0 for count in counts)
+
+class TutuEvent(Base):
+    """Append-only log of item and step changes.
+    
+    `seq` is AUTOINCREMENT so it is never reused, which lets consumers keep
+    the last seq they processed and ask only for newer events.
+    """
+    __tablename__ = 'tutu_events'
+    __table_args__ = {'sqlite_autoincrement': True}
+    
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    entity = Column(String(20), nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    item_id = Column(Integer, index=True)
+    action = Column(String(20), nullable=False)
+    changes = Column(Text)
+    created_at = Column(DateTime, default=get_pacific_now)
+
+class TutuItemRevision(Base):
+    """One version of an item's title, description, context or working_directory.
+    
+    `data` holds either the whole value ('snapshot') or a line delta against
+    the previous version ('delta'); see tutu.history.
+    """
+    __tablename__ = 'tutu_item_revisions'
+    __table_args__ = (Index('ix_tutu_item_revisions_item_field_version', 'item_id', 'field', 'version', unique=True),)
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    item_id = Column(Integer, ForeignKey('tutu_items.id', ondelete='CASCADE'), nullable=False)
+    field = Column(String(50), nullable=False)
+    version = Column(Integer, nullable=False)
+    kind = Column(String(10), nullable=False)
+    data = Column(CompressedText)
+    # Length of the whole value at this version, so listings needn't rebuild it
+    size = Column(Integer)
+    created_at = Column(DateTime, default=get_pacific_now)
+
+# Columns whose new values are copied into event payloads; other changed
+# columns (long text) are only listed by name
+EVENT_VALUE_FIELDS = ('title', 'status', 'working_directory', 'item_id')
+
+def record_events(connection, events):
+    """Append events on the given connection, inside its current transaction.
+    
+    Each event is a dict with entity, entity_id, item_id, action and an
+    optional `changes` dict.
+    """
+    if not events:
+        return
+    now = get_pacific_now()
+    rows = [{
+        'entity': e['entity'],
+        'entity_id': e['entity_id'],
+        'item_id': e['item_id'],
+        'action': e['action'],
+        'changes': json.dumps(e.get('changes') or {}, default=str),
+        'created_at': now,
+    } for e in events]
+    connection.execute(insert(TutuEvent.__table__), rows)
+
+def touch_items(connection, item_ids):
+    """Bump updated_at on items whose steps changed"""
+    if not item_ids:
+        return
+    items = TutuItem.__table__
+    connection.execute(
+        update(items).where(items.c.id.in_(item_ids)).values(updated_at=get_pacific_now())
+    )
+
+def _entity_event(obj, action):
+    if isinstance(obj, TutuItem):
+        entity, item_id = 'item', obj.id
+    else:
+        entity, item_id = 'step', obj.item_id
+        
+    state = inspect(obj)
+    if action == 'created':
+        fields = [attr.key for attr in state.mapper.column_attrs if getattr(obj, attr.key) is not None]
+    elif action == 'updated':
+        fields = [
+            attr.key for attr in state.mapper.column_attrs
+            if attr.key != 'updated_at' and state.attrs[attr.key].history.has_changes()
+        ]
+        if not fields:
+            return None
+    else:
+        fields = []
+        
+    changes = {}
+    if fields:
+        changes['fields'] = fields
+        changes.update({f: getattr(obj, f) for f in fields if f in EVENT_VALUE_FIELDS})
+    return {'entity': entity, 'entity_id': obj.id, 'item_id': item_id, 'action': action, 'changes': changes}
 
-def get_engine():
-    db_path = get_db_path()
-    return create_engine(f'sqlite:///{db_path}')
+@event.listens_for(Session, "before_flush")
+def _load_replaced_values(session, flush_context, instances):
+    """Read the stored values of history fields about to be overwritten.
+    
+    Setting an attribute that was never loaded (a deferred description, or
+    anything after a commit expired it) leaves no old value in its history,
+    so fetch those from the database while they are still there.
+    """
+    from .history import HISTORY_FIELDS
+    
+    wanted = {}
+    for obj in session.dirty:
+        if not isinstance(obj, TutuItem) or obj.id is None:
+            continue
+        state = inspect(obj)
+        for field in HISTORY_FIELDS:
+            history = state.attrs[field].history
+            if history.has_changes() and not history.deleted:
+                wanted.setdefault(obj.id, []).append(field)
+    if not wanted:
+        return
+        
+    items = TutuItem.__table__
+    fields = sorted({field for names in wanted.values() for field in names})
+    rows = session.connection().execute(
+        select(items.c.id, *(items.c[field] for field in fields)).where(items.c.id.in_(sorted(wanted)))
+    )
+    replaced = session.info.setdefault('tutu_replaced_values', {})
+    for row in rows:
+        for field in wanted[row.id]:
+            replaced[(row.id, field)] = row._mapping[field]
 
-def get_session():
-    engine = get_engine()
-    Base.metadata.create_all(engine)
+@event.listens_for(Session, "after_flush")
+def _log_flush_events(session, flush_context):
+    """Write a tutu_events row for every item/step the flush touched.
+    
+    Runs on the flush's own connection, so the events commit or roll back
+    together with the change they describe.
+    """
+    from .history import HISTORY_FIELDS, UNKNOWN, record_revisions
+    
+    events = []
+    touched_items = set()
+    revisions = []
+    replaced = session.info.pop('tutu_replaced_values', {})
+    for collection, action in ((session.new, 'created'), (session.dirty, 'updated'), (session.deleted, 'deleted')):
+        for obj in collection:
+            if not isinstance(obj, (TutuItem, TutuItemStep)):
+                continue
+            entry = _entity_event(obj, action)
+            if entry is None:
+                continue
+            events.append(entry)
+            if entry['entity'] == 'step' and entry['item_id'] is not None:
+                touched_items.add(entry['item_id'])
+            if entry['entity'] == 'item' and action != 'deleted':
+                state = inspect(obj)
+                for field in HISTORY_FIELDS:
+                    history = state.attrs[field].history
+                    if history.has_changes():
+                        old = history.deleted[0] if history.deleted else replaced.get((obj.id, field), UNKNOWN)
+                        revisions.append((obj.id, field, old, getattr(obj, field)))
+                        
+    if events:
+        connection = session.connection()
+        record_events(connection, events)
+        touch_items(connection, sorted(touched_items))
+        record_revisions(connection, revisions)
+
+def get_db_path(start=None):
+    """Path of the database for `start` or the current directory (see tutu.config)"""
+    path, is_project_db = resolve_db_path(start)
+    if path == MEMORY_DB:
+        return MEMORY_DB
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if is_project_db:
+        register_database(path)
+    return str(path)
+
+# One engine per database for the life of the process, so repeated
+# get_session() calls share a pool (and ":memory:" keeps its contents)
+_engines = {}
+
+def _ensure_indexes(engine):
+    """Add indexes declared after a database's tables were first created"""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+
+def _install_pragmas(engine, pragmas):
+    """Turn on foreign key enforcement, and apply journal_mode, busy_timeout
+    and synchronous settings, on each new connection"""
+    pragmas = {'foreign_keys': 'ON', **pragmas}
+    
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+def get_engine(db_path=None):
+    db_path = str(db_path or get_db_path())
+    engine = _engines.get(db_path)
+    if engine is None:
+        log_queries = querylog.enabled()
+        connect_args = querylog.connect_args() if log_queries else {}
+        if db_path == MEMORY_DB:
+            engine = create_engine(
+                'sqlite://',
+                poolclass=StaticPool,
+                connect_args={'check_same_thread': False, **connect_args}
+            )
+        else:
+            engine = create_engine(f'sqlite:///{db_path}', connect_args=connect_args)
+        if log_queries:
+            querylog.get_log().install(engine)
+        _install_pragmas(engine, sqlite_pragmas())
+        Base.metadata.create_all(engine)
+        _ensure_indexes(engine)
+        _engines[db_path] = engine
+    return engine
+
+def get_session(db_path=None):
+    engine = get_engine(db_path)
     Session = sessionmaker(bind=engine)
-    return Session()
\ No newline at end of file
+    return Session()
+
+# SQLite's default compile-time limit on attached databases
+MAX_ATTACHED = 10
+
+@contextmanager
+def attached_databases(paths):
+    """Open one connection with every database in `paths` attached.
+    
+    Yields (connection, schemas) where schemas is a list of (schema, path).
+    Run a query against one database with
+    `connection.execution_options(schema_translate_map={None: schema})`.
+    Reads go through a single connection instead of one engine per file,
+    and writers to other databases are never blocked by our lock.
+    """
+    paths = [str(p) for p in paths][:MAX_ATTACHED]
+    engine = create_engine('sqlite://', poolclass=StaticPool)
+    with engine.connect() as connection:
+        schemas = []
+        for index, path in enumerate(paths):
+            schema = f"tutu_db{index}"
+            connection.exec_driver_sql("ATTACH DATABASE ? AS ?", (path, schema))
+            has_items = connection.exec_driver_sql(
+                f"SELECT 1 FROM {schema}.sqlite_master WHERE type = 'table' AND name = 'tutu_items'"
+            ).first()
+            if has_items:
+                schemas.append((schema, path))
+        yield connection, schemas
+    engine.dispose()
+
+def fan_out(paths):
+    """Yield (path, connection) for each database, attaching them in groups"""
+    paths = [str(p) for p in paths]
+    for start in range(0, len(paths), MAX_ATTACHED):
+        with attached_databases(paths[start:start + MAX_ATTACHED]) as (connection, schemas):
+            for schema, path in schemas:
+                yield path, connection.execution_options(schema_translate_map={None: schema})
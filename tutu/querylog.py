@@ -0,0 +1,166 @@
+"""Opt-in log of the SQL each tutu command runs.
+
+Set TUTU_QUERY_LOG to turn it on:
+
+    TUTU_QUERY_LOG=1 tutu list                     # summary on stderr at exit
+    TUTU_QUERY_LOG=/tmp/tutu-queries.ndjson tutu   # also append one JSON line per statement
+
+Every statement is timed with the engine's cursor events. Rows are counted
+as they are fetched, through a cursor subclass the engine only uses while
+logging is on. Identical SELECTs run many times in one command (the usual
+sign of a lazy load inside a loop) are reported as possible N+1 queries.
+Statements that raise are timed up to the error and listed with it.
+"""
+import atexit
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import event
+
+ENV_VAR = "TUTU_QUERY_LOG"
+# Same statement this many times in one command looks like N+1
+N_PLUS_ONE_THRESHOLD = 5
+STATEMENT_PREVIEW = 160
+
+def enabled():
+    return bool(os.environ.get(ENV_VAR))
+
+class CountingCursor(sqlite3.Cursor):
+    """sqlite3 cursor that adds the rows it returns to the current log record"""
+    record = None
+    
+    def _count(self, rows):
+        if self.record is not None:
+            self.record['rows'] += len(rows)
+        return rows
+        
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None and self.record is not None:
+            self.record['rows'] += 1
+        return row
+        
+    def fetchmany(self, *args, **kwargs):
+        return self._count(super().fetchmany(*args, **kwargs))
+        
+    def fetchall(self):
+        return self._count(super().fetchall())
+
+class CountingConnection(sqlite3.Connection):
+    def cursor(self, factory=CountingCursor):
+        return super().cursor(factory)
+
+def _normalize(statement):
+    """Statement text with whitespace squeezed and IN lists collapsed, for grouping"""
+    statement = re.sub(r"\s+", " ", statement).strip()
+    return re.sub(r"\((?:\?, )+\?\)", "(?, …)", statement)
+
+class QueryLog:
+    def __init__(self, command, path=None):
+        self.command = command
+        self.path = path
+        self.records = []
+        
+    def install(self, engine):
+        @event.listens_for(engine, "before_cursor_execute")
+        def before(conn, cursor, statement, parameters, context, executemany):
+            record = {
+                'statement': statement,
+                'executemany': executemany,
+                'started': time.perf_counter(),
+                'duration_ms': None,
+                'rows': 0,
+                'error': None,
+            }
+            self.records.append(record)
+            if isinstance(cursor, CountingCursor):
+                cursor.record = record
+            # Keyed on the statement's own context, so one that raises can't
+            # leave its record behind for the next statement to pick up
+            if context is not None:
+                context._tutu_query_record = record
+                
+        def _record(context, cursor):
+            record = getattr(context, '_tutu_query_record', None)
+            return record if record is not None else getattr(cursor, 'record', None)
+            
+        @event.listens_for(engine, "after_cursor_execute")
+        def after(conn, cursor, statement, parameters, context, executemany):
+            record = _record(context, cursor)
+            if record is None:
+                return
+            record['duration_ms'] = (time.perf_counter() - record['started']) * 1000
+            if cursor.rowcount is not None and cursor.rowcount >= 0:
+                # DML reports affected rows here; SELECTs count as they are fetched
+                record['rows'] = cursor.rowcount
+                
+        @event.listens_for(engine, "handle_error")
+        def failed(exception_context):
+            record = _record(exception_context.execution_context, getattr(exception_context, 'cursor', None))
+            if record is None or record['duration_ms'] is not None:
+                return
+            record['duration_ms'] = (time.perf_counter() - record['started']) * 1000
+            record['error'] = type(exception_context.original_exception).__name__
+            
+    def repeated_selects(self):
+        """[(count, normalized statement)] for SELECTs run at least N_PLUS_ONE_THRESHOLD times"""
+        counts = Counter(
+            _normalize(record['statement']) for record in self.records
+            if record['statement'].lstrip().upper().startswith("SELECT")
+        )
+        return [(count, statement) for statement, count in counts.most_common() if count >= N_PLUS_ONE_THRESHOLD]
+        
+    def write_ndjson(self):
+        now = datetime.now().isoformat()
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for record in self.records:
+                f.write(json.dumps({
+                    'logged_at': now,
+                    'command': self.command,
+                    'statement': _normalize(record['statement']),
+                    'duration_ms': record['duration_ms'],
+                    'rows': record['rows'],
+                    'executemany': record['executemany'],
+                    'error': record['error'],
+                }) + "\n")
+                
+    def report(self, out=None):
+        out = out or sys.stderr
+        total = sum(record['duration_ms'] or 0 for record in self.records)
+        out.write(f"tutu query log: {self.command} — {len(self.records)} statements, {total:.1f} ms\n")
+        for record in self.records:
+            duration = "     ?" if record['duration_ms'] is None else f"{record['duration_ms']:6.1f}"
+            statement = _normalize(record['statement'])
+            if len(statement) > STATEMENT_PREVIEW:
+                statement = statement[:STATEMENT_PREVIEW - 1] + "…"
+            failed = f"  ❌ {record['error']}" if record['error'] else ""
+            out.write(f"  {duration} ms {record['rows']:6d} rows  {statement}{failed}\n")
+        for count, statement in self.repeated_selects():
+            out.write(f"  ⚠️  possible N+1: {count}× {statement[:STATEMENT_PREVIEW]}\n")
+            
+    def finish(self):
+        if self.path:
+            self.write_ndjson()
+        self.report()
+
+_log = None
+
+def get_log():
+    """The process-wide log, created (and reported at exit) on first use"""
+    global _log
+    if _log is None:
+        target = os.environ.get(ENV_VAR, "")
+        path = None if target.lower() in ("1", "true", "yes", "stderr") else target
+        _log = QueryLog(" ".join(["tutu", *sys.argv[1:]]), path)
+        atexit.register(_log.finish)
+    return _log
+
+def connect_args():
+    """Extra sqlite3.connect arguments for a logged engine"""
+    return {'factory': CountingConnection}
@@ -0,0 +1,610 @@
+"""HTML report for `tutu start-all` batches.
+
+The report is a single offline file. Item data is embedded as escaped JSON
+instead of pre-rendered markup: a small index drives a virtualized list that
+only creates DOM nodes for rows on screen, and each item's long fields
+(description, context, steps, output) live in their own JSON block that is
+parsed only when the item is opened. Page weight still grows with the batch,
+but opening it costs the same for 5 items or 5,000.
+"""
+import json
+from datetime import datetime
+
+from .utils import format_duration
+
+# Catppuccin Mocha colors
+CATPPUCCIN_MOCHA = {
+    'base': '#1e1e2e',
+    'mantle': '#181825',
+    'crust': '#11111b',
+    'text': '#cdd6f4',
+    'subtext0': '#a6adc8',
+    'surface0': '#313244',
+    'surface1': '#45475a',
+    'surface2': '#585b70',
+    'green': '#a6e3a1',
+    'red': '#f38ba8',
+    'yellow': '#f9e2af',
+    'blue': '#89b4fa',
+    'mauve': '#cba6f7',
+    'teal': '#94e2d5',
+    'peach': '#fab387',
+    'maroon': '#eba0ac',
+    'lavender': '#b4befe',
+}
+
+def _embed_json(value):
+    """JSON that is safe inside a <script> element.
+
+    Escaping <, > and & means no string in the data can close the script
+    tag or start markup, whatever the agent printed.
+    """
+    text = json.dumps(value, ensure_ascii=False, separators=(',', ':'), default=str)
+    return (text.replace('<', '\\u003c').replace('>', '\\u003e').replace('&', '\\u0026')
+            .replace('\u2028', '\\u2028').replace('\u2029', '\\u2029'))
+
+def _run_data(run):
+    if run is None:
+        return None
+    cache_tokens = None
+    if run.cache_creation_tokens is not None or run.cache_read_tokens is not None:
+        cache_tokens = (run.cache_creation_tokens or 0) + (run.cache_read_tokens or 0)
+    return {
+        'wall': run.wall_seconds,
+        'ttfo': run.first_output_seconds,
+        'in': run.input_tokens,
+        'out': run.output_tokens,
+        'cache': cache_tokens,
+        'tokens': run.total_tokens,
+        'turns': run.num_turns,
+        'cost': run.cost_usd,
+    }
+
+def build_report_data(results):
+    """Split batch results into the list index and per-item detail blobs"""
+    index = []
+    details = {}
+    for result in results:
+        item = result['item']
+        steps = list(item.steps)
+        index.append({
+            'id': item.id,
+            'title': item.title,
+            'status': item.status,
+            'dir': item.working_directory,
+            'steps': [sum(1 for step in steps if step.status == 'done'), len(steps)],
+            'rc': result['return_code'],
+            'attempts': result.get('attempts', 1),
+            'run': _run_data(result.get('run')),
+        })
+        details[item.id] = {
+            'description': item.description or '',
+            'context': item.context or '',
+            'steps': [{'id': step.id, 'status': step.status, 'description': step.description} for step in steps],
+            'stdout': result['stdout'] or '',
+            'stderr': result['stderr'] or '',
+        }
+    return index, details
+
+def generate_html_report(results, all_items):
+    """Generate HTML report with Catppuccin Mocha theme"""
+    index, details = build_report_data(results)
+    # Every attempt counts towards time, tokens and cost
+    runs = [run for r in results for run in (r.get('runs') or [r.get('run')]) if run is not None]
+    generated_at = datetime.now()
+    
+    summary = [
+        (len(all_items), "Total Items"),
+        (sum(1 for r in results if r['item'].status == 'done'), "Completed"),
+        (sum(1 for r in results if r['item'].status == 'in_progress'), "In Progress"),
+        (sum(len(r['steps_completed']) for r in results), "Steps Completed"),
+        (sum(max(r.get('attempts', 1) - 1, 0) for r in results), "Retries"),
+        (format_duration(sum(run.wall_seconds or 0 for run in runs)), "Agent Time"),
+        (f"{sum(run.total_tokens or 0 for run in runs) / 1000:.1f}k", "Tokens"),
+        (f"${sum(run.cost_usd or 0 for run in runs):.2f}", "Reported Cost"),
+    ]
+    stat_cards = "".join(
+        f'<div class="stat-card"><div class="number">{value}</div><div class="label">{label}</div></div>'
+        for value, label in summary
+    )
+    detail_blocks = "\n".join(
+        f'<script type="application/json" id="detail-{item_id}">{_embed_json(detail)}</script>'
+        for item_id, detail in details.items()
+    )
+    css_colors = "\n".join(f"            --{name}: {color};" for name, color in CATPPUCCIN_MOCHA.items())
+    
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Tutu Batch Processing Report - {generated_at.strftime("%Y-%m-%d %H:%M:%S")}</title>
+    <style>
+        :root {{
+{css_colors}
+        }}
+
+        * {{
+            margin: 0;
+            padding: 0;
+            box-sizing: border-box;
+        }}
+
+        body {{
+            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, Cantarell, sans-serif;
+            background-color: var(--base);
+            color: var(--text);
+            line-height: 1.6;
+            padding: 2rem;
+        }}
+
+        .container {{
+            max-width: 1400px;
+            margin: 0 auto;
+        }}
+
+        h1 {{
+            color: var(--mauve);
+            text-align: center;
+            margin-bottom: 2rem;
+            font-size: 2.5rem;
+        }}
+
+        .summary {{
+            background-color: var(--mantle);
+            border: 1px solid var(--surface0);
+            border-radius: 8px;
+            padding: 1.5rem;
+            margin-bottom: 2rem;
+        }}
+
+        .summary h2 {{
+            color: var(--blue);
+            margin-bottom: 1rem;
+        }}
+
+        .stats {{
+            display: grid;
+            grid-template-columns: repeat(auto-fit, minmax(150px, 1fr));
+            gap: 1rem;
+            margin-top: 1rem;
+        }}
+
+        .stat-card {{
+            background-color: var(--surface0);
+            padding: 1rem;
+            border-radius: 6px;
+            text-align: center;
+        }}
+
+        .stat-card .number {{
+            font-size: 2rem;
+            font-weight: bold;
+            color: var(--peach);
+        }}
+
+        .stat-card .label {{
+            color: var(--subtext0);
+            font-size: 0.9rem;
+        }}
+
+        .toolbar {{
+            display: flex;
+            flex-wrap: wrap;
+            gap: 0.5rem;
+            align-items: center;
+            margin-bottom: 1rem;
+        }}
+
+        .toolbar input, .toolbar select, .toolbar button, .expand-button {{
+            background-color: var(--surface0);
+            color: var(--text);
+            border: 1px solid var(--surface1);
+            border-radius: 4px;
+            padding: 0.4rem 0.8rem;
+            font-size: 0.9rem;
+        }}
+
+        .toolbar input {{
+            flex: 1;
+            min-width: 200px;
+        }}
+
+        .toolbar button, .expand-button {{
+            cursor: pointer;
+        }}
+
+        .toolbar button.active {{
+            background-color: var(--mauve);
+            color: var(--crust);
+        }}
+
+        .count {{
+            color: var(--subtext0);
+            font-size: 0.9rem;
+        }}
+
+        .panes {{
+            display: grid;
+            grid-template-columns: minmax(0, 2fr) minmax(0, 3fr);
+            gap: 1rem;
+        }}
+
+        @media (max-width: 900px) {{
+            .panes {{
+                grid-template-columns: 1fr;
+            }}
+        }}
+
+        .list {{
+            background-color: var(--mantle);
+            border: 1px solid var(--surface0);
+            border-radius: 8px;
+            height: 75vh;
+            overflow-y: auto;
+            position: relative;
+        }}
+
+        .row {{
+            position: absolute;
+            left: 0;
+            right: 0;
+            height: 64px;
+            padding: 0.5rem 1rem;
+            border-bottom: 1px solid var(--surface0);
+            cursor: pointer;
+            overflow: hidden;
+        }}
+
+        .row:hover, .row.selected {{
+            background-color: var(--surface0);
+        }}
+
+        .row-title {{
+            color: var(--lavender);
+            font-weight: bold;
+            white-space: nowrap;
+            overflow: hidden;
+            text-overflow: ellipsis;
+        }}
+
+        .row-meta {{
+            color: var(--subtext0);
+            font-size: 0.8rem;
+            white-space: nowrap;
+            overflow: hidden;
+            text-overflow: ellipsis;
+        }}
+
+        .detail {{
+            background-color: var(--mantle);
+            border: 1px solid var(--surface0);
+            border-radius: 8px;
+            height: 75vh;
+            overflow-y: auto;
+        }}
+
+        .empty {{
+            color: var(--subtext0);
+            padding: 2rem;
+            text-align: center;
+        }}
+
+        .item-header {{
+            background-color: var(--surface0);
+            padding: 1rem 1.5rem;
+            display: flex;
+            justify-content: space-between;
+            align-items: center;
+            gap: 1rem;
+        }}
+
+        .item-title {{
+            color: var(--lavender);
+            font-size: 1.3rem;
+            font-weight: bold;
+        }}
+
+        .status {{
+            padding: 0.1rem 0.6rem;
+            border-radius: 4px;
+            font-size: 0.75rem;
+            font-weight: bold;
+            text-transform: uppercase;
+            margin-right: 0.4rem;
+        }}
+
+        .status.done {{
+            background-color: var(--green);
+            color: var(--crust);
+        }}
+
+        .status.in_progress {{
+            background-color: var(--yellow);
+            color: var(--crust);
+        }}
+
+        .status.pending {{
+            background-color: var(--surface2);
+            color: var(--text);
+        }}
+
+        .item-content {{
+            padding: 1.5rem;
+        }}
+
+        .section {{
+            margin-bottom: 1.5rem;
+        }}
+
+        .section h3 {{
+            color: var(--teal);
+            margin-bottom: 0.5rem;
+        }}
+
+        .description, .context {{
+            background-color: var(--surface0);
+            padding: 1rem;
+            border-radius: 4px;
+            white-space: pre-wrap;
+            word-wrap: break-word;
+        }}
+
+        .step {{
+            padding: 0.3rem 0;
+        }}
+
+        .step.done {{
+            color: var(--green);
+        }}
+
+        .step.pending {{
+            color: var(--subtext0);
+        }}
+
+        .output {{
+            background-color: var(--crust);
+            border: 1px solid var(--surface1);
+            border-radius: 4px;
+            padding: 1rem;
+            margin-top: 0.5rem;
+            font-family: 'Cascadia Code', 'Fira Code', monospace;
+            font-size: 0.9rem;
+            white-space: pre-wrap;
+            word-wrap: break-word;
+        }}
+
+        .error {{
+            color: var(--red);
+        }}
+
+        .working-dir {{
+            color: var(--blue);
+            font-family: monospace;
+            font-size: 0.9rem;
+        }}
+
+        .run-figures {{
+            color: var(--peach);
+            font-size: 0.85rem;
+        }}
+
+        .timestamp {{
+            color: var(--subtext0);
+            text-align: center;
+            margin-top: 3rem;
+            font-size: 0.9rem;
+        }}
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h1>🚀 Tutu Batch Processing Report</h1>
+
+        <div class="summary">
+            <h2>📊 Summary</h2>
+            <div class="stats">{stat_cards}</div>
+        </div>
+
+        <div class="toolbar">
+            <input type="search" id="search" placeholder="Filter by title or directory…">
+            <span id="status-filters"></span>
+            <select id="sort">
+                <option value="id">Sort: item #</option>
+                <option value="cost">Sort: cost</option>
+                <option value="wall">Sort: wall time</option>
+                <option value="tokens">Sort: tokens</option>
+                <option value="ttfo">Sort: time to first output</option>
+                <option value="turns">Sort: turns</option>
+                <option value="attempts">Sort: attempts</option>
+            </select>
+            <span class="count" id="count"></span>
+        </div>
+
+        <div class="panes">
+            <div class="list" id="list"><div id="spacer"></div></div>
+            <div class="detail" id="detail"><div class="empty">Select an item to see its details and output.</div></div>
+        </div>
+
+        <div class="timestamp">
+            Generated on {generated_at.strftime("%Y-%m-%d at %H:%M:%S")} Pacific Time
+        </div>
+    </div>
+
+    <script type="application/json" id="report-index">{_embed_json(index)}</script>
+{detail_blocks}
+
+    <script>
+        const ROW_HEIGHT = 64;
+        const OVERSCAN = 8;
+        const OUTPUT_PREVIEW = 20000;
+        const items = JSON.parse(document.getElementById('report-index').textContent);
+        const list = document.getElementById('list');
+        const spacer = document.getElementById('spacer');
+        const detail = document.getElementById('detail');
+        let visible = items;
+        let statusFilter = 'all';
+        let selectedId = null;
+
+        function el(tag, className, text) {{
+            const node = document.createElement(tag);
+            if (className) node.className = className;
+            if (text !== undefined && text !== null) node.textContent = text;
+            return node;
+        }}
+
+        function duration(seconds) {{
+            if (seconds === null || seconds === undefined) return '–';
+            if (seconds < 10) return seconds.toFixed(1) + 's';
+            seconds = Math.round(seconds);
+            if (seconds < 3600) return Math.floor(seconds / 60) + 'm ' + String(seconds % 60).padStart(2, '0') + 's';
+            return Math.floor(seconds / 3600) + 'h ' + String(Math.floor(seconds % 3600 / 60)).padStart(2, '0') + 'm';
+        }}
+
+        function runSummary(item) {{
+            const run = item.run;
+            if (!run) return '';
+            const parts = ['⏱️ ' + duration(run.wall)];
+            if (run.tokens !== null) parts.push((run.tokens / 1000).toFixed(1) + 'k tokens');
+            if (run.cost !== null) parts.push('$' + run.cost.toFixed(2));
+            if (item.attempts > 1) parts.push('🔁 ' + item.attempts + ' attempts');
+            return parts.join(' · ');
+        }}
+
+        function statusBadge(status) {{
+            return el('span', 'status ' + status.replace(/ /g, '_'), status);
+        }}
+
+        // Only the rows inside the viewport (plus a margin) exist in the DOM
+        function renderRows() {{
+            const first = Math.max(0, Math.floor(list.scrollTop / ROW_HEIGHT) - OVERSCAN);
+            const last = Math.min(visible.length, Math.ceil((list.scrollTop + list.clientHeight) / ROW_HEIGHT) + OVERSCAN);
+            const fragment = document.createDocumentFragment();
+            fragment.appendChild(spacer);
+            for (let i = first; i < last; i++) {{
+                const item = visible[i];
+                const row = el('div', 'row' + (item.id === selectedId ? ' selected' : ''));
+                row.style.top = (i * ROW_HEIGHT) + 'px';
+                row.dataset.id = item.id;
+                const title = el('div', 'row-title');
+                title.appendChild(statusBadge(item.status));
+                title.appendChild(document.createTextNode('#' + item.id + ': ' + item.title));
+                row.appendChild(title);
+                const meta = [item.dir || '', 'steps ' + item.steps[0] + '/' + item.steps[1], runSummary(item)];
+                row.appendChild(el('div', 'row-meta', meta.filter(Boolean).join('  ·  ')));
+                fragment.appendChild(row);
+            }}
+            list.replaceChildren(fragment);
+        }}
+
+        function sortValue(item, key) {{
+            if (key === 'id') return item.id;
+            if (key === 'attempts') return item.attempts;
+            return item.run ? item.run[key] : null;
+        }}
+
+        function applyFilters() {{
+            const query = document.getElementById('search').value.toLowerCase();
+            const key = document.getElementById('sort').value;
+            visible = items.filter(item =>
+                (statusFilter === 'all' || item.status === statusFilter) &&
+                (!query || item.title.toLowerCase().includes(query) || (item.dir || '').toLowerCase().includes(query))
+            );
+            visible.sort((a, b) => {{
+                const x = sortValue(a, key), y = sortValue(b, key);
+                if (key === 'id') return x - y;
+                // Missing figures sink to the bottom; largest first otherwise
+                if (x === null || y === null) return (x === null) - (y === null);
+                return y - x;
+            }});
+            spacer.style.height = (visible.length * ROW_HEIGHT) + 'px';
+            document.getElementById('count').textContent = visible.length + ' of ' + items.length + ' items';
+            renderRows();
+        }}
+
+        function section(title, body) {{
+            const node = el('div', 'section');
+            node.appendChild(el('h3', null, title));
+            node.appendChild(body);
+            return node;
+        }}
+
+        function outputSection(detailData) {{
+            const text = detailData.stdout;
+            const box = el('div', 'output');
+            const body = el('span', null, text.slice(0, OUTPUT_PREVIEW));
+            box.appendChild(body);
+            if (detailData.stderr) {{
+                box.appendChild(el('span', 'error', '\\n\\nErrors:\\n' + detailData.stderr));
+            }}
+            const wrapper = el('div');
+            if (text.length > OUTPUT_PREVIEW) {{
+                const more = el('button', 'expand-button', 'Show full output (' + Math.round(text.length / 1024) + ' KB)');
+                more.addEventListener('click', () => {{
+                    body.textContent = text;
+                    more.remove();
+                }});
+                wrapper.appendChild(more);
+            }}
+            wrapper.appendChild(box);
+            return section('Output', wrapper);
+        }}
+
+        // Long fields are parsed from their own JSON block on first open
+        function showDetail(id) {{
+            selectedId = id;
+            renderRows();
+            const item = items.find(candidate => candidate.id === id);
+            const detailData = JSON.parse(document.getElementById('detail-' + id).textContent);
+            const header = el('div', 'item-header');
+            const heading = el('div');
+            heading.appendChild(el('div', 'item-title', '#' + item.id + ': ' + item.title));
+            heading.appendChild(el('div', 'working-dir', '📁 ' + (item.dir || '')));
+            heading.appendChild(el('div', 'run-figures', runSummary(item)));
+            header.appendChild(heading);
+            header.appendChild(statusBadge(item.status));
+            const content = el('div', 'item-content');
+            content.appendChild(section('Description', el('div', 'description', detailData.description)));
+            if (detailData.context) {{
+                content.appendChild(section('Context', el('div', 'context', detailData.context)));
+            }}
+            if (detailData.steps.length) {{
+                const steps = el('div', 'steps');
+                detailData.steps.forEach(step => {{
+                    const icon = step.status === 'done' ? '✅' : '⏳';
+                    steps.appendChild(el('div', 'step ' + (step.status === 'done' ? 'done' : 'pending'), icon + ' Step #' + step.id + ': ' + step.description));
+                }});
+                content.appendChild(section('Steps', steps));
+            }}
+            if (detailData.stdout || detailData.stderr) {{
+                content.appendChild(outputSection(detailData));
+            }}
+            detail.replaceChildren(header, content);
+            detail.scrollTop = 0;
+        }}
+
+        const statuses = ['all', ...new Set(items.map(item => item.status))];
+        const filterBar = document.getElementById('status-filters');
+        statuses.forEach(status => {{
+            const button = el('button', status === 'all' ? 'active' : '', status);
+            button.addEventListener('click', () => {{
+                statusFilter = status;
+                filterBar.querySelectorAll('button').forEach(b => b.classList.toggle('active', b === button));
+                applyFilters();
+            }});
+            filterBar.appendChild(button);
+        }});
+
+        list.addEventListener('scroll', () => requestAnimationFrame(renderRows));
+        list.addEventListener('click', event => {{
+            const row = event.target.closest('.row');
+            if (row) showDetail(Number(row.dataset.id));
+        }});
+        document.getElementById('search').addEventListener('input', applyFilters);
+        document.getElementById('sort').addEventListener('change', applyFilters);
+        window.addEventListener('resize', renderRows);
+        applyFilters();
+    </script>
+</body>
+</html>
+"""
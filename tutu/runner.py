@@ -0,0 +1,168 @@
+"""How `start` and `start-all` launch an agent session.
+
+A runner is a pair of command templates, one for interactive `start` and one
+for batch `start-all`. Commands are exec'd directly in the item's working
+directory (no shell), with the item's prompt on stdin. Every argument may use
+`{item_id}`, `{working_dir}` and `{db_path}`.
+
+The runner is picked by the TUTU_RUNNER environment variable, or the
+`[runner]` table of the nearest `.tutu.toml`:
+
+    [runner]
+    name = "claude"        # the default
+    # batch = ["claude", "-p", "--output-format", "stream-json", "--verbose"]
+    # interactive = ["claude"]
+
+    [runner]
+    name = "mock"          # simulated sessions, for benchmarks and offline tests
+    latency = 2.0          # seconds per session
+    output_lines = 50      # assistant messages per session
+    line_bytes = 200       # size of each message
+    fail_rate = 0.1        # share of sessions that exit 1
+    complete = true        # mark the item and its steps done
+
+The mock runner runs this module (`python -m tutu.runner`), which reads the
+prompt and writes the same stream-json events as `claude -p`, so the whole
+start-all pipeline (streaming, telemetry, leases, retries, the report) runs
+as it would for real.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+from .config import find_project_config, load_project_config
+
+ENV_VAR = "TUTU_RUNNER"
+CLAUDE_BATCH = ["claude", "-p", "--dangerously-skip-permissions", "--output-format", "stream-json", "--verbose"]
+CLAUDE_INTERACTIVE = ["claude"]
+MOCK_DEFAULTS = {
+    'latency': 1.0,
+    'output_lines': 20,
+    'line_bytes': 120,
+    'fail_rate': 0.0,
+    'complete': True,
+}
+
+class Runner:
+    """Command templates for interactive and batch agent sessions"""
+    
+    def __init__(self, name, batch, interactive):
+        self.name = name
+        self.batch = [str(arg) for arg in batch]
+        self.interactive = [str(arg) for arg in interactive]
+        
+    def _render(self, template, item_id, working_dir, db_path):
+        fields = {'item_id': item_id, 'working_dir': working_dir, 'db_path': db_path or ''}
+        return [arg.format_map(fields) for arg in template]
+        
+    def batch_command(self, item_id, working_dir, db_path=None):
+        """argv for a non-interactive session that streams JSON events"""
+        return self._render(self.batch, item_id, working_dir, db_path)
+        
+    def interactive_command(self, item_id, working_dir, db_path=None):
+        return self._render(self.interactive, item_id, working_dir, db_path)
+
+def mock_runner(latency, output_lines, line_bytes, fail_rate, complete):
+    base = [
+        sys.executable, "-m", "tutu.runner",
+        "--latency", latency,
+        "--output-lines", output_lines,
+        "--line-bytes", line_bytes,
+        "--fail-rate", fail_rate,
+        "--item-id", "{item_id}",
+        "--db", "{db_path}",
+    ]
+    if complete:
+        base.append("--complete")
+    return Runner('mock', base, [*base, "--format", "text"])
+
+def load_runner(start=None):
+    """The runner configured for `start` or the current directory"""
+    settings = {}
+    config_path = find_project_config(start)
+    if config_path:
+        settings = dict(load_project_config(config_path).get('runner', {}))
+    configured = settings.pop('name', 'claude')
+    name = os.environ.get(ENV_VAR) or configured
+    if name != configured:
+        # The settings in the file belong to a different runner
+        settings = {}
+        
+    if name == 'mock':
+        unknown = set(settings) - set(MOCK_DEFAULTS)
+        if unknown:
+            raise ValueError(f"Unknown mock runner settings: {', '.join(sorted(unknown))}")
+        return mock_runner(**{**MOCK_DEFAULTS, **settings})
+    if name == 'claude':
+        return Runner(name, settings.get('batch', CLAUDE_BATCH), settings.get('interactive', CLAUDE_INTERACTIVE))
+    if 'batch' not in settings or 'interactive' not in settings:
+        raise ValueError(f"Runner '{name}' needs both batch and interactive command templates")
+    return Runner(name, settings['batch'], settings['interactive'])
+
+# The mock session itself
+
+def _emit(event):
+    sys.stdout.write(json.dumps(event) + "\n")
+    sys.stdout.flush()
+
+def _complete_item(db_path, item_id):
+    from .api import TutuRepository
+    
+    with TutuRepository(db_path or None) as tutu:
+        with tutu.transaction():
+            tutu.set_status('done', steps_of=item_id)
+            tutu.set_status('done', item_ids=[item_id])
+
+def mock_session(argv=None):
+    """Pretend to be an agent: read the prompt, stream output, maybe finish the item"""
+    parser = argparse.ArgumentParser(prog="python -m tutu.runner", description=mock_session.__doc__)
+    parser.add_argument("--latency", type=float, default=MOCK_DEFAULTS['latency'])
+    parser.add_argument("--output-lines", type=int, default=MOCK_DEFAULTS['output_lines'])
+    parser.add_argument("--line-bytes", type=int, default=MOCK_DEFAULTS['line_bytes'])
+    parser.add_argument("--fail-rate", type=float, default=MOCK_DEFAULTS['fail_rate'])
+    parser.add_argument("--item-id", type=int)
+    parser.add_argument("--db")
+    parser.add_argument("--complete", action="store_true")
+    parser.add_argument("--format", choices=("stream-json", "text"), default="stream-json")
+    args = parser.parse_args(argv)
+    
+    prompt = sys.stdin.read()
+    stream = args.format == "stream-json"
+    if stream:
+        _emit({'type': 'system', 'subtype': 'init', 'model': 'mock'})
+        
+    lines = max(args.output_lines, 0)
+    pause = args.latency / max(lines, 1)
+    for index in range(lines):
+        time.sleep(pause)
+        text = f"Mock line {index + 1}/{lines} for item {args.item_id} ".ljust(args.line_bytes, ".")
+        if stream:
+            _emit({'type': 'assistant', 'message': {'content': [{'type': 'text', 'text': text}]}})
+        else:
+            print(text, flush=True)
+    if not lines:
+        time.sleep(args.latency)
+        
+    failed = random.random() < args.fail_rate
+    if args.complete and not failed and args.item_id is not None:
+        _complete_item(args.db, args.item_id)
+        
+    if stream:
+        _emit({
+            'type': 'result',
+            'subtype': 'error' if failed else 'success',
+            'result': "Mock session failed" if failed else "Mock session finished",
+            'num_turns': lines,
+            'total_cost_usd': 0.0,
+            'usage': {
+                'input_tokens': len(prompt) // 4,
+                'output_tokens': lines * args.line_bytes // 4,
+            },
+        })
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(mock_session())
@@ -0,0 +1,122 @@
+"""Time budgets for `tutu start-all --budget`.
+
+Each pending item's session length is estimated from the tutu_runs history,
+most specific evidence first:
+
+1. the item's own earlier successful sessions
+2. successful sessions of items in the same directory with a similar number
+   of steps
+3. successful sessions of items in the same directory
+4. successful sessions of items with a similar number of steps, anywhere
+5. any successful session, or DEFAULT_ESTIMATE when there is no history
+
+Groups need MIN_SAMPLES runs before they are trusted (the item's own runs
+need one). The estimate is the ESTIMATE_QUANTILE of the group rather than the
+median, so that a plan that fits on paper tends to fit in practice.
+
+Finishing the most items within a budget means running the shortest ones
+first: items are taken in order of their estimate and handed to whichever
+session slot frees up first, and everything that would end past the budget
+is deferred to the next run.
+"""
+import heapq
+from collections import defaultdict
+
+from sqlalchemy import select, func
+
+from .models import TutuItem, TutuItemStep, TutuRun
+
+MIN_SAMPLES = 3
+ESTIMATE_QUANTILE = 0.75
+DEFAULT_ESTIMATE = 15 * 60
+# Only recent history says much about how long sessions take now
+HISTORY_LIMIT = 2000
+STEP_BUCKETS = (0, 2, 5, 10)
+
+def step_bucket(step_count):
+    """Index of the STEP_BUCKETS range `step_count` falls in (0, 1-2, 3-5, 6-10, 11+)"""
+    for index, upper in enumerate(STEP_BUCKETS):
+        if step_count <= upper:
+            return index
+    return len(STEP_BUCKETS)
+
+def quantile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+class DurationModel:
+    """Session length estimates learned from one database's tutu_runs"""
+    
+    def __init__(self, history, own_runs=None):
+        self.groups = defaultdict(list)
+        for directory, step_count, seconds in history:
+            bucket = step_bucket(step_count)
+            self.groups[('directory+steps', directory, bucket)].append(seconds)
+            self.groups[('directory', directory)].append(seconds)
+            self.groups[('steps', bucket)].append(seconds)
+            self.groups[('all',)].append(seconds)
+        self.own_runs = own_runs or {}
+        
+    @classmethod
+    def load(cls, session, item_ids=()):
+        """Read the recent history, plus every earlier successful run of `item_ids`"""
+        step_count = (
+            select(func.count())
+            .where(TutuItemStep.item_id == TutuRun.item_id)
+            .scalar_subquery()
+        )
+        history = session.execute(
+            select(TutuItem.working_directory, step_count, TutuRun.wall_seconds)
+            .join(TutuItem, TutuItem.id == TutuRun.item_id)
+            .where(TutuRun.return_code == 0, TutuRun.wall_seconds.is_not(None))
+            .order_by(TutuRun.id.desc())
+            .limit(HISTORY_LIMIT)
+        ).all()
+        own_runs = defaultdict(list)
+        if item_ids:
+            for item_id, seconds in session.execute(
+                select(TutuRun.item_id, TutuRun.wall_seconds)
+                .where(
+                    TutuRun.item_id.in_(item_ids),
+                    TutuRun.return_code == 0,
+                    TutuRun.wall_seconds.is_not(None),
+                )
+            ):
+                own_runs[item_id].append(seconds)
+        return cls(history, own_runs)
+        
+    def estimate(self, item_id, directory, step_count):
+        """(seconds, basis) for one item; basis says which evidence was used"""
+        if self.own_runs.get(item_id):
+            return quantile(self.own_runs[item_id], ESTIMATE_QUANTILE), "own runs"
+        bucket = step_bucket(step_count)
+        for key, basis in (
+            (('directory+steps', directory, bucket), "directory, similar steps"),
+            (('directory', directory), "directory"),
+            (('steps', bucket), "similar steps"),
+        ):
+            if len(self.groups[key]) >= MIN_SAMPLES:
+                return quantile(self.groups[key], ESTIMATE_QUANTILE), basis
+        if self.groups[('all',)]:
+            return quantile(self.groups[('all',)], ESTIMATE_QUANTILE), "all runs"
+        return DEFAULT_ESTIMATE, "default"
+
+def plan_batch(estimates, budget, concurrency=1):
+    """Pick what fits in `budget` seconds on `concurrency` session slots.
+    
+    `estimates` is a list of (key, seconds) in queue order. Returns
+    (scheduled, deferred, finish): the keys to run, shortest first, the keys
+    left for the next run, and when the planned sessions should all be done.
+    """
+    slots = [0.0] * max(1, concurrency)
+    scheduled, deferred = [], []
+    # sorted() is stable, so equal estimates keep their queue order
+    for key, seconds in sorted(estimates, key=lambda entry: entry[1]):
+        start = slots[0]
+        if start + seconds <= budget:
+            heapq.heapreplace(slots, start + seconds)
+            scheduled.append(key)
+        else:
+            deferred.append(key)
+    finish = max(slots) if scheduled else 0.0
+    return scheduled, deferred, finish
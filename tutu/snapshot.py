@@ -0,0 +1,120 @@
+"""Cached output for bare `tutu`.
+
+Running `tutu` with no arguments (or plain `tutu list`) is the most common
+command, and most of the time nothing has changed since the last run. The
+`tutu` script starts here: it works out which database and directory scope
+apply, and if the database is unchanged since the listing was last rendered
+for this scope and terminal, prints that listing without importing
+SQLAlchemy, typer or rich. Anything else is handed to `tutu.cli`.
+
+The cache key is a cheap change marker read straight from the files: the
+"file change counter" SQLite bumps in the database header on every write
+transaction, plus the size and mtime of the database and its WAL (WAL-mode
+commits leave the header alone until a checkpoint). `PRAGMA data_version`
+can't be used here because it only means something within one open
+connection. Any write, from a tutu command, the Python API or another
+process, changes the key, so stale entries are simply never matched again.
+"""
+import json
+import os
+import shutil
+import sys
+
+from .config import resolve_db_path, MEMORY_DB
+
+SNAPSHOT_SUFFIX = "-snapshots.json"
+# Bump when the listing's layout changes so old snapshots aren't reused
+SNAPSHOT_FORMAT = 1
+MAX_SNAPSHOTS = 50
+# Header offset of SQLite's 4-byte big-endian file change counter
+CHANGE_COUNTER_OFFSET = 24
+
+def file_signature(db_path):
+    """Cheap change marker for a database file and its WAL"""
+    signature = []
+    for path in (str(db_path), f"{db_path}-wal"):
+        try:
+            stat = os.stat(path)
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            signature.append(None)
+    return tuple(signature)
+
+def change_counter(db_path):
+    try:
+        with open(db_path, 'rb') as f:
+            f.seek(CHANGE_COUNTER_OFFSET)
+            return int.from_bytes(f.read(4), 'big')
+    except OSError:
+        return None
+
+def snapshot_path(db_path):
+    return f"{db_path}{SNAPSHOT_SUFFIX}"
+
+def _scope():
+    """What besides the data decides how the listing looks"""
+    return json.dumps([
+        SNAPSHOT_FORMAT,
+        os.path.abspath(os.getcwd()),
+        shutil.get_terminal_size().columns,
+        sys.stdout.isatty(),
+        *(os.environ.get(name) for name in ("TERM", "COLORTERM", "NO_COLOR", "FORCE_COLOR")),
+    ])
+
+def _version(db_path):
+    return json.dumps([change_counter(db_path), *file_signature(db_path)])
+
+def _load(db_path):
+    try:
+        with open(snapshot_path(db_path), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def lookup(db_path, scope, version):
+    """The cached listing for `scope`, if it was rendered at `version`"""
+    entry = _load(db_path).get(scope)
+    if entry and entry.get('version') == version:
+        return entry.get('output')
+    return None
+
+def store(db_path, scope, version, output):
+    snapshots = _load(db_path)
+    snapshots.pop(scope, None)
+    snapshots[scope] = {'version': version, 'output': output}
+    # Keep the most recently stored scopes only
+    snapshots = dict([*snapshots.items()][-MAX_SNAPSHOTS:])
+    path = snapshot_path(db_path)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(snapshots, f)
+        os.replace(temporary, path)
+    except OSError:
+        # A read-only directory just means no caching
+        pass
+
+def _cacheable():
+    if sys.argv[1:] not in ([], ["list"]):
+        return False
+    # The query log wants to see the queries actually run
+    return not os.environ.get("TUTU_QUERY_LOG")
+
+def main():
+    """Entry point of the `tutu` script"""
+    if _cacheable():
+        db_path, _ = resolve_db_path()
+        if db_path != MEMORY_DB and os.path.exists(db_path):
+            scope = _scope()
+            version = _version(db_path)
+            output = lookup(db_path, scope, version)
+            if output is None:
+                from .cli import default_listing
+                output = default_listing()
+                store(db_path, scope, version, output)
+            sys.stdout.write(output)
+            sys.stdout.flush()
+            return
+            
+    from .cli import main as cli_main
+    cli_main()
@@ -0,0 +1,210 @@
+"""Throughput and cycle-time analytics, computed in SQL.
+
+Everything here runs as grouped / windowed queries over the whole history,
+so no ORM objects are loaded however many items there are. An item's done
+time is the last `status=done` event in tutu_events, falling back to its
+updated_at for items finished before the change log existed.
+"""
+from sqlalchemy import text
+
+from .utils import directory_range
+
+PERCENTILES = (0.5, 0.9, 0.99)
+
+def _scoped_items_cte(directory):
+    """CTE `scoped` with one row per item in scope plus its done time"""
+    scope = ""
+    if directory is not None:
+        # Same shape as api.in_directory: one index range plus a residual check
+        scope = (
+            "WHERE i.working_directory >= :dir AND i.working_directory < :dir_upper"
+            " AND (i.working_directory = :dir OR i.working_directory >= :dir_prefix)"
+        )
+    return f"""
+        done_events AS (
+            SELECT item_id, MAX(created_at) AS done_at
+            FROM tutu_events
+            WHERE entity = 'item' AND action = 'updated' AND json_extract(changes, '$.status') = 'done'
+            GROUP BY item_id
+        ),
+        scoped AS (
+            SELECT
+                i.id,
+                i.working_directory,
+                i.status,
+                i.created_at,
+                i.first_progress_at,
+                CASE WHEN i.status = 'done' THEN COALESCE(d.done_at, i.updated_at) END AS done_at
+            FROM tutu_items i
+            LEFT JOIN done_events d ON d.item_id = i.id
+            {scope}
+        )"""
+
+def _seconds_between(start, end):
+    return f"(julianday({end}) - julianday({start})) * 86400.0"
+
+def _params(directory):
+    if directory is None:
+        return {}
+    directory, prefix, upper = directory_range(directory)
+    return {'dir': directory, 'dir_prefix': prefix, 'dir_upper': upper}
+
+def status_counts(connection, directory=None):
+    rows = connection.execute(text(f"""
+        WITH {_scoped_items_cte(directory)}
+        SELECT status, COUNT(*) AS count FROM scoped GROUP BY status ORDER BY count DESC
+    """), _params(directory))
+    return {row.status: row.count for row in rows}
+
+def duration_percentiles(connection, directory=None):
+    """Queue wait, cycle, lead and step completion times with nearest-rank percentiles.
+
+    Returns {metric: {count, avg, min, max, p50, p90, p99}} in seconds.
+    """
+    percentile_columns = ",\n".join(
+        f"MIN(CASE WHEN rn >= {p} * n THEN seconds END) AS p{round(p * 100)}" for p in PERCENTILES
+    )
+    rows = connection.execute(text(f"""
+        WITH {_scoped_items_cte(directory)},
+        durations AS (
+            SELECT 'queue_wait' AS metric, {_seconds_between('created_at', 'first_progress_at')} AS seconds
+            FROM scoped WHERE first_progress_at IS NOT NULL
+            UNION ALL
+            SELECT 'cycle_time', {_seconds_between('first_progress_at', 'done_at')}
+            FROM scoped WHERE done_at IS NOT NULL AND first_progress_at IS NOT NULL
+            UNION ALL
+            SELECT 'lead_time', {_seconds_between('created_at', 'done_at')}
+            FROM scoped WHERE done_at IS NOT NULL
+            UNION ALL
+            SELECT 'step_time', {_seconds_between('s.created_at', 's.completed_at')}
+            FROM tutu_item_steps s JOIN scoped ON scoped.id = s.item_id
+            WHERE s.completed_at IS NOT NULL
+        ),
+        ranked AS (
+            SELECT
+                metric,
+                seconds,
+                ROW_NUMBER() OVER (PARTITION BY metric ORDER BY seconds) AS rn,
+                COUNT(*) OVER (PARTITION BY metric) AS n
+            FROM durations
+            WHERE seconds >= 0
+        )
+        SELECT
+            metric,
+            COUNT(*) AS count,
+            AVG(seconds) AS avg,
+            MIN(seconds) AS min,
+            MAX(seconds) AS max,
+            {percentile_columns}
+        FROM ranked
+        GROUP BY metric
+    """), _params(directory))
+    return {row.metric: {key: value for key, value in row._mapping.items() if key != 'metric'} for row in rows}
+
+def daily_throughput(connection, directory=None, days=14):
+    """Items finished per day for the `days` days up to the last completion, with a 7-day rolling average.
+
+    Days are generated as a calendar first, so idle days count as zero and
+    the average always covers seven calendar days.
+    """
+    rows = connection.execute(text(f"""
+        WITH RECURSIVE {_scoped_items_cte(directory)},
+        per_day AS (
+            SELECT date(done_at) AS day, COUNT(*) AS done
+            FROM scoped WHERE done_at IS NOT NULL
+            GROUP BY day
+        ),
+        calendar(day) AS (
+            -- Six extra days before the first one shown fill its window
+            SELECT date(MAX(day), '-' || (:days + 5) || ' days') FROM per_day WHERE day IS NOT NULL
+            UNION ALL
+            SELECT date(day, '+1 day') FROM calendar
+            WHERE day < (SELECT MAX(day) FROM per_day)
+        ),
+        daily AS (
+            SELECT
+                calendar.day,
+                COALESCE(per_day.done, 0) AS done,
+                AVG(COALESCE(per_day.done, 0)) OVER (ORDER BY calendar.day ROWS BETWEEN 6 PRECEDING AND CURRENT ROW) AS rolling_avg
+            FROM calendar
+            LEFT JOIN per_day ON per_day.day = calendar.day
+            WHERE calendar.day IS NOT NULL
+        )
+        SELECT day, done, rolling_avg
+        FROM daily
+        ORDER BY day DESC
+        LIMIT :days
+    """), {**_params(directory), 'days': days})
+    return [dict(row._mapping) for row in rows]
+
+def directory_breakdown(connection, directory=None, limit=20):
+    """Per working directory: item counts by status, median cycle time and step completion"""
+    rows = connection.execute(text(f"""
+        WITH {_scoped_items_cte(directory)},
+        step_counts AS (
+            SELECT s.item_id, COUNT(*) AS total, SUM(s.status = 'done') AS done
+            FROM tutu_item_steps s JOIN scoped ON scoped.id = s.item_id
+            GROUP BY s.item_id
+        ),
+        cycles AS (
+            SELECT
+                working_directory,
+                {_seconds_between('first_progress_at', 'done_at')} AS seconds,
+                ROW_NUMBER() OVER (PARTITION BY working_directory ORDER BY {_seconds_between('first_progress_at', 'done_at')}) AS rn,
+                COUNT(*) OVER (PARTITION BY working_directory) AS n
+            FROM scoped
+            WHERE done_at IS NOT NULL AND first_progress_at IS NOT NULL AND done_at >= first_progress_at
+        ),
+        median_cycles AS (
+            SELECT working_directory, MIN(CASE WHEN rn >= 0.5 * n THEN seconds END) AS median_cycle
+            FROM cycles GROUP BY working_directory
+        )
+        SELECT
+            scoped.working_directory,
+            COUNT(*) AS items,
+            SUM(scoped.status = 'pending') AS pending,
+            SUM(scoped.status = 'in_progress') AS in_progress,
+            SUM(scoped.status = 'done') AS done,
+            COALESCE(SUM(step_counts.done), 0) AS steps_done,
+            COALESCE(SUM(step_counts.total), 0) AS steps_total,
+            median_cycles.median_cycle
+        FROM scoped
+        LEFT JOIN step_counts ON step_counts.item_id = scoped.id
+        LEFT JOIN median_cycles ON median_cycles.working_directory IS scoped.working_directory
+        GROUP BY scoped.working_directory
+        ORDER BY items DESC
+        LIMIT :limit
+    """), {**_params(directory), 'limit': limit})
+    return [dict(row._mapping) for row in rows]
+
+def step_completion(connection, directory=None):
+    """Step totals, completion rate and how many items have every step done"""
+    row = connection.execute(text(f"""
+        WITH {_scoped_items_cte(directory)},
+        per_item AS (
+            SELECT s.item_id, COUNT(*) AS total, SUM(s.status = 'done') AS done
+            FROM tutu_item_steps s JOIN scoped ON scoped.id = s.item_id
+            GROUP BY s.item_id
+        )
+        SELECT
+            COALESCE(SUM(total), 0) AS steps_total,
+            COALESCE(SUM(done), 0) AS steps_done,
+            COUNT(*) AS items_with_steps,
+            COALESCE(SUM(done = total), 0) AS items_all_steps_done,
+            AVG(total) AS avg_steps_per_item
+        FROM per_item
+    """), _params(directory)).one()
+    result = dict(row._mapping)
+    result['completion_rate'] = result['steps_done'] / result['steps_total'] if result['steps_total'] else None
+    return result
+
+def collect_stats(connection, directory=None, days=14):
+    """Everything `tutu stats` shows, as plain data"""
+    return {
+        'scope': directory or 'everywhere',
+        'status_counts': status_counts(connection, directory),
+        'durations': duration_percentiles(connection, directory),
+        'throughput': daily_throughput(connection, directory, days),
+        'directories': directory_breakdown(connection, directory),
+        'steps': step_completion(connection, directory),
+    }
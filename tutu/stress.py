@@ -0,0 +1,212 @@
+"""Concurrency stress test behind `tutu db stress`.
+
+Starts N worker processes that hammer one database with a weighted mix of
+what agent sessions do all day: add steps, complete steps, read an item's
+status and list a directory. Each worker goes through TutuRepository, the
+same code path as the CLI commands, but in-process, so the figures measure
+the database and not Python start-up.
+
+Write operations take the write lock up front with BEGIN IMMEDIATE and time
+how long that takes, which is the lock wait. A lock that isn't granted
+within busy_timeout surfaces as "database is locked" and is counted. At the
+end every step a worker reported as added must exist and every step it
+reported as completed must be done; anything else is a lost update.
+
+Workers read their connection settings through tutu.config like any tutu
+process, so the settings under test are passed down as TUTU_JOURNAL_MODE,
+TUTU_BUSY_TIMEOUT and TUTU_SYNCHRONOUS.
+"""
+import multiprocessing
+import os
+import random
+import time
+
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+
+from .api import TutuRepository
+from .models import TutuItemStep
+
+OPERATIONS = ('add-step', 'complete-step', 'status', 'list')
+DEFAULT_MIX = {'add-step': 3, 'complete-step': 3, 'status': 3, 'list': 1}
+STRESS_DIRECTORY = "/tutu-stress"
+
+def parse_mix(value):
+    """'add-step=3,status=1' -> {'add-step': 3, 'status': 1}"""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.strip().partition('=')
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation {name!r}; use {', '.join(OPERATIONS)}")
+        try:
+            mix[name] = float(weight) if weight else 1.0
+        except ValueError:
+            raise ValueError(f"Weight of {name} must be a number, not {weight!r}")
+    if not any(mix.values()):
+        raise ValueError("Give at least one operation a weight above zero")
+    return mix
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def setup_items(repo, count, run_id):
+    """Create the items every worker contends on, each with a few pending steps"""
+    directory = f"{STRESS_DIRECTORY}/{run_id}"
+    with repo.transaction():
+        items = repo.create_items(
+            {'title': f"Stress item {number + 1}", 'working_directory': directory} for number in range(count)
+        )
+        for item in items:
+            repo.add_steps(item.id, [f"Seed step {number + 1}" for number in range(5)])
+    return directory, [item.id for item in items]
+
+def _begin_immediate(repo):
+    """Take the write lock now and return how long that took"""
+    started = time.perf_counter()
+    repo.session.connection().exec_driver_sql("BEGIN IMMEDIATE")
+    return time.perf_counter() - started
+
+def _run_operation(repo, name, item_ids, directory, worker, record):
+    item_id = random.choice(item_ids)
+    if name == 'add-step':
+        with repo.transaction():
+            record['lock_wait'].append(_begin_immediate(repo))
+            step = repo.add_step(item_id, f"Step from worker {worker}")
+        record['added'].append(step.id)
+    elif name == 'complete-step':
+        with repo.transaction():
+            record['lock_wait'].append(_begin_immediate(repo))
+            step_id = repo.session.execute(
+                select(TutuItemStep.id)
+                .where(TutuItemStep.item_id == item_id, TutuItemStep.status == 'pending')
+                .limit(1)
+            ).scalar()
+            if step_id is not None:
+                repo.complete_steps([step_id])
+        if step_id is not None:
+            record['completed'].append(step_id)
+    elif name == 'status':
+        repo.query_items(item_ids=[item_id], with_steps=True, with_text=True)
+        repo.session.rollback()
+    else:
+        repo.query_items(directory=directory, exclude_statuses=['done'], with_steps=True, order_by='updated')
+        repo.session.rollback()
+
+def _worker(worker, db_path, mix, item_ids, directory, start_at, duration, max_ops):
+    random.seed(os.getpid())
+    names = [*mix]
+    weights = [mix[name] for name in names]
+    record = {
+        'latency': {name: [] for name in names},
+        'errors': {name: 0 for name in names},
+        'locked': {name: 0 for name in names},
+        'lock_wait': [],
+        'added': [],
+        'completed': [],
+        'ops': 0,
+    }
+    repo = TutuRepository(db_path)
+    # Open the connection before the clock starts
+    repo.session.connection()
+    repo.session.rollback()
+    time.sleep(max(0.0, start_at - time.time()))
+    
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline and (not max_ops or record['ops'] < max_ops):
+        name = random.choices(names, weights)[0]
+        started = time.perf_counter()
+        try:
+            _run_operation(repo, name, item_ids, directory, worker, record)
+        except OperationalError as e:
+            repo.session.rollback()
+            if "locked" in str(e) or "busy" in str(e):
+                record['locked'][name] += 1
+            else:
+                record['errors'][name] += 1
+            continue
+        except Exception:
+            repo.session.rollback()
+            record['errors'][name] += 1
+            continue
+        finally:
+            record['ops'] += 1
+        record['latency'][name].append(time.perf_counter() - started)
+    repo.close()
+    return record
+
+def run_stress(db_path, workers=8, duration=10.0, mix=None, items=5, max_ops=0, pragmas=None):
+    """Run the stress test and return the merged figures (see summarize)"""
+    mix = mix or DEFAULT_MIX
+    environment = {
+        'journal_mode': "TUTU_JOURNAL_MODE",
+        'busy_timeout': "TUTU_BUSY_TIMEOUT",
+        'synchronous': "TUTU_SYNCHRONOUS",
+    }
+    for name, value in (pragmas or {}).items():
+        if value is not None:
+            os.environ[environment[name]] = str(value)
+            
+    run_id = f"{os.getpid()}-{int(time.time())}"
+    with TutuRepository(db_path) as repo:
+        directory, item_ids = setup_items(repo, items, run_id)
+        
+    # spawn, not fork: every worker opens its own engine and connections
+    context = multiprocessing.get_context('spawn')
+    start_at = time.time() + 1.0 + workers * 0.05
+    with context.Pool(workers) as pool:
+        records = pool.starmap(
+            _worker,
+            [(worker, db_path, mix, item_ids, directory, start_at, duration, max_ops) for worker in range(workers)]
+        )
+    elapsed = max(0.0, time.time() - start_at)
+    
+    with TutuRepository(db_path) as repo:
+        lost = find_lost_updates(repo, records)
+    return summarize(records, elapsed, lost, directory)
+
+def find_lost_updates(repo, records):
+    """Steps reported as added that don't exist, or as completed that aren't done"""
+    added = [step_id for record in records for step_id in record['added']]
+    completed = {step_id for record in records for step_id in record['completed']}
+    statuses = {}
+    wanted = sorted(set(added) | completed)
+    # Chunked to stay under SQLite's bound-parameter limit
+    for start in range(0, len(wanted), 500):
+        chunk = wanted[start:start + 500]
+        statuses.update(repo.session.execute(
+            select(TutuItemStep.id, TutuItemStep.status).where(TutuItemStep.id.in_(chunk))
+        ).all())
+    missing = [step_id for step_id in added if step_id not in statuses]
+    not_done = [step_id for step_id in completed if statuses.get(step_id) != 'done']
+    return {'missing_steps': len(missing), 'completions_lost': len(not_done)}
+
+def summarize(records, elapsed, lost, directory):
+    """Per-operation counts and latency percentiles, plus lock and lost-update totals"""
+    operations = {}
+    for name in records[0]['latency']:
+        latencies = [value for record in records for value in record['latency'][name]]
+        operations[name] = {
+            'ok': len(latencies),
+            'locked': sum(record['locked'][name] for record in records),
+            'errors': sum(record['errors'][name] for record in records),
+            'p50': percentile(latencies, 0.50),
+            'p99': percentile(latencies, 0.99),
+            'max': max(latencies) if latencies else None,
+        }
+    lock_waits = [value for record in records for value in record['lock_wait']]
+    total_ok = sum(figures['ok'] for figures in operations.values())
+    return {
+        'elapsed': elapsed,
+        'workers': len(records),
+        'operations': operations,
+        'throughput': total_ok / elapsed if elapsed else 0.0,
+        'lock_wait_total': sum(lock_waits),
+        'lock_wait_p99': percentile(lock_waits, 0.99),
+        'locked': sum(figures['locked'] for figures in operations.values()),
+        'errors': sum(figures['errors'] for figures in operations.values()),
+        'lost': lost,
+        'directory': directory,
+    }
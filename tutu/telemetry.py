@@ -0,0 +1,94 @@
+import json
+import time
+
+class AgentStreamParser:
+    """Incremental parser for `claude -p --output-format stream-json` output.
+
+    Feed it stdout one line at a time as the agent produces it. It keeps the
+    readable text of the session for the report and picks up timing, token
+    and cost figures from the final `result` event.
+    """
+    
+    def __init__(self, started_at=None):
+        self.started_at = started_at if started_at is not None else time.monotonic()
+        self.first_output_at = None
+        self.text_parts = []
+        self.result_text = None
+        self.is_error = False
+        self.input_tokens = None
+        self.output_tokens = None
+        self.cache_creation_tokens = None
+        self.cache_read_tokens = None
+        self.cost_usd = None
+        self.num_turns = None
+        self.last_line = ""
+        
+    def _mark_output(self):
+        # The init event arrives as soon as the process starts, so only what
+        # the agent actually says or does counts as its first output
+        if self.first_output_at is None:
+            self.first_output_at = time.monotonic()
+            
+    def feed(self, line):
+        line = line.strip()
+        if not line:
+            return
+            
+        try:
+            event = json.loads(line)
+        except ValueError:
+            # Not stream-json (an older agent, or a wrapper printing text)
+            self.text_parts.append(line)
+            self.last_line = line
+            self._mark_output()
+            return
+            
+        if not isinstance(event, dict):
+            return
+            
+        event_type = event.get('type')
+        if event_type == 'assistant':
+            for block in event.get('message', {}).get('content', []):
+                if block.get('type') == 'text' and block.get('text'):
+                    self._mark_output()
+                    self.text_parts.append(block['text'])
+                    lines = block['text'].strip().splitlines()
+                    if lines:
+                        self.last_line = lines[-1]
+                elif block.get('type') == 'tool_use':
+                    self._mark_output()
+                    self.last_line = f"🔧 {block.get('name', 'tool')}"
+        elif event_type == 'result':
+            self.result_text = event.get('result')
+            self.is_error = bool(event.get('is_error'))
+            self.cost_usd = event.get('total_cost_usd', event.get('cost_usd'))
+            self.num_turns = event.get('num_turns')
+            usage = event.get('usage') or {}
+            self.input_tokens = usage.get('input_tokens')
+            self.output_tokens = usage.get('output_tokens')
+            self.cache_creation_tokens = usage.get('cache_creation_input_tokens')
+            self.cache_read_tokens = usage.get('cache_read_input_tokens')
+            
+    @property
+    def time_to_first_output(self):
+        if self.first_output_at is None:
+            return None
+        return self.first_output_at - self.started_at
+        
+    def output_text(self):
+        """Readable session output: the final result, or everything said along the way"""
+        if self.result_text:
+            return self.result_text
+        return "\n\n".join(self.text_parts)
+        
+    def run_fields(self):
+        """Telemetry columns for a TutuRun row"""
+        return {
+            'first_output_seconds': self.time_to_first_output,
+            'input_tokens': self.input_tokens,
+            'output_tokens': self.output_tokens,
+            'cache_creation_tokens': self.cache_creation_tokens,
+            'cache_read_tokens': self.cache_read_tokens,
+            'cost_usd': self.cost_usd,
+            'num_turns': self.num_turns,
+        }
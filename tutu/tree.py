@@ -0,0 +1,109 @@
+"""Directory roll-up behind `tutu tree`.
+
+One grouped query per database returns a row for each distinct
+working_directory with its item and step counts. The query is built with
+SQLAlchemy Core (not text) so that it also runs through `fan_out`'s
+schema_translate_map, and scoping uses the indexed string range from
+`in_directory`. Only those per-directory rows are rolled up into the
+hierarchy in Python, so no items are ever loaded.
+"""
+import os
+from pathlib import PurePath
+
+from sqlalchemy import select, func, case
+
+from .api import in_directory
+from .models import TutuItem, TutuItemStep
+
+STATUSES = ('pending', 'in_progress', 'done')
+COUNT_FIELDS = ('items', *STATUSES, 'steps_done', 'steps_total')
+NO_DIRECTORY = "(no directory)"
+
+def _count_where(condition):
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+def directory_counts(connection, directory=None):
+    """Item and step counts per working directory, as a list of dicts"""
+    items = TutuItem.__table__
+    steps = TutuItemStep.__table__
+    
+    step_counts = (
+        select(
+            steps.c.item_id,
+            func.count().label('total'),
+            _count_where(steps.c.status == 'done').label('done')
+        )
+        .group_by(steps.c.item_id)
+    )
+    if directory is not None:
+        # Only count the steps of items in range, not every step in the table
+        step_counts = (
+            step_counts
+            .join(items, items.c.id == steps.c.item_id)
+            .where(in_directory(items.c.working_directory, directory))
+        )
+    step_counts = step_counts.subquery()
+    query = (
+        select(
+            items.c.working_directory,
+            func.count().label('items'),
+            *(_count_where(items.c.status == status).label(status) for status in STATUSES),
+            func.coalesce(func.sum(step_counts.c.done), 0).label('steps_done'),
+            func.coalesce(func.sum(step_counts.c.total), 0).label('steps_total')
+        )
+        .select_from(items.outerjoin(step_counts, step_counts.c.item_id == items.c.id))
+        .group_by(items.c.working_directory)
+    )
+    if directory is not None:
+        query = query.where(in_directory(items.c.working_directory, directory))
+        
+    return [dict(row._mapping) for row in connection.execute(query)]
+
+class DirectoryNode:
+    """A directory with its own item counts and the totals of everything below it"""
+    
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        self.children = {}
+        self.own = dict.fromkeys(COUNT_FIELDS, 0)
+        self.total = dict.fromkeys(COUNT_FIELDS, 0)
+        
+    def child(self, name):
+        if name not in self.children:
+            self.children[name] = DirectoryNode(name, os.path.join(self.path, name))
+        return self.children[name]
+        
+    def collapse(self):
+        """Merge chains of single-child directories with no items of their own into one node"""
+        for name, child in list(self.children.items()):
+            while len(child.children) == 1 and not child.own['items']:
+                (grandchild,) = child.children.values()
+                grandchild.name = os.path.join(child.name, grandchild.name)
+                child = grandchild
+            self.children[name] = child
+            child.collapse()
+        return self
+
+def build_tree(rows, root):
+    """Roll per-directory rows up into a DirectoryNode hierarchy under `root`"""
+    tree = DirectoryNode(root, root)
+    for row in rows:
+        directory = row['working_directory']
+        node = tree
+        path = [node]
+        if not directory:
+            node = node.child(NO_DIRECTORY)
+            path.append(node)
+        elif directory != root:
+            relative = PurePath(directory)
+            if relative.is_relative_to(root):
+                relative = relative.relative_to(root)
+            for part in relative.parts:
+                node = node.child(part)
+                path.append(node)
+        for field in COUNT_FIELDS:
+            node.own[field] += row[field]
+            for ancestor in path:
+                ancestor.total[field] += row[field]
+    return tree
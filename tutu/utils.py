@@ -1,4 +1,6 @@
 from datetime import datetime
+import os
+import re
 import pytz
 
 PACIFIC_TZ = pytz.timezone('America/Los_Angeles')
@@ -40,4 +42,49 @@ def format_relative_time(dt: datetime) -> str:
         days = int(total_seconds / 86400)
         if days == 1:
             return "1 day ago"
-        return f"{days} days ago"
\ No newline at end of file
+        return f"{days} days ago"
+
+def format_run_summary(run):
+    """One-line telemetry summary like '4m 12s, 18.2k tokens, $0.42'"""
+    parts = [format_duration(run.wall_seconds)]
+    if run.total_tokens is not None:
+        parts.append(f"{run.total_tokens / 1000:.1f}k tokens")
+    if run.cost_usd is not None:
+        parts.append(f"${run.cost_usd:.2f}")
+    return ", ".join(parts)
+
+def format_duration(seconds):
+    if seconds is None:
+        return "–"
+    if seconds < 10:
+        return f"{seconds:.1f}s"
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+
+def directory_range(directory):
+    """Bounds for matching a directory and everything below it with plain comparisons.
+    
+    Returns (directory, prefix, upper): a path is inside when it equals
+    `directory` or sorts in [prefix, upper). `upper` swaps the trailing
+    separator for the next character, so this works on an index.
+    """
+    directory = directory.rstrip(os.sep) or os.sep
+    prefix = directory if directory.endswith(os.sep) else directory + os.sep
+    upper = prefix[:-1] + chr(ord(os.sep) + 1)
+    return directory, prefix, upper
+
+DURATION_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+def parse_duration(value):
+    """Parse durations like "45m", "2h", "7d" or "1d12h" into seconds.
+    
+    Raises ValueError for anything else.
+    """
+    parts = re.findall(r'(\d+(?:\.\d+)?)\s*([smhdw])', value.strip().lower())
+    if not parts or re.sub(r'[\d.\s]+[smhdw]', '', value.strip().lower()):
+        raise ValueError(f"Invalid duration {value!r}; use e.g. 45m, 2h, 7d or 1d12h")
+    return sum(float(amount) * DURATION_UNITS[unit] for amount, unit in parts)
\ No newline at end of file